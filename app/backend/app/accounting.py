@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import tracing
+from .config import get_settings
+from .metrics import (
+    ingest_bytes_read,
+    ingest_cpu_seconds,
+    ingest_memory_peak_bytes,
+    ingest_mongo_commands,
+    ingest_rows_per_second,
+    ingest_stage_seconds,
+    ingest_wall_seconds,
+)
+
+try:  # not available on Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+# The ingest running in this context; Mongo command events and batch writes are
+# attributed to it (command listeners run in the thread that issued the command)
+_current: ContextVar[Optional["IngestAccounting"]] = ContextVar("ingest_accounting", default=None)
+
+
+def current_accounting() -> Optional["IngestAccounting"]:
+    return _current.get()
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+class IngestAccounting:
+    """What one ingest run cost: wall time per stage, CPU, memory, I/O and Mongo work.
+
+    CPU is ``thread_time`` of the ingest thread, so concurrent ingests in the
+    threadpool do not count each other. Peak RSS is the process high-water
+    mark (and how much this run raised it); the tracemalloc peak is only
+    recorded with ``ingest_tracemalloc`` on and is process-wide.
+    """
+
+    def __init__(self, source_system: str) -> None:
+        self.source_system = source_system
+        self.stages: Dict[str, float] = {}
+        self.mongo_commands: Counter = Counter()
+        self.write_ops = 0
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.thread_time()
+        self._rss0 = _max_rss_bytes()
+        self._tracemalloc = get_settings().ingest_tracemalloc
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def active(self) -> Iterator["IngestAccounting"]:
+        token = _current.set(self)
+        if self._tracemalloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # Stages are per batch at most, so they double as the ingest's trace spans
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"ingest.{name}", source_system=self.source_system):
+                yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count_command(self, name: str) -> None:
+        self.mongo_commands[name] += 1
+
+    def finish(self, rows: int, bytes_read: int, record: bool = True) -> Dict[str, Any]:
+        """Summary for the dataset document; also observed into the Prometheus
+        histograms unless ``record`` is off (work units are observed merged)."""
+        wall = time.perf_counter() - self._wall0
+        cpu = time.thread_time() - self._cpu0
+        rss = _max_rss_bytes()
+        peak = None
+        if self._tracemalloc and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        summary = {
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "stages_s": {k: round(v, 4) for k, v in self.stages.items()},
+            "rows": rows,
+            "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+            "bytes_read": bytes_read,
+            "max_rss_bytes": rss,
+            "max_rss_growth_bytes": rss - self._rss0 if rss is not None and self._rss0 is not None else None,
+            "tracemalloc_peak_bytes": peak,
+            "mongo_commands": dict(self.mongo_commands),
+            "mongo_write_ops": self.write_ops,
+        }
+        if record:
+            observe(self.source_system, summary)
+        return summary
+
+
+def observe(source_system: str, summary: Dict[str, Any]) -> None:
+    ingest_wall_seconds.labels(source_system=source_system).observe(summary["wall_s"])
+    ingest_cpu_seconds.labels(source_system=source_system).observe(summary["cpu_s"])
+    ingest_bytes_read.labels(source_system=source_system).observe(summary["bytes_read"])
+    ingest_mongo_commands.labels(source_system=source_system).observe(sum(summary["mongo_commands"].values()))
+    if summary["rows_per_s"] is not None:
+        ingest_rows_per_second.labels(source_system=source_system).observe(summary["rows_per_s"])
+    memory = summary["tracemalloc_peak_bytes"] or summary["max_rss_growth_bytes"]
+    if memory is not None:
+        ingest_memory_peak_bytes.labels(source_system=source_system).observe(memory)
+    for stage, seconds in summary["stages_s"].items():
+        ingest_stage_seconds.labels(source_system=source_system, stage=stage).observe(seconds)
+
+
+def merge_summaries(summaries: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    """Combine per-unit summaries of a distributed ingest; ``wall_s`` is end-to-end."""
+    stages: Counter = Counter()
+    commands: Counter = Counter()
+    for s in summaries:
+        stages.update(s.get("stages_s") or {})
+        commands.update(s.get("mongo_commands") or {})
+    rows = sum(s.get("rows", 0) for s in summaries)
+    peaks = [s.get("tracemalloc_peak_bytes") for s in summaries if s.get("tracemalloc_peak_bytes") is not None]
+    rss = [s.get("max_rss_bytes") for s in summaries if s.get("max_rss_bytes") is not None]
+    return {
+        "wall_s": round(wall_s, 4),
+        "cpu_s": round(sum(s.get("cpu_s", 0.0) for s in summaries), 4),
+        "stages_s": {k: round(v, 4) for k, v in stages.items()},
+        "rows": rows,
+        "rows_per_s": round(rows / wall_s, 1) if wall_s > 0 else None,
+        "bytes_read": max((s.get("bytes_read", 0) for s in summaries), default=0),
+        "max_rss_bytes": max(rss) if rss else None,
+        "max_rss_growth_bytes": None,
+        "tracemalloc_peak_bytes": max(peaks) if peaks else None,
+        "mongo_commands": dict(commands),
+        "mongo_write_ops": sum(s.get("mongo_write_ops", 0) for s in summaries),
+    }
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Set
+
+import structlog
+
+from .config import get_settings
+from .db import bump_version, dataset_filter
+from .recommendations import DEFAULT_RECOMMENDATION, TEMPLATES
+from .storage import REASON_CODES, SOURCE_CODES
+
+
+logger = structlog.get_logger(__name__)
+
+CANDIDATES_COLLECTION = "candidates"
+CANDIDATE_KEY = ("dataset_id", "claim_id", "source_system")
+CANDIDATE_FIELDS = ["claim_id", "resubmission_reason", "source_system", "recommended_changes"]
+# Projection for reads and exports: the four public fields only
+CANDIDATE_PROJECTION = {"_id": 0, **{f: 1 for f in CANDIDATE_FIELDS}}
+
+# Databases whose candidates key index is known to exist (checked once per process)
+_key_indexed: Set[str] = set()
+
+
+def ensure_key_index(db) -> None:  # type: ignore[no-untyped-def]
+    """Create the unique index ``$merge ... on: CANDIDATE_KEY`` requires, once per process.
+
+    The API builds indexes in the background after startup, and scripts not at
+    all; without the index the merge fails after the claims are written.
+    """
+    name = getattr(db, "name", "")
+    if name in _key_indexed:
+        return
+    db[CANDIDATES_COLLECTION].create_index([(k, 1) for k in CANDIDATE_KEY], unique=True)
+    _key_indexed.add(name)
+
+
+def _switch(field: str, mapping: Mapping[str, str], default: Any) -> Dict[str, Any]:
+    return {
+        "$switch": {
+            "branches": [{"case": {"$eq": [field, key]}, "then": value} for key, value in mapping.items()],
+            "default": default,
+        }
+    }
+
+
+def _decoded(field: str, codes: Mapping[str, str]) -> Dict[str, Any]:
+    # Decode unconditionally, like storage.decode_claim, so older compact documents read the same
+    return _switch(f"${field}", {code: value for value, code in codes.items()}, {"$ifNull": [f"${field}", ""]})
+
+
+def candidate_pipeline(dataset_id: str) -> List[Dict[str, Any]]:
+    """Build candidates for a dataset inside Mongo.
+
+    ``$match`` uses the (dataset_id, eligibility) index; the recommendation
+    ``$switch`` is generated from ``recommendations.TEMPLATES``.
+    """
+    return [
+        {"$match": {"dataset_id": dataset_id, "eligibility": True}},
+        {
+            "$project": {
+                "_id": 0,
+                "dataset_id": 1,
+                "claim_id": 1,
+                "resubmission_reason": _decoded("eligibility_reason", REASON_CODES),
+                "source_system": _decoded("source_system", SOURCE_CODES),
+            }
+        },
+        {"$set": {"recommended_changes": _switch("$resubmission_reason", TEMPLATES, DEFAULT_RECOMMENDATION)}},
+    ]
+
+
+def refresh_candidates(db, dataset_id: str) -> None:  # type: ignore[no-untyped-def]
+    """Re-materialize one dataset's candidates into the ``candidates`` collection.
+
+    Rows are upserted with ``$merge``; rows not touched by this refresh (claims
+    that stopped being eligible) are then removed.
+    """
+    if not get_settings().candidates_materialized:
+        return
+    ensure_key_index(db)
+    stamp = datetime.utcnow()
+    pipeline = candidate_pipeline(dataset_id)
+    pipeline[-1]["$set"]["refreshed_at"] = stamp
+    pipeline.append(
+        {
+            "$merge": {
+                "into": CANDIDATES_COLLECTION,
+                "on": list(CANDIDATE_KEY),
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        }
+    )
+    db["claims"].aggregate(pipeline)
+    stale = db[CANDIDATES_COLLECTION].delete_many({"dataset_id": dataset_id, "refreshed_at": {"$lt": stamp}})
+    db["datasets"].update_one(dataset_filter(dataset_id), bump_version({"$set": {"candidates_refreshed_at": stamp}}))
+    logger.info("candidates_refreshed", dataset_id=dataset_id, removed=stale.deleted_count)
+
+
+def find_candidates(db, dataset_id: str):  # type: ignore[no-untyped-def]
+    """Cursor over a dataset's candidates (public fields only)."""
+    if not get_settings().candidates_materialized:
+        return db["claims"].aggregate(candidate_pipeline(dataset_id) + [{"$project": CANDIDATE_PROJECTION}])
+    dataset = db["datasets"].find_one(dataset_filter(dataset_id), {"candidates_refreshed_at": 1})
+    if dataset is not None and dataset.get("candidates_refreshed_at") is None:
+        # Ingested before candidates were materialized
+        refresh_candidates(db, dataset_id)
+    return db[CANDIDATES_COLLECTION].find({"dataset_id": dataset_id}, CANDIDATE_PROJECTION)
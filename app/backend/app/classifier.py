@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional
 
-from rapidfuzz.distance import Levenshtein
+from .config import get_settings
+
+if TYPE_CHECKING:
+    from .fuzzy_index import FuzzyIndex
 
 
 RETRYABLE = {
@@ -48,10 +53,12 @@ def classify_reason(reason: Optional[str], mode: str = "rules+heuristic") -> Cla
                 return Classification(label="retryable", canonical_reason=canon)
 
     if mode in {"heuristic", "rules+heuristic"}:
-        # fuzzy contains for retryable set
-        for known in RETRYABLE:
-            if Levenshtein.normalized_similarity(low, known.lower()) >= 0.82:
-                return Classification(label="retryable", canonical_reason=known)
+        # fuzzy whole-string match (then, if enabled, partial match for long free-text
+        # messages); like the rules it only ever concludes retryable: a reason closest
+        # to a non-retryable phrase stays ambiguous
+        canonical = _heuristic_canonical(low, get_settings().classifier_partial_cutoff)
+        if canonical in RETRYABLE:
+            return Classification(label="retryable", canonical_reason=canonical)
 
     if mode == "mock-llm":
         return mock_llm_classify(raw)
@@ -60,6 +67,37 @@ def classify_reason(reason: Optional[str], mode: str = "rules+heuristic") -> Cla
     return Classification(label="ambiguous")
 
 
+def load_vocabulary(path: str) -> Dict[str, str]:
+    """Load a ``{payer phrase: canonical reason}`` JSON object."""
+    with open(path, "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    known = RETRYABLE | NON_RETRYABLE
+    unknown = sorted({canon for canon in vocab.values() if canon not in known})
+    if unknown:
+        raise ValueError(f"vocabulary maps to unknown canonical reasons: {unknown}")
+    return vocab
+
+
+@lru_cache(maxsize=1)
+def reason_index() -> FuzzyIndex:
+    """Fuzzy index over canonical reasons, synonyms and the optional payer vocabulary."""
+    from .fuzzy_index import FuzzyIndex  # rapidfuzz is heavy; built on first heuristic lookup
+
+    phrases = {known: known for known in RETRYABLE | NON_RETRYABLE}
+    phrases.update(SYNONYMS)
+    path = get_settings().classifier_vocabulary_path
+    if path:
+        phrases.update(load_vocabulary(path))
+    return FuzzyIndex(phrases)
+
+
+@lru_cache(maxsize=65536)
+def _heuristic_canonical(low: str, partial_cutoff: Optional[float]) -> Optional[str]:
+    # Denial reasons repeat heavily across rows; memoize the fuzzy lookup per text
+    match = reason_index().lookup(low, full_cutoff=82.0, partial_cutoff=partial_cutoff)
+    return match.canonical if match is not None else None
+
+
 def mock_llm_classify(text: str) -> Classification:
     # Deterministic pseudo LLM: hash prefix
     h = sum(ord(c) for c in text) % 10
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple
+
+import structlog
+
+from .classifier import (
+    NON_RETRYABLE,
+    RETRYABLE,
+    Classification,
+    classify_reason,
+    mock_llm_classify,
+)
+from .config import get_settings
+
+
+logger = structlog.get_logger(__name__)
+
+LABELS = {"retryable", "non-retryable", "ambiguous"}
+
+
+class ClassifierBackend(Protocol):
+    """Classifies ambiguous denial reasons in bulk. ``model`` namespaces the cache."""
+
+    model: str
+
+    async def classify_many(self, texts: List[str]) -> Dict[str, Classification]: ...
+
+
+class ClassificationCache(Protocol):
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, Classification]: ...
+
+    def put_many(self, model: str, results: Dict[str, Classification]) -> None: ...
+
+
+def _validated(label: object, canonical: object) -> Classification:
+    # Never trust a model to stay inside the canonical vocabulary
+    if label not in LABELS or (label != "ambiguous" and canonical not in RETRYABLE | NON_RETRYABLE):
+        return Classification(label="ambiguous")
+    if label == "retryable" and canonical not in RETRYABLE:
+        return Classification(label="ambiguous")
+    return Classification(
+        label=str(label),
+        canonical_reason=str(canonical) if label != "ambiguous" else None,
+    )
+
+
+class HTTPLLMBackend:
+    """Batched, concurrency-limited client for a model endpoint.
+
+    Request:  ``POST {url}`` with ``{"model": ..., "inputs": [text, ...]}``
+    Response: ``{"results": [{"label": ..., "canonical_reason": ...}, ...]}`` in input order.
+
+    Batches that still fail after ``max_retries`` come back as ambiguous and are
+    not cached, so the next run tries them again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        model: str,
+        batch_size: int = 64,
+        concurrency: int = 4,
+        timeout_s: float = 30.0,
+        max_retries: int = 3,
+        backoff_s: float = 0.5,
+        api_key: Optional[str] = None,
+    ) -> None:
+        self.url = url
+        self.model = model
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    async def classify_many(self, texts: List[str]) -> Dict[str, Classification]:
+        import httpx
+
+        batches = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(
+            max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+        )
+        results: Dict[str, Classification] = {}
+        async with httpx.AsyncClient(timeout=self.timeout_s, limits=limits, headers=self.headers) as client:
+
+            async def run(batch: List[str]) -> None:
+                async with semaphore:
+                    results.update(await self._post_batch(client, batch))
+
+            await asyncio.gather(*(run(b) for b in batches))
+        return results
+
+    async def _post_batch(self, client, batch: List[str]) -> Dict[str, Classification]:  # type: ignore[no-untyped-def]
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await client.post(self.url, json={"model": self.model, "inputs": batch})
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    raise httpx.HTTPStatusError("retryable status", request=resp.request, response=resp)
+                resp.raise_for_status()
+                items = resp.json()["results"]
+                if len(items) != len(batch):
+                    raise ValueError(f"expected {len(batch)} results, got {len(items)}")
+                return {
+                    text: _validated(item.get("label"), item.get("canonical_reason"))
+                    for text, item in zip(batch, items)
+                }
+            except (httpx.TransportError, httpx.HTTPStatusError, ValueError, KeyError) as exc:
+                if attempt == self.max_retries:
+                    logger.warning(
+                        "llm_batch_failed", size=len(batch), attempts=attempt + 1, error=str(exc)
+                    )
+                    return {}
+                await asyncio.sleep(self.backoff_s * 2**attempt * (1 + random.random()))
+        return {}
+
+
+class MockLLMBackend:
+    """Local stand-in using the deterministic ``mock_llm_classify`` stub."""
+
+    model = "mock-llm"
+
+    async def classify_many(self, texts: List[str]) -> Dict[str, Classification]:
+        return {t: mock_llm_classify(t) for t in texts}
+
+
+def _cache_key(model: str, text: str) -> str:
+    return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+class SqliteClassificationCache:
+    """On-disk cache; one row per (model, text)."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifications (key TEXT PRIMARY KEY, model TEXT,"
+                " text TEXT, label TEXT, canonical_reason TEXT, created_at TEXT)"
+            )
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, Classification]:
+        keys = {_cache_key(model, t): t for t in texts}
+        found: Dict[str, Classification] = {}
+        items = list(keys)
+        with self._lock:
+            for i in range(0, len(items), 500):
+                chunk = items[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT key, label, canonical_reason FROM classifications"
+                    f" WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                for key, label, canonical in rows:
+                    found[keys[key]] = Classification(label=label, canonical_reason=canonical)
+        return found
+
+    def put_many(self, model: str, results: Dict[str, Classification]) -> None:
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (_cache_key(model, t), model, t, c.label, c.canonical_reason, now)
+            for t, c in results.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MongoClassificationCache:
+    """Shared cache in the ``classifier_cache`` collection, keyed by model and text hash."""
+
+    def __init__(self, db, collection: str = "classifier_cache") -> None:  # type: ignore[no-untyped-def]
+        self._coll = db[collection]
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, Classification]:
+        keys = {_cache_key(model, t): t for t in texts}
+        found: Dict[str, Classification] = {}
+        for doc in self._coll.find({"_id": {"$in": list(keys)}}):
+            found[keys[doc["_id"]]] = Classification(
+                label=doc["label"], canonical_reason=doc.get("canonical_reason")
+            )
+        return found
+
+    def put_many(self, model: str, results: Dict[str, Classification]) -> None:
+        from pymongo import UpdateOne
+
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"_id": _cache_key(model, t)},
+                {
+                    "$set": {
+                        "model": model,
+                        "text": t,
+                        "label": c.label,
+                        "canonical_reason": c.canonical_reason,
+                        "created_at": now,
+                    }
+                },
+                upsert=True,
+            )
+            for t, c in results.items()
+        ]
+        if ops:
+            self._coll.bulk_write(ops, ordered=False)
+
+
+async def classify_unique(
+    reasons: Iterable[Optional[str]],
+    backend: ClassifierBackend,
+    cache: Optional[ClassificationCache] = None,
+) -> Dict[Optional[str], Classification]:
+    """Classify each distinct reason once.
+
+    Rules and the fuzzy heuristic run first; only reasons they leave ambiguous go
+    to the cache and then, for cache misses, to the backend.
+    """
+    resolved: Dict[Optional[str], Classification] = {}
+    ambiguous: List[str] = []
+    for reason in set(reasons):
+        cls = classify_reason(reason, mode="rules+heuristic")
+        resolved[reason] = cls
+        if cls.label == "ambiguous" and reason is not None and reason.strip():
+            ambiguous.append(reason)
+    if not ambiguous:
+        return resolved
+
+    cached = cache.get_many(backend.model, ambiguous) if cache is not None else {}
+    misses = [t for t in ambiguous if t not in cached]
+    fresh = await backend.classify_many(misses) if misses else {}
+    if cache is not None and fresh:
+        cache.put_many(backend.model, fresh)
+    resolved.update(cached)
+    resolved.update(fresh)
+    logger.info(
+        "reasons_classified",
+        model=backend.model,
+        unique=len(resolved),
+        ambiguous=len(ambiguous),
+        cache_hits=len(cached),
+        backend_calls=len(misses),
+    )
+    return resolved
+
+
+def get_backend() -> ClassifierBackend:
+    settings = get_settings()
+    if not settings.llm_endpoint_url:
+        return MockLLMBackend()
+    return HTTPLLMBackend(
+        url=settings.llm_endpoint_url,
+        model=settings.llm_model,
+        batch_size=settings.llm_batch_size,
+        concurrency=settings.llm_concurrency,
+        timeout_s=settings.llm_timeout_s,
+        max_retries=settings.llm_max_retries,
+        api_key=settings.llm_api_key,
+    )
+
+
+_sqlite_cache: Optional[SqliteClassificationCache] = None
+_sqlite_cache_key: Optional[Tuple[int, str]] = None
+_sqlite_cache_lock = threading.Lock()
+
+
+def _shared_sqlite_cache(path: str) -> SqliteClassificationCache:
+    """One connection per process and path, reused by every reclassify.
+
+    A forked worker opens its own: SQLite connections must not cross ``fork``.
+    """
+    global _sqlite_cache, _sqlite_cache_key
+    key = (os.getpid(), path)
+    with _sqlite_cache_lock:
+        if _sqlite_cache is None or _sqlite_cache_key != key:
+            if _sqlite_cache is not None and _sqlite_cache_key is not None and _sqlite_cache_key[0] == key[0]:
+                _sqlite_cache.close()  # the path setting changed
+            _sqlite_cache = SqliteClassificationCache(path)
+            _sqlite_cache_key = key
+        return _sqlite_cache
+
+
+def get_cache(db=None) -> Optional[ClassificationCache]:  # type: ignore[no-untyped-def]
+    settings = get_settings()
+    if settings.llm_cache == "sqlite":
+        return _shared_sqlite_cache(settings.llm_cache_path)
+    if settings.llm_cache == "mongo" and db is not None:
+        return MongoClassificationCache(db)
+    return None
+
+
+def resolve_reasons(  # type: ignore[no-untyped-def]
+    reasons: Iterable[Optional[str]], mode: str, db=None
+) -> Dict[Optional[str], Classification]:
+    """Classify distinct reasons for a dataset; ``mode="llm"`` uses the configured backend.
+
+    Synchronous wrapper for sync route handlers (which run in a worker thread).
+    """
+    if mode != "llm":
+        return {r: classify_reason(r, mode=mode) for r in set(reasons)}
+    return asyncio.run(classify_unique(reasons, get_backend(), get_cache(db)))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import date
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,11 +21,120 @@ class Settings(BaseSettings):
     # DB (MongoDB)
     mongo_url: str = "mongodb://localhost:27017"
     mongo_db: str = "claims_pipeline"
+    # Pool sized for bulk ingest: a handful of long-lived connections per worker
+    # process rather than pymongo's default of 100 that mostly sit idle.
+    mongo_max_pool_size: int = 20
+    mongo_min_pool_size: int = 2
+    mongo_max_idle_time_ms: int = 300_000
+    mongo_wait_queue_timeout_ms: int = 10_000
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_connect_timeout_ms: int = 5_000
+    mongo_socket_timeout_ms: int = 60_000
+    mongo_write_concern_w: str = "1"  # "1", "majority", ...
+    mongo_journal: Optional[bool] = None
+    mongo_compressors: str = "zlib"  # comma separated: zstd,snappy,zlib
+    mongo_app_name: str = "claims-backend"
+
+    # Storage
+    raw_payload_storage: str = "inline"  # inline | compressed | collection | none
+    compact_codes: bool = False  # short codes for source_system/status/canonical reasons
+    # Materialize candidates with $merge (MongoDB 4.2+); off computes them per request
+    candidates_materialized: bool = True
 
     # Ingestion
     max_upload_mb: int = 50
+    ingest_batch_size: int = 1000  # rows per bulk_write; the resume checkpoint advances per batch
+    ingest_stale_after_s: int = 120  # an "ingesting" dataset without progress this long may be resumed
+    # Chunked uploads (/api/uploads), spooled to local disk until finalized
+    upload_spool_dir: str = "var/uploads"
+    upload_chunk_max_mb: int = 64
+    max_chunked_upload_mb: int = 4096
+    # Resource accounting: also record the tracemalloc peak per ingest (slows ingest ~2x)
+    ingest_tracemalloc: bool = False
+    # Schema sniffing: header, encoding, delimiter and a row sample are checked before ingest
+    sniff_bytes: int = 65_536
+    sniff_sample_rows: int = 50
+    # Rejections: counts are kept per error code, raw rows only for the first N per code.
+    # A distributed ingest (work_queue) applies the cap per work unit, so it may store
+    # up to N x units samples per code
+    rejection_sample_cap: int = 20
+    # Abort an ingest once this share of rows is rejected (after at least min_rows); 0 disables.
+    # Distributed ingests check each work unit on its own rows; one unit over it fails the dataset
+    rejection_fail_rate: float = 0.9
+    rejection_fail_min_rows: int = 200
+    # Retention: datasets uploaded more than N days ago are archived, then their claims
+    # are deleted in throttled batches; unset = keep forever
+    retention_days: Optional[int] = None
+    retention_interval_s: int = 3600
+    retention_archive_dir: str = "var/archive"  # raw claims: must not be under artifacts_dir
+    retention_archive_format: str = "ndjson"  # ndjson (gzip) | parquet (columnar extra)
+    retention_delete_batch: int = 1000  # documents per delete_many
+    retention_pause_s: float = 0.2  # between delete batches, to leave room for live traffic
+    rejections_ttl_days: Optional[int] = 90  # TTL index on rejections.created_at; unset = none
+    # Live progress (GET /api/datasets/{id}/events): at most one event per interval per ingest
+    progress_interval_s: float = 0.5
+    progress_keepalive_s: float = 15.0
+    # Distributed ingestion (app.work_queue / python -m app.scripts.ingest_worker)
+    ingest_unit_mb: int = 64  # file bytes per work unit in ingest_tasks (CSV ranges, Parquet row groups)
+    ingest_lease_s: int = 60  # a unit whose lease is not renewed this long is re-queued
+    ingest_task_max_attempts: int = 3
+    ingest_worker_poll_s: float = 2.0
     eligibility_reference_date: date = date(2025, 7, 30)
-    classifier_mode: str = "rules+heuristic"  # rules | heuristic | mock-llm | rules+heuristic
+    classifier_mode: str = "rules+heuristic"  # rules | heuristic | mock-llm | rules+heuristic | llm
+    classifier_vocabulary_path: Optional[str] = None  # JSON {payer phrase: canonical reason}
+    # rapidfuzz partial_ratio for phrases inside long messages, e.g. 92; unset = whole-string only
+    classifier_partial_cutoff: Optional[float] = None
+
+    # Model endpoint for classifier_mode/reclassify mode "llm" (mock stub when unset)
+    llm_endpoint_url: Optional[str] = None
+    llm_model: str = "denial-reasons-v1"
+    llm_api_key: Optional[str] = None
+    llm_batch_size: int = 64
+    llm_concurrency: int = 4
+    llm_timeout_s: float = 30.0
+    llm_max_retries: int = 3
+    llm_cache: str = "mongo"  # mongo | sqlite | none
+    llm_cache_path: str = "var/classifier_cache.sqlite3"  # holds raw denial text: not under artifacts_dir
+
+    # Profiling of ingest/pipeline requests; served only by GET /api/profiles/{name} with the token
+    profile_dir: str = "var/profiles"
+    profile_admin_token: Optional[str] = None  # ?profile=sample|cprofile needs X-Admin-Token
+    profile_sample_every: int = 0  # also profile 1 in N requests with the stack sampler; 0 = off
+    profile_interval_ms: float = 5.0
+    profile_keep: int = 50
+
+    # OpenTelemetry tracing (install the 'tracing' extra); unset = off.
+    # "otlp" sends to an OTLP/HTTP collector, "file" appends JSON spans to tracing_file
+    tracing_exporter: Optional[str] = None
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file: str = "var/traces.jsonl"  # spans carry request paths (dataset ids): not under artifacts_dir
+    tracing_sample_ratio: float = 1.0  # of root traces; children follow their parent
+    tracing_service_name: str = "claims-backend"
+
+    # Logging: rendered on the calling thread, written to stdout by a background thread
+    log_level: str = "INFO"
+    log_queue_size: int = 10_000  # lines waiting for the writer; beyond this they are dropped
+    # Per-event caps (events/s) for high-frequency events; the next one written
+    # carries ``suppressed`` with how many were dropped
+    log_rate_limits: Dict[str, float] = {
+        "datasets_listed": 10.0,
+        "claims_listed": 10.0,
+        "candidates_generated": 10.0,
+        "llm_batch_failed": 1.0,
+    }
+    # Keep this fraction of an event (tagged ``sample_rate``), e.g. {"claims_listed": 0.1}
+    log_sample_rates: Dict[str, float] = {}
+
+    # Production server (python -m app.server)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 = one per CPU
+    server_backlog: int = 2048
+    server_keepalive_s: int = 5
+    server_graceful_timeout_s: int = 30  # also bounds draining in-flight ingests
+    server_limit_concurrency: Optional[int] = None
+    server_access_log: bool = False
+    prometheus_multiproc_dir: str = "/tmp/claims-prometheus"
 
     # Auth
     auth_enabled: bool = False
@@ -33,7 +142,22 @@ class Settings(BaseSettings):
 
     # Files
     data_dir: str = "app/data"
-    artifacts_dir: str = "artifacts"
+    artifacts_dir: str = "artifacts"  # served without auth at /artifacts
+
+    def exposed_private_dirs(self) -> List[str]:
+        """Settings whose private data (uploads, archives, profiles, cached denial text, traces) would be served under /artifacts."""
+        import os
+
+        public = os.path.realpath(self.artifacts_dir)
+        return [
+            name
+            for name in PRIVATE_DIR_SETTINGS
+            if os.path.commonpath([public, os.path.realpath(getattr(self, name))]) == public
+        ]
+
+
+# Directories (and files) holding private data; never under artifacts_dir
+PRIVATE_DIR_SETTINGS = ("upload_spool_dir", "retention_archive_dir", "profile_dir", "llm_cache_path", "tracing_file")
 
 
 @lru_cache()
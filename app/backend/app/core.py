@@ -4,19 +4,18 @@ import json
 import os
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import structlog
 
+from . import tracing
 from .classifier import classify_reason
 from .config import get_settings
+from .eligibility import evaluate, predicate_for
 from .recommendations import recommend_change
-from .utils_normalize import (
-    normalize_datetime,
-    normalize_status,
-    normalize_string,
-    title_case_denial,
-)
+from .records import get_adapter
+from .utils_normalize import StringTable, error_code
 
 
 logger = structlog.get_logger(__name__)
@@ -50,60 +49,44 @@ def run_pipeline_from_rows(rows: Iterable[Dict[str, Any]], source: str) -> Pipel
 
     candidates: List[Dict[str, Any]] = []
     rejections: List[Dict[str, Any]] = []
-
-    for raw in rows:
-        total += 1
-        try:
-            # Normalize
-            if source == "alpha":
-                claim_id = normalize_string(raw.get("claim_id")) or ""
-                patient_id = normalize_string(raw.get("patient_id")) or None
-                procedure_code = normalize_string(raw.get("procedure_code")) or None
-                denial_reason = title_case_denial(normalize_string(raw.get("denial_reason")))
-                status = normalize_status(raw.get("status", ""))
-                submitted_at = normalize_datetime(raw.get("submitted_at", ""))
-            elif source == "beta":
-                claim_id = normalize_string(raw.get("id")) or ""
-                patient_id = normalize_string(raw.get("member")) or None
-                procedure_code = normalize_string(raw.get("code")) or None
-                denial_reason = title_case_denial(normalize_string(raw.get("error_msg")))
-                status = normalize_status(raw.get("status", ""))
-                submitted_at = normalize_datetime(raw.get("date", ""))
-            else:
-                raise ValueError("unknown source system")
-
-            if not claim_id:
-                raise ValueError("claim_id required")
-
-            accepted += 1
-
-            # Eligibility
-            cls = classify_reason(denial_reason)
-            ref_date = settings.eligibility_reference_date
-            eligible = (
-                status == "denied"
-                and bool(patient_id)
-                and (ref_date - submitted_at.date()).days > 7
-                and cls.label == "retryable"
-                and bool(cls.canonical_reason)
-            )
-
-            if eligible:
-                flagged += 1
-                reason = cls.canonical_reason or ""
-                candidates.append(
-                    {
-                        "claim_id": claim_id,
-                        "resubmission_reason": reason,
-                        "source_system": source,
-                        "recommended_changes": recommend_change(reason),
-                    }
-                )
-            else:
-                excluded += 1
-        except Exception as exc:  # noqa: BLE001
-            rejected += 1
-            rejections.append({"raw": raw, "reason": str(exc)})
+    passes_rules = predicate_for(settings.eligibility_reference_date, attrs=True)
+    adapter = get_adapter(source)
+    strings = StringTable()
+
+    # Spans per batch rather than per row keep tracing overhead flat
+    it = iter(rows)
+    with tracing.span("pipeline", source_system=source) as pipeline_span:
+        while chunk := list(islice(it, settings.ingest_batch_size)):
+            with tracing.span("pipeline.batch", rows=len(chunk)):
+                for raw in chunk:
+                    total += 1
+                    try:
+                        # Normalize
+                        record = adapter(raw, strings)
+                        accepted += 1
+
+                        # Eligibility
+                        cls = classify_reason(record.denial_reason)
+                        outcome = evaluate(passes_rules(record), cls)
+
+                        if outcome.eligible:
+                            flagged += 1
+                            reason = cls.canonical_reason or ""
+                            candidates.append(
+                                {
+                                    "claim_id": record.claim_id,
+                                    "resubmission_reason": reason,
+                                    "source_system": source,
+                                    "recommended_changes": recommend_change(reason),
+                                }
+                            )
+                        else:
+                            excluded += 1
+                    except Exception as exc:  # noqa: BLE001
+                        rejected += 1
+                        rejections.append({"raw": raw, "code": error_code(exc), "reason": str(exc)})
+        if pipeline_span is not None:
+            pipeline_span.set_attributes({"rows": total, "accepted": accepted, "rejected": rejected})
 
     metrics = {
         "processed": total,
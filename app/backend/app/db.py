@@ -1,22 +1,83 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Iterator
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict
 
-from pymongo import MongoClient
-from pymongo.collection import Collection
+from .config import Settings, get_settings
 
-from .config import get_settings
+if TYPE_CHECKING:
+    from pymongo import MongoClient
 
 
 _client: MongoClient | None = None
+_client_pid: int | None = None
+
+
+def _client_options(settings: Settings) -> dict[str, Any]:
+    from . import tracing
+    from .mongo_monitoring import CommandCountListener, CommandTracingListener, PoolMetricsListener
+
+    w: int | str = settings.mongo_write_concern_w
+    if isinstance(w, str) and w.isdigit():
+        w = int(w)
+    options: dict[str, Any] = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "w": w,
+        "appname": settings.mongo_app_name,
+        "event_listeners": [PoolMetricsListener(), CommandCountListener()],
+    }
+    if tracing.enabled():
+        options["event_listeners"].append(CommandTracingListener())
+    if settings.mongo_journal is not None:
+        options["journal"] = settings.mongo_journal
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    return options
+
+
+def connect_mongo() -> MongoClient:
+    """Create the process-wide client. Called from the app lifespan (i.e. after any fork)."""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+    from pymongo import MongoClient  # imported on first connect, off the startup path
+
+    settings = get_settings()
+    _client = MongoClient(settings.mongo_url, **_client_options(settings))
+    _client_pid = os.getpid()
+    return _client
+
+
+def close_mongo() -> None:
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
+
+
+def _forget_client_after_fork() -> None:
+    # Sockets and monitor threads belong to the parent; never reuse or close them here.
+    global _client, _client_pid
+    _client = None
+    _client_pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client_after_fork)
 
 
 def get_mongo() -> MongoClient:
-    global _client
-    if _client is None:
-        settings = get_settings()
-        _client = MongoClient(settings.mongo_url)
+    # Lazily connects for scripts/tests that run without the app lifespan.
+    if _client is None or _client_pid != os.getpid():
+        return connect_mongo()
     return _client
 
 
@@ -25,11 +86,71 @@ def get_db():  # type: ignore[no-untyped-def]
     return client[get_settings().mongo_db]
 
 
+def dataset_filter(dataset_id: str) -> Dict[str, Any]:
+    """Filter for a dataset document by its string id (claims store it as a string)."""
+    from bson import ObjectId
+
+    return {"_id": ObjectId(dataset_id) if ObjectId.is_valid(dataset_id) else dataset_id}
+
+
+def bump_version(update: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a version bump to a dataset update that changes what readers see.
+
+    ``version`` only ever increases and is the ETag of the dataset's read
+    endpoints (``app.http_cache``); ``modified_at`` is their Last-Modified.
+    """
+    update.setdefault("$inc", {})["version"] = 1
+    update.setdefault("$set", {})["modified_at"] = datetime.utcnow()
+    return update
+
+
+def _ensure_rejections_ttl(db) -> None:  # type: ignore[no-untyped-def]
+    """Expire rejected rows ``rejections_ttl_days`` after they were recorded.
+
+    A changed setting is applied with ``collMod``; an unset one leaves an
+    existing TTL index alone. Expiry does not bump the dataset's ``version``,
+    so a cached /rejections response may still list expired rows until the
+    dataset changes again.
+    """
+    from pymongo.errors import OperationFailure
+
+    days = get_settings().rejections_ttl_days
+    if not days:
+        return
+    seconds = int(days * 86400)
+    try:
+        db["rejections"].create_index("created_at", expireAfterSeconds=seconds)
+    except OperationFailure as exc:
+        if exc.code != 85:  # IndexOptionsConflict: same key, other expiry
+            raise
+        db.command("collMod", "rejections", index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": seconds})
+
+
 def create_indexes() -> None:
     db = get_db()
     db["datasets"].create_index("uploaded_at")
     db["claims"].create_index([("dataset_id", 1), ("claim_id", 1), ("source_system", 1)], unique=True)
+    # Eligibility forecast: equality on the first three, range on submitted_at
+    db["claims"].create_index(
+        [("dataset_id", 1), ("classification_label", 1), ("status", 1), ("submitted_at", 1)]
+    )
+    db["claims"].create_index([("dataset_id", 1), ("eligibility", 1)])
+    db["candidates"].create_index([("dataset_id", 1), ("claim_id", 1), ("source_system", 1)], unique=True)
     db["rejections"].create_index("dataset_id")
-
-
-
+    # Rejections are upserted by row offset so resumed ingests do not duplicate them
+    db["rejections"].create_index([("dataset_id", 1), ("row", 1)])
+    _ensure_rejections_ttl(db)
+    db["datasets"].create_index([("status", 1), ("heartbeat_at", 1)])
+    db["uploads"].create_index("created_at")
+    # Work queue: claim order, expired-lease scans, per-dataset completion checks
+    db["ingest_tasks"].create_index([("status", 1), ("created_at", 1), ("unit", 1)])
+    db["ingest_tasks"].create_index([("status", 1), ("lease_expires_at", 1)])
+    db["ingest_tasks"].create_index([("dataset_id", 1), ("status", 1)])
+    db["claim_payloads"].create_index(
+        [("dataset_id", 1), ("claim_id", 1), ("source_system", 1)], unique=True
+    )
+    # Trend rollups: one document per key, range scans by day
+    db["claim_rollups"].create_index([("day", 1), ("source_system", 1), ("canonical_reason", 1)], unique=True)
+    db["dataset_rollups"].create_index(
+        [("dataset_id", 1), ("day", 1), ("source_system", 1), ("canonical_reason", 1)], unique=True
+    )
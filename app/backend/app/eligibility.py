@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import structlog
+
+from .classifier import Classification, classify_reason
+from .classifier_backends import resolve_reasons
+from .config import get_settings
+from .rollups import RollupDeltas, is_rolled_up
+from .storage import decode_claim, encode_claim, encode_value
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Rule:
+    field: str
+    op: str  # eq | present | older_than_days
+    value: Any = None
+
+
+# The single definition of "eligible by rules". A claim passes when every rule holds.
+# older_than_days N means more than N whole days before the reference date.
+ELIGIBILITY_RULES: Sequence[Rule] = (
+    Rule("status", "eq", "denied"),
+    Rule("patient_id", "present"),
+    Rule("submitted_at", "older_than_days", 7),
+)
+
+NOT_ELIGIBLE_BY_RULES = "Not eligible by rules"
+AMBIGUOUS = "Ambiguous"
+
+
+class Outcome(NamedTuple):
+    eligible: bool
+    eligibility_reason: Optional[str]
+    exclusion_reason: Optional[str]
+
+
+def _item(claim: Any, field: str) -> Any:
+    return claim.get(field)
+
+
+def cutoff(ref_date: date, days: int) -> datetime:
+    """Claims submitted strictly before this instant (UTC midnight) are older than ``days``."""
+    return datetime.combine(ref_date - timedelta(days=days), time.min, tzinfo=timezone.utc)
+
+
+def _compile_rule(rule: Rule, ref_date: date, getter: Callable[[Any, str], Any]) -> Callable[[Any], bool]:
+    field, value = rule.field, rule.value
+    if rule.op == "eq":
+        return lambda claim: getter(claim, field) == value
+    if rule.op == "present":
+        return lambda claim: bool(getter(claim, field))
+    if rule.op == "older_than_days":
+        # Same as (ref_date - submitted.date()).days > value, without per-row date math
+        limit = ref_date - timedelta(days=value)
+
+        def older(claim: Any) -> bool:
+            submitted = getter(claim, field)
+            return submitted is not None and submitted.date() < limit
+
+        return older
+    raise ValueError(f"unknown rule op: {rule.op}")
+
+
+def compile_predicate(
+    ref_date: date,
+    rules: Sequence[Rule] = ELIGIBILITY_RULES,
+    getter: Callable[[Any, str], Any] = _item,
+) -> Callable[[Any], bool]:
+    """Compile rules into a predicate; ``getter`` reads a field (dict item by default)."""
+    checks = [_compile_rule(rule, ref_date, getter) for rule in rules]
+
+    def predicate(claim: Any) -> bool:
+        for check in checks:
+            if not check(claim):
+                return False
+        return True
+
+    return predicate
+
+
+@lru_cache(maxsize=16)
+def predicate_for(ref_date: date, attrs: bool = False) -> Callable[[Any], bool]:
+    """Cached predicate for the standard rules; ``attrs=True`` reads attributes instead of keys."""
+    return compile_predicate(ref_date, getter=getattr if attrs else _item)
+
+
+def to_mongo_filter(ref_date: date, rules: Sequence[Rule] = ELIGIBILITY_RULES) -> Dict[str, Any]:
+    """Compile rules into a Mongo query filter (usable as a ``$match`` stage)."""
+    conditions: Dict[str, Any] = {}
+    for rule in rules:
+        if rule.op == "eq":
+            conditions[rule.field] = encode_value(rule.field, rule.value)
+        elif rule.op == "present":
+            conditions[rule.field] = {"$nin": [None, ""]}
+        elif rule.op == "older_than_days":
+            conditions[rule.field] = {"$lt": cutoff(ref_date, rule.value)}
+        else:
+            raise ValueError(f"unknown rule op: {rule.op}")
+    return conditions
+
+
+def match_stage(ref_date: date, extra: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    return [{"$match": {**(extra or {}), **to_mongo_filter(ref_date)}}]
+
+
+def forecast_filter(dataset_id: str, ref_date: date) -> Dict[str, Any]:
+    """Claims of a dataset that would be eligible if evaluated at ``ref_date``.
+
+    Relies on the stored classification, so it is answered by the
+    (dataset_id, classification_label, status, submitted_at) index.
+    """
+    return {
+        "dataset_id": dataset_id,
+        "classification_label": encode_value("classification_label", "retryable"),
+        "canonical_reason": {"$ne": None},
+        **to_mongo_filter(ref_date),
+    }
+
+
+def backfill_labels(db, dataset_id: str) -> int:  # type: ignore[no-untyped-def]
+    """Store the classification of claims ingested before it was stored.
+
+    ``forecast_filter`` matches on ``classification_label``, which such claims
+    lack. Their reasons are classified once (like /reclassify), a missing
+    ``canonical_reason`` is filled in and the rollups follow; eligibility is
+    left as ingested. A no-op, one index probe, once every claim is labelled.
+    """
+    missing = {"dataset_id": dataset_id, "classification_label": None}
+    if db["claims"].find_one(missing, {"_id": 1}) is None:
+        return 0
+    mode = get_settings().classifier_mode
+    resolved = resolve_reasons(db["claims"].distinct("denial_reason", missing), mode, db=db)
+    deltas = RollupDeltas() if is_rolled_up(db, dataset_id) else None
+    labelled = 0
+    items = db["claims"].find(
+        missing,
+        {"denial_reason": 1, "submitted_at": 1, "source_system": 1, "canonical_reason": 1, "eligibility": 1},
+    )
+    for c in items:
+        decode_claim(c)
+        cls = resolved.get(c.get("denial_reason")) or classify_reason(c.get("denial_reason"), mode=mode)
+        update: Dict[str, Any] = {"classification_label": cls.label}
+        if c.get("canonical_reason") is None and cls.canonical_reason is not None:
+            update["canonical_reason"] = cls.canonical_reason
+        # Guarded on the label, so a concurrent backfill counts each claim once
+        result = db["claims"].update_one({"_id": c["_id"], "classification_label": None}, {"$set": encode_claim(dict(update))})
+        if not result.modified_count:
+            continue
+        labelled += 1
+        if deltas is not None and "canonical_reason" in update:
+            deltas.claim(c, -1)
+            deltas.claim({**c, **update})
+    if deltas is not None:
+        deltas.apply(db, dataset_id)
+    logger.info("classification_labels_backfilled", dataset_id=dataset_id, claims=labelled)
+    return labelled
+
+
+def evaluate(passes_rules: bool, cls: Classification) -> Outcome:
+    if not passes_rules:
+        return Outcome(False, None, NOT_ELIGIBLE_BY_RULES)
+    if cls.label == "retryable" and cls.canonical_reason:
+        return Outcome(True, cls.canonical_reason, None)
+    if cls.label == "non-retryable":
+        return Outcome(False, None, cls.canonical_reason)
+    return Outcome(False, None, AMBIGUOUS)
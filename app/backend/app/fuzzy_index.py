@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import heapq
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, List, Mapping, Optional, Set
+
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Levenshtein
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    phrase: str
+    canonical: str
+    score: float  # 0..100
+    kind: str  # exact | full | partial | token_set
+
+
+class FuzzyIndex:
+    """Character n-gram inverted index over a phrase vocabulary.
+
+    Lookups generate a short candidate list from rare shared n-grams, then score
+    only those candidates with rapidfuzz (``score_cutoff`` lets it bail out early),
+    so cost grows with the number of *similar* phrases rather than vocabulary size.
+
+    Posting lists longer than ``max_postings`` are not counted. Below that size the
+    filter is exact; above it, very common grams make candidate generation
+    approximate in exchange for bounded per-lookup cost. Vocabularies smaller than
+    ``linear_below`` are simply scanned.
+    """
+
+    def __init__(
+        self,
+        phrases: Mapping[str, str],
+        ngram: int = 3,
+        max_candidates: int = 32,
+        max_postings: int = 2000,
+        linear_below: int = 1024,
+    ) -> None:
+        self.ngram = ngram
+        self.max_candidates = max_candidates
+        self.linear_below = linear_below
+        self._phrases: List[str] = []
+        self._canonical: List[str] = []
+        self._gram_counts: List[int] = []
+        self._lengths: List[int] = []
+        self._exact: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for phrase, canonical in phrases.items():
+            key = phrase.strip().lower()
+            if not key or key in self._exact:
+                continue
+            idx = len(self._phrases)
+            self._phrases.append(key)
+            self._canonical.append(canonical)
+            self._exact[key] = idx
+            self._lengths.append(len(key))
+            grams = self._grams(key)
+            self._gram_counts.append(len(grams))
+            for g in grams:
+                postings[g].append(idx)
+        self._postings = dict(postings)
+        self._max_postings = max_postings
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def _grams(self, text: str) -> Set[str]:
+        padded = f" {text} "
+        n = self.ngram
+        return {padded[i : i + n] for i in range(max(1, len(padded) - n + 1))}
+
+    def _full_candidates(self, text: str, cutoff: float) -> range | List[int]:
+        """Count filter over the q-gram index.
+
+        Normalized similarity >= s bounds the edit distance by d <= (1 - s) / s * len,
+        and each edit destroys at most ``ngram`` query grams, so a match shares at
+        least ``len(grams) - ngram * d`` of them. Very common grams are not counted
+        (their postings are the expensive ones); the threshold is lowered to match.
+        """
+        if len(self._phrases) <= self.linear_below:
+            return range(len(self._phrases))  # rapidfuzz's own scan is cheaper here
+        length = len(text)
+        grams = self._grams(text)
+        s = max(cutoff, 1.0) / 100
+        max_edits = int((1 - s) / s * length)
+        required = len(grams) - self.ngram * max_edits
+        if required <= 0:
+            return range(len(self._phrases))  # too short to filter; score everything
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        selective = [p for p in postings if len(p) <= self._max_postings]
+        need = required - (len(postings) - len(selective))
+        if need <= 0:
+            # Mostly common grams: any shared rare gram qualifies (approximate, but
+            # counting the common postings would cost as much as a linear scan)
+            need = 1
+        counts = Counter(chain.from_iterable(selective))
+        lo, hi = length * s, length / s
+        lengths = self._lengths
+        return [i for i, c in counts.items() if c >= need and lo <= lengths[i] <= hi]
+
+    def _partial_candidates(self, text: str) -> List[int]:
+        """Phrases whose grams are most contained in ``text`` (long free text)."""
+        if len(self._phrases) <= self.linear_below:
+            return list(range(len(self._phrases)))
+        grams = self._grams(text)
+        overlap: Dict[int, int] = defaultdict(int)
+        for g in grams:
+            posting = self._postings.get(g)
+            # Grams shared by a large share of the vocabulary carry no signal
+            if posting is None or len(posting) > self._max_postings:
+                continue
+            for idx in posting:
+                overlap[idx] += 1
+        sizes = self._gram_counts
+        return heapq.nlargest(self.max_candidates, overlap, key=lambda i: overlap[i] / sizes[i])
+
+    def lookup(
+        self,
+        text: str,
+        full_cutoff: float = 82.0,
+        partial_cutoff: Optional[float] = None,
+        token_set_cutoff: Optional[float] = None,
+        min_partial_len: int = 12,
+    ) -> Optional[FuzzyMatch]:
+        """Best match for ``text``, trying exact, whole-string, then partial matching.
+
+        ``full_cutoff`` is a normalized Levenshtein similarity (0..100). Partial and
+        token-set matching (off unless a cutoff is given) let long free-text messages
+        match a phrase they contain. A partial match must cover whole words of
+        ``text``, and phrases shorter than ``min_partial_len`` never match partially:
+        "missing mod" is 90% of "missing d(ocumentation)".
+        """
+        low = text.strip().lower()
+        if not low:
+            return None
+        exact = self._exact.get(low)
+        if exact is not None:
+            return self._match(exact, 100.0, "exact")
+
+        ids = self._full_candidates(low, full_cutoff)
+        choices = self._phrases if isinstance(ids, range) else {i: self._phrases[i] for i in ids}
+        best = process.extractOne(
+            low, choices, scorer=Levenshtein.normalized_similarity, score_cutoff=full_cutoff / 100
+        )
+        if best is not None:
+            return self._match(best[2], best[1] * 100, "full")
+
+        if partial_cutoff is None and token_set_cutoff is None:
+            return None
+        partial = {
+            i: self._phrases[i]
+            for i in self._partial_candidates(low)
+            if min_partial_len <= len(self._phrases[i]) < len(low)
+        }
+        if partial and partial_cutoff is not None:
+            for phrase, score, idx in process.extract(
+                low, partial, scorer=fuzz.partial_ratio, score_cutoff=partial_cutoff, limit=5
+            ):
+                if _word_aligned(phrase, low):
+                    return self._match(idx, score, "partial")
+        if partial and token_set_cutoff is not None:
+            best = process.extractOne(low, partial, scorer=fuzz.token_set_ratio, score_cutoff=token_set_cutoff)
+            if best is not None:
+                return self._match(best[2], best[1], "token_set")
+        return None
+
+    def scan(self, text: str, full_cutoff: float = 82.0) -> Optional[FuzzyMatch]:
+        """Linear whole-string scan over every phrase (reference for benchmarks)."""
+        best = process.extractOne(
+            text.strip().lower(),
+            self._phrases,
+            scorer=Levenshtein.normalized_similarity,
+            score_cutoff=full_cutoff / 100,
+        )
+        return self._match(best[2], best[1] * 100, "full") if best is not None else None
+
+    def _match(self, idx: int, score: float, kind: str) -> FuzzyMatch:
+        return FuzzyMatch(phrase=self._phrases[idx], canonical=self._canonical[idx], score=score, kind=kind)
+
+
+def _word_aligned(phrase: str, text: str) -> bool:
+    """Whether the best alignment of ``phrase`` in ``text`` starts and ends on word boundaries.
+
+    Rejects matches that end inside a word, like "incorrect npi" in
+    "incorrect p(rocedure code)".
+    """
+    alignment = fuzz.partial_ratio_alignment(phrase, text)
+    start, end = alignment.dest_start, alignment.dest_end
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start >= end:
+        return False
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
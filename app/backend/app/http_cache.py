@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from .db import dataset_filter
+
+# Clients may keep a copy but must revalidate it; with a current ETag that costs
+# one indexed lookup and an empty 304
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass
+class Validators:
+    """ETag and Last-Modified for one representation of a resource."""
+
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+        return headers
+
+    def fresh(self, request: Request) -> bool:
+        """Whether the client's copy is current (RFC 9110: If-None-Match wins)."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or _opaque(self.etag) in {_opaque(t) for t in if_none_match.split(",")}
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have whole seconds
+            return self.last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+        return False
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison, as GET requires: W/"x" and "x" match
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def dataset_validators(db, dataset_id: str, variant: str = "") -> Optional[Validators]:  # type: ignore[no-untyped-def]
+    """Validators from the dataset's ``version``: one lookup by ``_id``, or None if it does not exist."""
+    doc = db["datasets"].find_one(dataset_filter(dataset_id), {"version": 1, "modified_at": 1})
+    if doc is None:
+        return None
+    suffix = f".{variant}" if variant else ""
+    return Validators(etag=f'W/"{dataset_id}.{doc.get("version", 0)}{suffix}"', last_modified=doc.get("modified_at"))
+
+
+def datasets_list_validators(db) -> Validators:  # type: ignore[no-untyped-def]
+    """Validators for the dataset listing: a digest of every id and version (no full documents)."""
+    digest = hashlib.blake2b(digest_size=12)
+    modified: List[datetime] = []
+    for doc in db["datasets"].find({}, {"version": 1, "modified_at": 1}):
+        digest.update(f"{doc['_id']}:{doc.get('version', 0)};".encode())
+        if doc.get("modified_at") is not None:
+            modified.append(doc["modified_at"])
+    return Validators(etag=f'W/"datasets.{digest.hexdigest()}"', last_modified=max(modified, default=None))
+
+
+def not_modified(request: Request, validators: Optional[Validators]) -> Optional[Response]:
+    """An empty 304 when the client's copy is current, else None."""
+    if validators is not None and validators.fresh(request):
+        return Response(status_code=304, headers=validators.headers)
+    return None
+
+
+def with_validators(response: Response, validators: Optional[Validators]) -> Response:
+    if validators is not None:
+        response.headers.update(validators.headers)
+    return response
+
+
+def conditional_file(request: Request, path: str, media_type: str, filename: str) -> Response:
+    """FileResponse that answers a matching If-None-Match with 304 (from the file's stat, no read)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=f"{filename} has not been generated yet") from exc
+    response = FileResponse(path=path, media_type=media_type, filename=filename, stat_result=stat)
+    validators = Validators(etag=response.headers["etag"], last_modified=datetime.utcfromtimestamp(stat.st_mtime))
+    return not_modified(request, validators) or with_validators(response, validators)
@@ -0,0 +1,524 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from . import tracing
+from .accounting import IngestAccounting, current_accounting
+from .candidates import refresh_candidates
+from .classifier import classify_reason
+from .columnar import column_names, is_columnar, iter_rows, source_for_columns
+from .config import get_settings
+from .db import bump_version, dataset_filter, get_db
+from .jobs import track_ingest_job
+from .eligibility import evaluate, predicate_for
+from .metrics import processed_records
+from .progress import ProgressReporter
+from .records import ADAPTERS, Adapter, ClaimRecord, get_adapter
+from .rejections import RejectionAggregator
+from .rollups import roll_up_dataset
+from .sniff import Input, Layout, sniff
+from .storage import PAYLOADS_COLLECTION, prepare_claim_doc
+from .utils_normalize import StringTable, error_code
+
+
+logger = structlog.get_logger(__name__)
+
+
+class UnsupportedInput(ValueError):
+    """The file cannot be ingested as given (format, shape or source); maps to HTTP 400."""
+
+
+class TooManyRejections(UnsupportedInput):
+    """Fail-fast: the rejection rate shows the file is structurally broken."""
+
+
+@dataclass
+class IngestResult:
+    dataset_id: str
+    filename: str
+    source_system: str
+    accepted: int
+    rejected: int
+    bytes_read: int
+    seconds: float
+    rejection_codes: Dict[str, int] = field(default_factory=dict)
+
+
+def detect_source(filename: str, provided: Optional[str], data: Optional[Input] = None) -> str:
+    if provided:
+        return provided
+    if is_columnar(filename) and data is not None:
+        try:
+            return source_for_columns(column_names(data, filename))
+        except ImportError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            raise UnsupportedInput("Invalid Parquet/Arrow file") from exc
+    if filename.endswith(".csv"):
+        return "alpha"
+    if filename.endswith(".json"):
+        return "beta"
+    return "unknown"
+
+
+def read_rows(data: Input, filename: str, src: str, layout: Optional[Layout] = None) -> Iterator[Dict[str, Any]]:
+    layout = layout or Layout()
+    if is_columnar(filename) and src in ADAPTERS:
+        yield from iter_rows(data, filename)
+    elif src == "alpha" and filename.endswith(".csv"):
+        if isinstance(data, str):
+            with open(data, encoding=layout.encoding, errors="replace", newline="") as f:
+                yield from csv.DictReader(f, delimiter=layout.delimiter)
+        else:
+            text = data.decode(layout.encoding, errors="replace")
+            yield from csv.DictReader(io.StringIO(text, newline=""), delimiter=layout.delimiter)
+    elif src == "beta" and filename.endswith(".json"):
+        try:
+            if isinstance(data, str):
+                with open(data, "rb") as f:
+                    data = f.read()
+            # json detects UTF-8/16/32 from bytes itself; anything else is decoded first
+            items = json.loads(data if layout.encoding.startswith("utf") else data.decode(layout.encoding))
+        except json.JSONDecodeError as exc:
+            raise UnsupportedInput("Invalid JSON") from exc
+        if not isinstance(items, list):
+            raise UnsupportedInput("JSON must be an array of objects")
+        yield from items
+    else:
+        raise UnsupportedInput("Unsupported file for detected source")
+
+
+def claim_ops(norm: ClaimRecord, dataset_id: str) -> Tuple[Any, Optional[Any]]:
+    """Upserts for one claim (and its side payload), keyed by the natural key.
+
+    Upserts make replaying rows after the last checkpoint idempotent.
+    """
+    from pymongo import UpdateOne
+
+    denial = norm.denial_reason
+    classification = classify_reason(denial)
+    outcome = evaluate(predicate_for(get_settings().eligibility_reference_date, attrs=True)(norm), classification)
+
+    now = datetime.utcnow()
+    doc = {
+        "dataset_id": dataset_id,
+        "claim_id": norm.claim_id,
+        "patient_id": norm.patient_id,
+        "procedure_code": norm.procedure_code,
+        "denial_reason": denial,
+        "status": norm.status,
+        "submitted_at": norm.submitted_at,
+        "source_system": norm.source_system,
+        "classification_label": classification.label,
+        "canonical_reason": classification.canonical_reason,
+        "eligibility": outcome.eligible,
+        "eligibility_reason": outcome.eligibility_reason,
+        "exclusion_reason": outcome.exclusion_reason,
+        "updated_at": now,
+    }
+    doc, payload_doc = prepare_claim_doc(doc, norm.raw_payload)
+    key = {k: doc[k] for k in ("dataset_id", "claim_id", "source_system")}
+    claim_op = UpdateOne(key, {"$set": doc, "$setOnInsert": {"ingested_at": now}}, upsert=True)
+    payload_op = UpdateOne(key, {"$set": payload_doc}, upsert=True) if payload_doc is not None else None
+    return claim_op, payload_op
+
+
+class ClaimBatch:
+    """Buffers one batch of rows and writes it with one ``bulk_write`` per collection.
+
+    Rejected rows are counted per error code by ``rejections``; only sampled ones
+    are written, keyed by row offset so they are idempotent on replay as well.
+    """
+
+    def __init__(  # type: ignore[no-untyped-def]
+        self,
+        db,
+        dataset_id: str,
+        strings: Optional[StringTable] = None,
+        rejections: Optional[RejectionAggregator] = None,
+    ) -> None:
+        self.db = db
+        self.dataset_id = dataset_id
+        self.strings = strings
+        self.rejections = rejections if rejections is not None else RejectionAggregator()
+        self.claims: List[Any] = []
+        self.payloads: List[Any] = []
+        self.samples: List[Any] = []
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self.claims) + self.rejected
+
+    def add(self, row_offset: int, raw: Dict[str, Any], adapter: Adapter) -> None:
+        from pymongo import UpdateOne
+
+        try:
+            claim_op, payload_op = claim_ops(adapter(raw, self.strings), self.dataset_id)
+        except Exception as exc:  # noqa: BLE001
+            self.rejected += 1
+            code = error_code(exc)
+            if self.rejections.reject(code):
+                key = {"dataset_id": self.dataset_id, "row": row_offset}
+                doc = {**key, "raw_payload": raw, "code": code, "reason": str(exc), "created_at": datetime.utcnow()}
+                self.samples.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+            return
+        self.rejections.accept()
+        self.claims.append(claim_op)
+        if payload_op is not None:
+            self.payloads.append(payload_op)
+
+    def flush(self, samples_only: bool = False) -> Tuple[int, int]:
+        """Write the batch; returns (accepted, rejected).
+
+        ``samples_only`` drops the buffered claims and keeps just the rejection
+        samples (an aborted ingest still shows why it was aborted).
+        """
+        if samples_only:
+            self.claims, self.payloads = [], []
+        # Ordered: repeated claim ids within a batch apply in file order
+        if self.claims:
+            self.db["claims"].bulk_write(self.claims, ordered=True)
+        if self.payloads:
+            self.db[PAYLOADS_COLLECTION].bulk_write(self.payloads, ordered=True)
+        if self.samples:
+            self.db["rejections"].bulk_write(self.samples, ordered=False)
+        accounting = current_accounting()
+        if accounting is not None:
+            accounting.write_ops += len(self.claims) + len(self.payloads) + len(self.samples)
+        counts = (len(self.claims), self.rejected)
+        self.claims, self.payloads, self.samples = [], [], []
+        self.rejected = 0
+        return counts
+
+
+def create_dataset(  # type: ignore[no-untyped-def]
+    db,
+    filename: str,
+    src: str,
+    uploaded_by: Optional[str] = None,
+    source_path: Optional[str] = None,
+    layout: Optional[Layout] = None,
+) -> str:
+    # Create a dataset document for auditability and progress tracking. Only datasets
+    # with a retained source file (``source_path``) can be resumed after a crash.
+    now = datetime.utcnow()
+    dataset_doc = {
+        "filename": os.path.basename(filename),
+        "source_system": src,
+        "uploaded_by": uploaded_by,
+        "uploaded_at": now,
+        "record_count": 0,
+        "rejected_count": 0,
+        "metrics_json": None,
+        "status": "ingesting",
+        "source_path": source_path,
+        "layout": layout.to_doc() if layout else None,
+        "checkpoint_offset": 0,
+        "heartbeat_at": now,
+        "version": 1,
+        "modified_at": now,
+    }
+    return str(db["datasets"].insert_one(dataset_doc).inserted_id)
+
+
+@contextmanager
+def keep_alive(db, key: Dict[str, Any]) -> Iterator[None]:  # type: ignore[no-untyped-def]
+    """Refresh the dataset's ``heartbeat_at`` while a long step without batches runs.
+
+    Candidates ``$merge`` and rollups over a large dataset can outlast
+    ``ingest_stale_after_s``; without this another worker would resume the
+    ingest and refresh candidates concurrently.
+    """
+    stop = threading.Event()
+    interval = max(get_settings().ingest_stale_after_s / 3, 0.01)
+
+    def beat() -> None:
+        db["datasets"].update_one(key, {"$set": {"heartbeat_at": datetime.utcnow()}})
+
+    def loop() -> None:
+        while not stop.wait(interval):
+            try:
+                beat()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("ingest_heartbeat_failed", error=str(exc))
+
+    beat()
+    thread = threading.Thread(target=loop, name="ingest-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_ingest(  # type: ignore[no-untyped-def]
+    db,
+    dataset_id: str,
+    data: Input,
+    filename: str,
+    src: str,
+    start_offset: int = 0,
+    accepted: int = 0,
+    rejected: int = 0,
+    rejection_codes: Optional[Dict[str, int]] = None,
+    layout: Optional[Layout] = None,
+    accounting: Optional[IngestAccounting] = None,
+) -> IngestResult:
+    """Process rows from ``start_offset`` on, checkpointing after every batch.
+
+    The checkpoint (row offset plus running counts) is written only after the
+    batch it covers has been committed, so resuming never skips a row; rows
+    replayed after a crash are upserts. Raises ``TooManyRejections`` before
+    committing a batch once the file's rejection rate crosses the fail-fast
+    threshold. What the run cost (``app.accounting``) is stored on the dataset
+    as ``resources``.
+    """
+    accounting = accounting or IngestAccounting(src)
+    with accounting.active(), tracing.span(
+        "ingest", dataset_id=dataset_id, source_system=src, resumed_from=start_offset or None
+    ):
+        return _ingest_rows(
+            db, dataset_id, data, filename, src, start_offset, accepted, rejected, rejection_codes, layout, accounting
+        )
+
+
+def _ingest_rows(  # type: ignore[no-untyped-def]
+    db,
+    dataset_id: str,
+    data: Input,
+    filename: str,
+    src: str,
+    start_offset: int,
+    accepted: int,
+    rejected: int,
+    rejection_codes: Optional[Dict[str, int]],
+    layout: Optional[Layout],
+    accounting: IngestAccounting,
+) -> IngestResult:
+    start = time.perf_counter()
+    size = os.path.getsize(data) if isinstance(data, str) else len(data)
+    settings = get_settings()
+    key = dataset_filter(dataset_id)
+    adapter = get_adapter(src)
+    aggregator = RejectionAggregator(rejection_codes)
+    batch = ClaimBatch(db, dataset_id, StringTable(), aggregator)
+    progress = ProgressReporter(dataset_id, start_offset=start_offset)
+
+    def commit(next_offset: int) -> None:
+        nonlocal accepted, rejected
+        if aggregator.broken():
+            raise TooManyRejections(f"File looks malformed: {aggregator.describe()}")
+        with accounting.stage("write"):
+            ok, rej = batch.flush()
+        accepted += ok
+        rejected += rej
+        processed_records.labels(source_system=src, result="accepted").inc(ok)
+        processed_records.labels(source_system=src, result="rejected").inc(rej)
+        with accounting.stage("checkpoint"):
+            db["datasets"].update_one(key, bump_version({"$set": {
+                "checkpoint_offset": next_offset,
+                "record_count": accepted,
+                "rejected_count": rejected,
+                "rejection_codes": aggregator.counts,
+                "heartbeat_at": datetime.utcnow(),
+            }}))
+        progress.update("ingesting", next_offset, accepted, rejected)
+
+    def finish(loop_s: float) -> Dict[str, Any]:
+        # Reading, normalizing and classifying is whatever the row loop did besides writing
+        written = accounting.stages.get("write", 0.0) + accounting.stages.get("checkpoint", 0.0)
+        accounting.stages["parse"] = max(loop_s - written, 0.0)
+        return accounting.finish(next_offset - start_offset, size)
+
+    next_offset = start_offset
+    loop_start = time.perf_counter()
+    try:
+        rows = islice(read_rows(data, filename, src, layout), start_offset, None)
+        for offset, row in enumerate(rows, start_offset):
+            batch.add(offset, row, adapter)
+            next_offset = offset + 1
+            if len(batch) >= settings.ingest_batch_size:
+                commit(next_offset)
+        if len(batch):
+            commit(next_offset)
+
+        loop_s = time.perf_counter() - loop_start
+        progress.update("candidates", next_offset, accepted, rejected, force=True)
+        with keep_alive(db, key):
+            with accounting.stage("candidates"):
+                refresh_candidates(db, dataset_id)
+            with accounting.stage("rollups"):
+                roll_up_dataset(db, dataset_id)
+        resources = finish(loop_s)
+        db["datasets"].update_one(key, bump_version({"$set": {
+            "status": "ingested",
+            "record_count": accepted,
+            "rejected_count": rejected,
+            "resources": resources,
+        }}))
+    except UnsupportedInput as exc:
+        if isinstance(exc, TooManyRejections):
+            batch.flush(samples_only=True)
+        db["datasets"].update_one(key, bump_version({"$set": {
+            "status": "failed",
+            "error": str(exc),
+            "rejection_codes": aggregator.counts,
+            "resources": finish(time.perf_counter() - loop_start),
+        }}))
+        progress.update("failed", next_offset, accepted, rejected, force=True, error=str(exc))
+        raise
+    except Exception as exc:
+        # A write error or a bug, not the file: fail visibly instead of staying
+        # "ingesting", but keep the checkpoint so a retried finalize continues from it
+        logger.exception("dataset_ingest_failed", dataset_id=dataset_id, offset=next_offset)
+        progress.update("failed", next_offset, accepted, rejected, force=True, error=str(exc) or type(exc).__name__)
+        try:
+            db["datasets"].update_one(key, bump_version({"$set": {
+                "status": "failed",
+                "error": str(exc) or type(exc).__name__,
+                "resumable": True,
+            }}))
+        except Exception:  # noqa: BLE001
+            pass  # Mongo itself is failing; a resumable ingest is picked up again once stale
+        raise
+    progress.update("ingested", next_offset, accepted, rejected, force=True)
+
+    logger.info(
+        "dataset_ingested",
+        dataset_id=dataset_id,
+        filename=os.path.basename(filename),
+        source_system=src,
+        accepted=accepted,
+        rejected=rejected,
+        rejection_codes=aggregator.counts or None,
+        resumed_from=start_offset or None,
+        wall_s=resources["wall_s"],
+        cpu_s=resources["cpu_s"],
+        rows_per_s=resources["rows_per_s"],
+    )
+    return IngestResult(
+        dataset_id=dataset_id,
+        filename=os.path.basename(filename),
+        source_system=src,
+        accepted=accepted,
+        rejected=rejected,
+        bytes_read=size,
+        seconds=time.perf_counter() - start,
+        rejection_codes=aggregator.counts,
+    )
+
+
+def ingest_dataset(  # type: ignore[no-untyped-def]
+    db,
+    data: Input,
+    filename: str,
+    source_system: Optional[str] = None,
+    uploaded_by: Optional[str] = None,
+    source_path: Optional[str] = None,
+) -> IngestResult:
+    """Normalize, classify and persist one file as a new dataset.
+
+    Shared by ``POST /api/datasets`` and the bulk-ingest CLI. Raises
+    ``SchemaMismatch`` (from sniffing, before anything is written) for files
+    that do not fit their source, ``UnsupportedInput`` for files that cannot be
+    read and ``ImportError`` when a columnar format is used without pyarrow.
+    """
+    src = detect_source(filename, source_system, data)
+    accounting = IngestAccounting(src)
+    with tracing.span("ingest_dataset", filename=os.path.basename(filename), source_system=src):
+        with accounting.stage("sniff"):
+            layout = sniff(data, filename, src)
+        dataset_id = create_dataset(db, filename, src, uploaded_by, source_path, layout)
+        return run_ingest(db, dataset_id, data, filename, src, layout=layout, accounting=accounting)
+
+
+def claim_for_resume(db, dataset_id: str) -> Optional[Dict[str, Any]]:  # type: ignore[no-untyped-def]
+    """Atomically take over an interrupted ingest (no checkpoint progress for
+    ``ingest_stale_after_s``) or one that failed on an error other than its file.
+    Returns the dataset document, or None if it is finished, not resumable, or
+    still being worked on by someone else."""
+    stale = datetime.utcnow() - timedelta(seconds=get_settings().ingest_stale_after_s)
+    return db["datasets"].find_one_and_update(
+        {
+            **dataset_filter(dataset_id),
+            "source_path": {"$ne": None},
+            "$or": [{"status": "ingesting", "heartbeat_at": {"$lt": stale}}, {"status": "failed", "resumable": True}],
+        },
+        bump_version({"$set": {"status": "ingesting", "heartbeat_at": datetime.utcnow()}, "$unset": {"error": "", "resumable": ""}}),
+    )
+
+
+def resume_dataset(db, doc: Dict[str, Any]) -> IngestResult:  # type: ignore[no-untyped-def]
+    """Continue a claimed dataset from its checkpoint."""
+    path = doc["source_path"]
+    if not os.path.exists(path):
+        db["datasets"].update_one({"_id": doc["_id"]}, bump_version({"$set": {"status": "failed"}}))
+        raise UnsupportedInput("source file for this dataset is no longer available")
+    logger.info("dataset_ingest_resumed", dataset_id=str(doc["_id"]), offset=doc.get("checkpoint_offset", 0))
+    return run_ingest(
+        db,
+        str(doc["_id"]),
+        path,
+        doc["filename"],  # format comes from the original name, not the spool file
+        doc["source_system"],
+        start_offset=doc.get("checkpoint_offset", 0),
+        accepted=doc.get("record_count", 0),
+        rejected=doc.get("rejected_count", 0),
+        rejection_codes=doc.get("rejection_codes"),
+        layout=Layout.from_doc(doc.get("layout")),
+    )
+
+
+def complete_upload(db, dataset_id: str, source_path: Optional[str]) -> None:  # type: ignore[no-untyped-def]
+    """Mark the chunked upload behind a dataset complete and drop its spool file."""
+    db["uploads"].update_one({"dataset_id": dataset_id}, {"$set": {"status": "complete"}})
+    spool_dir = os.path.abspath(get_settings().upload_spool_dir)
+    if source_path and os.path.abspath(source_path).startswith(spool_dir + os.sep):
+        try:
+            os.remove(source_path)
+        except FileNotFoundError:
+            pass
+
+
+def resume_stale_ingests(db) -> int:  # type: ignore[no-untyped-def]
+    """Resume every interrupted, resumable ingest that nobody is working on."""
+    resumed = 0
+    for doc in list(db["datasets"].find({"status": "ingesting", "source_path": {"$ne": None}}, {"_id": 1})):
+        claimed = claim_for_resume(db, str(doc["_id"]))
+        if claimed is None:
+            continue
+        try:
+            with track_ingest_job():
+                resume_dataset(db, claimed)
+            complete_upload(db, str(doc["_id"]), claimed["source_path"])
+            resumed += 1
+        except Exception:  # noqa: BLE001
+            logger.exception("dataset_resume_failed", dataset_id=str(doc["_id"]))
+    return resumed
+
+
+async def resume_stale_ingests_forever() -> None:
+    """Background loop: pick up ingests left behind by a crashed or killed worker."""
+    interval = get_settings().ingest_stale_after_s
+    while True:
+        try:
+            count = await asyncio.to_thread(resume_stale_ingests, get_db())
+            if count:
+                logger.info("stale_ingests_resumed", count=count)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("stale_ingest_scan_failed", error=str(exc))
+        await asyncio.sleep(interval)
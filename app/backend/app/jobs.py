@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from .metrics import ingest_jobs_in_flight
+
+
+_inflight = 0
+_idle = threading.Condition()
+
+
+@contextmanager
+def track_ingest_job() -> Iterator[None]:
+    """Mark an ingest as in flight so shutdown can wait for it to finish."""
+    global _inflight
+    with _idle:
+        _inflight += 1
+    ingest_jobs_in_flight.inc()
+    try:
+        yield
+    finally:
+        ingest_jobs_in_flight.dec()
+        with _idle:
+            _inflight -= 1
+            if _inflight == 0:
+                _idle.notify_all()
+
+
+def inflight_ingest_jobs() -> int:
+    return _inflight
+
+
+def drain_ingest_jobs(timeout: float) -> bool:
+    """Block until no ingest is running or ``timeout`` elapses. Returns True when drained."""
+    deadline = time.monotonic() + timeout
+    with _idle:
+        while _inflight > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _idle.wait(remaining)
+    return True
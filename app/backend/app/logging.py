@@ -1,44 +1,218 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, TextIO
+
+import orjson
 import structlog
 
+from .config import get_settings
+from .metrics import log_events_dropped
+from .tracing import add_trace_ids
+
 
 _logging_configured = False
+_configured_pid: Optional[int] = None
+_handler: Optional[QueueHandler] = None
+_listener: Optional[_LineWriter] = None
+_stream: TextIO = sys.stdout
+
+
+def _dumps(obj: Any, **kwargs: Any) -> str:
+    # JSONRenderer passes ``default`` (repr for unknown types); orjson handles datetimes itself
+    return orjson.dumps(obj, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+class EventThrottle:
+    """structlog processor that rate-limits and samples high-frequency events.
+
+    ``rate_limits`` caps an event name at N per second; the first one written
+    after a drop carries ``suppressed`` with the number dropped. ``sample_rates``
+    keeps that fraction of an event, tagged ``sample_rate`` so counts can be
+    scaled back up. Errors and unlisted events always pass.
+    """
+
+    def __init__(self, rate_limits: Dict[str, float], sample_rates: Dict[str, float]) -> None:
+        self.rate_limits = dict(rate_limits)
+        self.sample_rates = dict(sample_rates)
+        # event -> [window start, written in window, suppressed since last write]
+        self._windows: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, _logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        event = event_dict.get("event")
+        if method_name in ("error", "exception", "critical") or not isinstance(event, str):
+            return event_dict
+        rate = self.sample_rates.get(event)
+        if rate is not None:
+            if random.random() >= rate:
+                log_events_dropped.labels(reason="sampled").inc()
+                raise structlog.DropEvent
+            event_dict["sample_rate"] = rate
+        limit = self.rate_limits.get(event)
+        if limit is None:
+            return event_dict
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(event, [now, 0, 0])
+            if now - window[0] >= 1.0:
+                window[0], window[1] = now, 0
+            if window[1] >= limit:
+                window[2] += 1
+                suppressed = -1
+            else:
+                window[1] += 1
+                suppressed, window[2] = int(window[2]), 0
+        if suppressed < 0:
+            log_events_dropped.labels(reason="rate_limited").inc()
+            raise structlog.DropEvent
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        return event_dict
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: when the writer is behind, the line is dropped and counted."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(queue.SimpleQueue())
+        self.maxsize = maxsize
+
+    def enqueue(self, record: Any) -> None:
+        if self.queue.qsize() >= self.maxsize:
+            log_events_dropped.labels(reason="queue_full").inc()
+            return
+        self.queue.put_nowait(record)
+
+
+class _LineWriter(QueueListener):
+    """Writes whatever is queued in one ``write`` and ``flush`` per batch.
+
+    structlog lines are queued as rendered strings; stdlib records arrive
+    already formatted by the handler.
+    """
 
+    batch_size = 512
 
-def configure_logging() -> None:
-    """Configure logging in an idempotent way to avoid reload conflicts."""
-    global _logging_configured
-    
-    # Skip if already configured (prevents issues on reload)
-    if _logging_configured:
+    def __init__(self, handler: _DroppingQueueHandler, stream: TextIO) -> None:
+        super().__init__(handler.queue)
+        self.stream = stream
+        self._stopping = False
+
+    def dequeue(self, block: bool) -> Any:
+        if self._stopping:
+            return self._sentinel
+        lines = [self.queue.get(block)]
+        while len(lines) < self.batch_size:
+            try:
+                lines.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for i, line in enumerate(lines):
+            if line is self._sentinel:
+                # Write what came before ``stop``; the next call ends the thread
+                del lines[i:]
+                self._stopping = True
+                break
+        return lines or self._sentinel
+
+    def handle(self, lines: List[Any]) -> None:  # type: ignore[override]
+        try:
+            self.stream.write("".join(
+                (line if isinstance(line, str) else line.getMessage()) + "\n" for line in lines
+            ))
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass  # stdout closed or broken; nothing left to report to
+
+
+class _QueueLogger:
+    """structlog's output end: hands each rendered line to the writer thread.
+
+    Looks the handler up per call: loggers cached before a fork or a
+    reconfiguration must not keep feeding a queue nobody drains.
+    """
+
+    def msg(self, message: str) -> None:
+        if _listener is not None and _handler is not None:
+            _handler.enqueue(message)
+        else:
+            # No writer (before configuration or after shutdown at exit)
+            _stream.write(message + "\n")
+
+    debug = info = warning = warn = error = critical = exception = fatal = log = msg
+
+
+def configure_logging(stream: Optional[TextIO] = None) -> None:
+    """Configure logging in an idempotent way to avoid reload conflicts.
+
+    Events are rendered to JSON with orjson on the calling thread, then written
+    to ``stream`` (stdout) by a ``QueueListener`` thread, so request and ingest
+    threads never wait on log I/O. Stdlib logging records share the queue.
+    """
+    global _logging_configured, _configured_pid, _handler, _listener, _stream
+
+    # Skip if already configured (prevents issues on reload); a forked child
+    # has no writer thread and sets up its own
+    if _logging_configured and _configured_pid == os.getpid():
         return
-    
+
     # Clear any existing configuration
     structlog.reset_defaults()
-    
+    root = logging.getLogger()
+    if _handler is not None and _handler in root.handlers:
+        root.removeHandler(_handler)
+
+    settings = get_settings()
+    level = logging.getLevelName(settings.log_level.upper())
     timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
 
+    _stream = stream or sys.stdout
+    _handler = _DroppingQueueHandler(settings.log_queue_size)
+    # Stdlib records are formatted as basicConfig did before they are queued
+    _handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    _listener = _LineWriter(_handler, _stream)
+    _listener.start()
+
     structlog.configure(
         processors=[
+            EventThrottle(settings.log_rate_limits, settings.log_sample_rates),
             structlog.processors.add_log_level,
             timestamper,
+            add_trace_ids,
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.dict_tracebacks,
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_dumps),
         ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=lambda *args: _QueueLogger(),
         cache_logger_on_first_use=True,
     )
 
-    # Only configure basic logging if not already done
-    if not logging.getLogger().handlers:
-        logging.basicConfig(stream=sys.stdout, level=logging.INFO)
-    
-    _logging_configured = True
+    # Only route stdlib logging if nothing else has configured it
+    if not root.handlers:
+        root.addHandler(_handler)
+        root.setLevel(level)
 
+    if _configured_pid is None:
+        atexit.register(shutdown_logging)
+    _logging_configured = True
+    _configured_pid = os.getpid()
 
 
+def shutdown_logging() -> None:
+    """Write out queued lines and stop the writer thread (also run at exit)."""
+    global _logging_configured, _listener
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+    _logging_configured = False
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -8,20 +9,37 @@ from fastapi.responses import ORJSONResponse
 
 from .config import Settings, get_settings
 from .logging import configure_logging
-from .db import create_indexes
-from .metrics import instrument_app
-from .routers import datasets, reclassify, pipeline, metrics as metrics_router
+from .db import close_mongo, connect_mongo
+from .ingest import resume_stale_ingests_forever
+from .jobs import drain_ingest_jobs, inflight_ingest_jobs
+from .metrics import instrument_app, mark_worker_exited
+from .progress import broker
+from .readiness import create_indexes_in_background
+from .retention import retention_forever
+from .tracing import configure_tracing, instrument_app as instrument_tracing, shutdown_tracing
+from .routers import datasets, health, reclassify, pipeline, profiles, trends, uploads, metrics as metrics_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logging()
-    # Make startup resilient even if Mongo is not yet reachable
-    try:
-        create_indexes()
-    except Exception as exc:  # noqa: BLE001
-        import logging
-        logging.getLogger(__name__).warning("MongoDB not reachable on startup: %s", exc)
+    exposed = get_settings().exposed_private_dirs()
+    if exposed:
+        raise RuntimeError(f"{', '.join(exposed).upper()} must not be inside ARTIFACTS_DIR, which is served publicly")
+    # Before the Mongo client exists, so it is created with the command span listener
+    configure_tracing()
+    # One pooled client per worker process, created after the server has forked
+    connect_mongo()
+    # Ingests run in the threadpool and hand progress events to this loop
+    broker.bind(asyncio.get_running_loop())
+    # Index creation runs in the background; /ready reports 503 until it has succeeded,
+    # so an unreachable Mongo no longer blocks startup for the server-selection timeout
+    index_task = asyncio.create_task(create_indexes_in_background())
+    # Continue chunked-upload ingests interrupted by a crash, from their checkpoint (the bulk
+    # ingest CLI keeps its own per-file checkpoint and re-ingests unfinished files)
+    resume_task = asyncio.create_task(resume_stale_ingests_forever())
+    # Archive datasets past retention_days and finish interrupted deletes
+    retention_task = asyncio.create_task(retention_forever())
     # Ensure artifacts directory exists to avoid StaticFiles mount errors on Windows reloads
     try:
         from .config import get_settings as _gs
@@ -30,7 +48,21 @@ async def lifespan(app: FastAPI):
     except Exception as exc:  # noqa: BLE001
         import logging
         logging.getLogger(__name__).warning("Could not ensure artifacts dir exists: %s", exc)
-    yield
+    try:
+        yield
+    finally:
+        index_task.cancel()
+        resume_task.cancel()
+        retention_task.cancel()
+        # Let ingests that outlived their request finish before the client goes away
+        if inflight_ingest_jobs():
+            import logging
+            logging.getLogger(__name__).info("Draining %d in-flight ingest job(s)", inflight_ingest_jobs())
+            await asyncio.to_thread(drain_ingest_jobs, get_settings().server_graceful_timeout_s)
+        broker.bind(None)
+        close_mongo()
+        shutdown_tracing()
+        mark_worker_exited()
 
 
 def create_app() -> FastAPI:
@@ -61,7 +93,11 @@ def create_app() -> FastAPI:
     app.include_router(datasets.router, prefix="/api")
     app.include_router(reclassify.router, prefix="/api")
     app.include_router(pipeline.router, prefix="/api")
+    app.include_router(uploads.router, prefix="/api")
+    app.include_router(trends.router, prefix="/api")
+    app.include_router(profiles.router, prefix="/api")
     app.include_router(metrics_router.router)
+    app.include_router(health.router)
 
     # Serve artifacts statically for downloads
     from fastapi.staticfiles import StaticFiles
@@ -70,6 +106,7 @@ def create_app() -> FastAPI:
     app.mount("/artifacts", StaticFiles(directory=_gs().artifacts_dir, check_dir=False), name="artifacts")
 
     instrument_app(app)
+    instrument_tracing(app)
     return app
 
 
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import os
+
 from fastapi import APIRouter
 from fastapi import Request
 from fastapi.responses import PlainTextResponse
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 
 
 router = APIRouter()
@@ -25,10 +35,129 @@ classifier_decisions = Counter(
     labelnames=("label", "mode"),
 )
 
+# Log events not written: "rate_limited"/"sampled" by the throttle, "queue_full" when
+# the background writer falls behind (app.logging)
+log_events_dropped = Counter(
+    "log_events_dropped_total",
+    "Log events dropped before reaching the log output",
+    labelnames=("reason",),
+)
+
+# Documents removed by dataset archiving/deletion (app.retention), per collection
+retention_deleted_documents = Counter(
+    "retention_deleted_documents_total",
+    "Documents deleted by dataset retention and explicit deletes",
+    labelnames=("collection",),
+)
+
+# Per-ingest cost by source system (app.accounting), for capacity planning
+_INGEST_SECONDS = (0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+ingest_wall_seconds = Histogram(
+    "ingest_wall_seconds",
+    "Wall time of one dataset ingest",
+    labelnames=("source_system",),
+    buckets=_INGEST_SECONDS,
+)
+
+ingest_cpu_seconds = Histogram(
+    "ingest_cpu_seconds",
+    "CPU time of the thread running one dataset ingest",
+    labelnames=("source_system",),
+    buckets=_INGEST_SECONDS,
+)
+
+ingest_stage_seconds = Histogram(
+    "ingest_stage_seconds",
+    "Wall time per ingest stage",
+    labelnames=("source_system", "stage"),
+    buckets=_INGEST_SECONDS,
+)
+
+ingest_bytes_read = Histogram(
+    "ingest_bytes_read",
+    "Size of ingested files in bytes",
+    labelnames=("source_system",),
+    buckets=(1e4, 1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9, 1e10),
+)
+
+ingest_rows_per_second = Histogram(
+    "ingest_rows_per_second",
+    "Ingest throughput",
+    labelnames=("source_system",),
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+ingest_mongo_commands = Histogram(
+    "ingest_mongo_commands",
+    "MongoDB commands issued by one dataset ingest",
+    labelnames=("source_system",),
+    buckets=(1, 10, 100, 1000, 10000, 100000),
+)
+
+ingest_memory_peak_bytes = Histogram(
+    "ingest_memory_peak_bytes",
+    "Peak traced memory (INGEST_TRACEMALLOC) or growth of peak RSS during one ingest",
+    labelnames=("source_system",),
+    buckets=(1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 4e9),
+)
+
+# Gauges use "livesum" so multi-worker deployments report the total across live workers
+ingest_jobs_in_flight = Gauge(
+    "ingest_jobs_in_flight",
+    "Dataset ingests currently running",
+    multiprocess_mode="livesum",
+)
+
+mongo_pool_connections = Gauge(
+    "mongo_pool_connections",
+    "Open connections in the MongoDB pool",
+    labelnames=("address",),
+    multiprocess_mode="livesum",
+)
+
+mongo_pool_checked_out = Gauge(
+    "mongo_pool_checked_out_connections",
+    "Connections currently checked out of the MongoDB pool",
+    labelnames=("address",),
+    multiprocess_mode="livesum",
+)
+
+mongo_pool_checkout_wait = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the MongoDB pool",
+    labelnames=("address",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+)
+
+mongo_pool_checkout_failures = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Failed connection check-outs by reason",
+    labelnames=("address", "reason"),
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> bytes:
+    """Render metrics for this process, or aggregated across workers in multiprocess mode."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_worker_exited() -> None:
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
 
 @router.get("/api/metrics", response_class=PlainTextResponse)
 def metrics() -> PlainTextResponse:
-    return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 def instrument_app(app) -> None:  # type: ignore[no-untyped-def]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+from pymongo import monitoring
+
+from . import tracing
+from .accounting import current_accounting
+from .metrics import (
+    mongo_pool_checked_out,
+    mongo_pool_checkout_failures,
+    mongo_pool_checkout_wait,
+    mongo_pool_connections,
+)
+
+
+def _address(event) -> str:  # type: ignore[no-untyped-def]
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Export CMAP (connection monitoring and pooling) events as Prometheus metrics."""
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        mongo_pool_connections.labels(address=_address(event)).set(0)
+        mongo_pool_checked_out.labels(address=_address(event)).set(0)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        mongo_pool_connections.labels(address=_address(event)).set(0)
+        mongo_pool_checked_out.labels(address=_address(event)).set(0)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        mongo_pool_connections.labels(address=_address(event)).inc()
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        mongo_pool_connections.labels(address=_address(event)).dec()
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        mongo_pool_checkout_failures.labels(address=_address(event), reason=str(event.reason)).inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongo_pool_checkout_wait.labels(address=_address(event)).observe(duration)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        mongo_pool_checked_out.labels(address=_address(event)).inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongo_pool_checkout_wait.labels(address=_address(event)).observe(duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_pool_checked_out.labels(address=_address(event)).dec()
+
+
+class CommandCountListener(monitoring.CommandListener):
+    """Attribute MongoDB commands to the ingest running in the issuing thread."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        accounting = current_accounting()
+        if accounting is not None:
+            accounting.count_command(event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+class CommandTracingListener(monitoring.CommandListener):
+    """One client span per MongoDB command, parented to the span that issued it.
+
+    Command documents are not recorded: they carry claim data.
+    """
+
+    def __init__(self) -> None:
+        self._spans: Dict[Tuple[int, Any], Any] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        host, port = event.connection_id
+        span = tracing.start_span(
+            f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name,
+            kind="CLIENT",
+            **{
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": collection if isinstance(collection, str) else None,
+                "server.address": host,
+                "server.port": port,
+            },
+        )
+        if span is not None:
+            self._spans[(event.request_id, event.connection_id)] = span
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            span.end()
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            tracing.set_error(span, str(event.failure.get("errmsg", "command failed")))
+            span.end()
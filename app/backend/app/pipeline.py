@@ -1,40 +1,53 @@
 from __future__ import annotations
 
 from prefect import flow, task
-from sqlmodel import select
 
-from .db import get_session
-from .models import Dataset, Claim
+from .db import get_db
+from .candidates import refresh_candidates
 from .classifier import classify_reason
 from .config import get_settings
+from .eligibility import evaluate, predicate_for
+from .rollups import RollupDeltas, is_rolled_up
+from .storage import decode_claim, encode_claim
 
 
 @task
-def task_classify(dataset_id: int) -> int:
+def task_classify(dataset_id: str) -> int:
     settings = get_settings()
     updated = 0
-    with get_session() as session:
-        items = session.exec(select(Claim).where(Claim.dataset_id == dataset_id)).all()
-        for c in items:
-            cls = classify_reason(c.denial_reason, mode=settings.classifier_mode)
-            if c.status == "denied" and c.patient_id and c.submitted_at.date() < settings.eligibility_reference_date:
-                c.eligibility = cls.label == "retryable" and bool(cls.canonical_reason)
-                c.eligibility_reason = cls.canonical_reason if c.eligibility else None
-                c.exclusion_reason = None if c.eligibility else (cls.canonical_reason or "Ambiguous")
-            else:
-                c.eligibility = False
-                c.eligibility_reason = None
-                c.exclusion_reason = "Not eligible by rules"
-            session.add(c)
-            updated += 1
-        session.commit()
+    db = get_db()
+    passes_rules = predicate_for(settings.eligibility_reference_date)
+    items = db["claims"].find(
+        {"dataset_id": str(dataset_id)},
+        {
+            "denial_reason": 1, "status": 1, "patient_id": 1, "submitted_at": 1,
+            "source_system": 1, "canonical_reason": 1, "eligibility": 1,
+        },
+    )
+    # Same old/new key deltas as /reclassify, so trends follow the new labels
+    deltas = RollupDeltas() if is_rolled_up(db, str(dataset_id)) else None
+    for c in items:
+        decode_claim(c)
+        cls = classify_reason(c.get("denial_reason"), mode=settings.classifier_mode)
+        outcome = evaluate(passes_rules(c), cls)
+        db["claims"].update_one({"_id": c["_id"]}, {"$set": encode_claim({
+            "classification_label": cls.label,
+            "canonical_reason": cls.canonical_reason,
+            "eligibility": outcome.eligible,
+            "eligibility_reason": outcome.eligibility_reason,
+            "exclusion_reason": outcome.exclusion_reason,
+        })})
+        if deltas is not None:
+            deltas.claim(c, -1)
+            deltas.claim({**c, "canonical_reason": cls.canonical_reason, "eligibility": outcome.eligible})
+        updated += 1
+    refresh_candidates(db, str(dataset_id))
+    if deltas is not None:
+        deltas.apply(db, str(dataset_id))
     return updated
 
 
 @flow
-def flow_ingest_and_classify(dataset_id: int) -> dict[str, int]:
+def flow_ingest_and_classify(dataset_id: str) -> dict[str, int]:
     updated = task_classify(dataset_id)
     return {"classified": updated}
-
-
-
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import Header, HTTPException, Query
+import structlog
+
+from .config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# "sample": wall-clock stack sampler only (cheap enough for 1-in-N sampling);
+# "cprofile": also deterministic cProfile stats (slower; explicit admin requests)
+MODES = ("sample", "cprofile")
+
+_requests = itertools.count(1)
+# One profile at a time per process: sampling must never pile up under load
+_busy = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ProfileRequest:
+    mode: str
+    # Requested with the admin token: only then does the response link the profile
+    admin: bool
+
+
+def check_admin_token(token: Optional[str]) -> None:
+    expected = get_settings().profile_admin_token
+    if not expected or not token or not hmac.compare_digest(token, expected):
+        raise PermissionError("profiling requires a valid X-Admin-Token")
+
+
+def choose_mode(requested: Optional[str], token: Optional[str]) -> Optional[ProfileRequest]:
+    """Profiling for this request, or None.
+
+    An explicit ``requested`` mode needs the admin token (``PermissionError``
+    otherwise); without one, every ``profile_sample_every``-th request is
+    profiled with the stack sampler, and only logged.
+    """
+    settings = get_settings()
+    if requested:
+        if requested not in MODES:
+            raise ValueError(f"profile must be one of: {', '.join(MODES)}")
+        check_admin_token(token)
+        return ProfileRequest(requested, admin=True)
+    every = settings.profile_sample_every
+    if every > 0 and next(_requests) % every == 0:
+        return ProfileRequest("sample", admin=False)
+    return None
+
+
+def profile_request(  # type: ignore[no-untyped-def]
+    profile: Optional[str] = Query(None, description="sample | cprofile (admin only)"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """FastAPI dependency: the profiling for this request, or None."""
+    try:
+        return choose_mode(profile, x_admin_token)
+    except PermissionError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a daemon thread.
+
+    Output is the collapsed-stack format (``root;caller;callee count``) read by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float) -> None:
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        labels: Dict[Any, str] = {}
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _short_path(path: str) -> str:
+    parts = path.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+@dataclass
+class Profile:
+    label: str
+    mode: str
+    seconds: float = 0.0
+    samples: int = 0
+    files: List[str] = field(default_factory=list)
+
+    @property
+    def url(self) -> str:
+        # The collapsed stacks come first; served by GET /api/profiles/{name} (admin token)
+        return PROFILES_URL + os.path.basename(self.files[0]) if self.files else ""
+
+    def out(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "seconds": round(self.seconds, 3),
+            "samples": self.samples,
+            "url": self.url,
+            "files": [PROFILES_URL + os.path.basename(f) for f in self.files],
+        }
+
+
+PROFILES_URL = "/api/profiles/"
+
+
+def profiles_dir() -> str:
+    path = get_settings().profile_dir
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _prune(directory: str, keep: int) -> None:
+    runs: Dict[str, List[str]] = {}
+    for name in os.listdir(directory):
+        runs.setdefault(name.split(".", 1)[0], []).append(name)
+    for stem in sorted(runs)[:-keep] if keep > 0 else []:
+        for name in runs[stem]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _write(profile: Profile, sampler: StackSampler, stats: Optional[cProfile.Profile]) -> None:
+    settings = get_settings()
+    directory = profiles_dir()
+    stem = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{profile.label}"
+    collapsed = os.path.join(directory, f"{stem}.collapsed.txt")
+    with open(collapsed, "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    profile.files.append(collapsed)
+    if stats is not None:
+        pstats_path = os.path.join(directory, f"{stem}.pstats")
+        stats.dump_stats(pstats_path)
+        summary = io.StringIO()
+        pstats.Stats(stats, stream=summary).sort_stats("cumulative").print_stats(40)
+        summary_path = os.path.join(directory, f"{stem}.top.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        profile.files.extend([pstats_path, summary_path])
+    _prune(directory, settings.profile_keep)
+
+
+def run_profiled(
+    request: Optional[ProfileRequest], label: str, fn: Callable[..., T], *args: Any
+) -> Tuple[T, Optional[Profile]]:
+    """Call ``fn(*args)``, profiling it in the calling thread when ``request`` is set.
+
+    Must run in the thread that does the work (i.e. inside ``asyncio.to_thread``
+    for threadpool ingests). Skipped when another profile is already running in
+    this process. Artifacts are written even if ``fn`` raises.
+    """
+    if request is None or not _busy.acquire(blocking=False):
+        return fn(*args), None
+    mode = request.mode
+    settings = get_settings()
+    profile = Profile(label=label, mode=mode)
+    sampler = StackSampler(threading.get_ident(), settings.profile_interval_ms / 1000)
+    stats = cProfile.Profile() if mode == "cprofile" else None
+    start = time.perf_counter()
+    try:
+        sampler.start()
+        if stats is not None:
+            stats.enable()
+        try:
+            return fn(*args), profile
+        finally:
+            if stats is not None:
+                stats.disable()
+            sampler.stop()
+            profile.seconds = time.perf_counter() - start
+            profile.samples = sum(sampler.stacks.values())
+            try:
+                _write(profile, sampler, stats)
+                logger.info(
+                    "profile_written", label=label, mode=mode, sampled=not request.admin,
+                    seconds=round(profile.seconds, 3), url=profile.url,
+                )
+            except OSError as exc:
+                logger.warning("profile_write_failed", label=label, error=str(exc))
+    finally:
+        _busy.release()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+import structlog
+
+from .config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Stages that end a dataset's event stream
+FINAL_STAGES = ("ingested", "failed")
+
+
+class ProgressBroker:
+    """In-process pub/sub for ingest progress, fanned out to SSE subscribers.
+
+    Producers (ingests in the threadpool) call ``publish`` from any thread; the
+    event is handed to the event loop once and copied to every subscriber's
+    queue, so N dashboard viewers cost one update rather than N Mongo polls.
+    Events only reach subscribers in the same worker process.
+    """
+
+    def __init__(self, queue_size: int = 16, stale_after_s: Optional[float] = None) -> None:
+        self.queue_size = queue_size
+        self.stale_after_s = stale_after_s
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._last: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        # Set from the app lifespan; without a loop (CLI, workers) publishing is a no-op
+        self._loop = loop
+
+    def last(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        """The latest event of a running ingest, or None.
+
+        An ingest that died without a final event (a killed thread, a failed
+        publish) would otherwise look live forever; after ``ingest_stale_after_s``
+        without an event it is forgotten and viewers fall back to Mongo.
+        """
+        entry = self._last.get(dataset_id)
+        if entry is None:
+            return None
+        stale_after = self.stale_after_s
+        if stale_after is None:
+            stale_after = get_settings().ingest_stale_after_s
+        if time.monotonic() - entry[0] > stale_after:
+            self._last.pop(dataset_id, None)
+            return None
+        return entry[1]
+
+    def subscribe(self, dataset_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(dataset_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, dataset_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(dataset_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[dataset_id]
+
+    def publish(self, dataset_id: str, event: Dict[str, Any]) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(dataset_id, event)
+        else:
+            loop.call_soon_threadsafe(self._fanout, dataset_id, event)
+
+    def _fanout(self, dataset_id: str, event: Dict[str, Any]) -> None:
+        if event.get("stage") in FINAL_STAGES:
+            # Late viewers read the finished dataset from Mongo instead
+            self._last.pop(dataset_id, None)
+        else:
+            self._last[dataset_id] = (time.monotonic(), event)
+        for queue in self._subscribers.get(dataset_id, ()):
+            if queue.full():
+                # Slow viewer: drop its oldest update, progress events supersede each other
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+broker = ProgressBroker()
+
+
+class ProgressReporter:
+    """Throttled progress for one ingest: at most one event per ``progress_interval_s``,
+    plus every stage change and the final event."""
+
+    def __init__(self, dataset_id: str, rows_total: Optional[int] = None, start_offset: int = 0) -> None:
+        self.dataset_id = dataset_id
+        self.rows_total = rows_total
+        self.start_offset = start_offset
+        self.interval = get_settings().progress_interval_s
+        self.started = time.perf_counter()
+        self._sent = 0.0
+        self._stage: Optional[str] = None
+
+    def update(self, stage: str, rows: int, accepted: int, rejected: int, force: bool = False, **extra: Any) -> None:
+        now = time.perf_counter()
+        if not force and stage == self._stage and now - self._sent < self.interval:
+            return
+        self._sent, self._stage = now, stage
+        elapsed = now - self.started
+        event = {
+            "dataset_id": self.dataset_id,
+            "stage": stage,
+            "rows": rows,
+            "rows_total": self.rows_total,
+            "accepted": accepted,
+            "rejected": rejected,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round((rows - self.start_offset) / elapsed, 1) if elapsed > 0 else None,
+            **extra,
+        }
+        broker.publish(self.dataset_id, event)
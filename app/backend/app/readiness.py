@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, List
+
+
+# Startup work that must finish before the instance takes traffic
+_checks: Dict[str, bool] = {"indexes": False}
+
+
+def mark_ready(check: str) -> None:
+    _checks[check] = True
+
+
+def pending_checks() -> List[str]:
+    return [name for name, done in _checks.items() if not done]
+
+
+async def create_indexes_in_background(max_backoff_s: float = 30.0) -> None:
+    """Create indexes off the startup path, retrying until Mongo is reachable."""
+    from .db import create_indexes
+
+    log = logging.getLogger(__name__)
+    backoff = 1.0
+    while True:
+        try:
+            await asyncio.to_thread(create_indexes)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Index creation failed, retrying in %.0fs: %s", backoff, exc)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff_s)
+            continue
+        mark_ready("indexes")
+        return
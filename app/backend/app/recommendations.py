@@ -6,9 +6,11 @@ TEMPLATES = {
     "Prior auth required": "Obtain prior authorization and include reference number",
 }
 
+DEFAULT_RECOMMENDATION = "Review claim details and resubmit if appropriate"
+
 
 def recommend_change(reason: str) -> str:
-    return TEMPLATES.get(reason, "Review claim details and resubmit if appropriate")
+    return TEMPLATES.get(reason, DEFAULT_RECOMMENDATION)
 
 
 
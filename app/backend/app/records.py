@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from .utils_normalize import (
+    NormalizationError,
+    StringTable,
+    normalize_code,
+    normalize_datetime,
+    normalize_status,
+    normalize_string,
+    title_case_denial,
+)
+
+
+@dataclass(slots=True)
+class ClaimRecord:
+    """A normalized claim on the ingest path.
+
+    Plain slotted dataclass: the source adapters below are the only validation
+    (each normalizer raises ``ValueError`` on bad input), so nothing is checked
+    twice per row. Pydantic models stay at the API boundary (``app.schemas``).
+    Low-cardinality fields can be passed through a per-ingest ``StringTable`` so
+    rows share one object per distinct value.
+    """
+
+    claim_id: str
+    patient_id: Optional[str]
+    procedure_code: Optional[str]
+    denial_reason: Optional[str]
+    status: str
+    submitted_at: datetime
+    source_system: str
+    raw_payload: Optional[Dict[str, Any]] = None
+
+
+def _require_claim_id(value: Any) -> str:
+    claim_id = normalize_string(value)
+    if not claim_id:
+        raise NormalizationError("missing_claim_id", "claim_id required")
+    return claim_id
+
+
+def _keep(value: Optional[str]) -> Optional[str]:
+    return value
+
+
+def from_alpha(row: Dict[str, Any], strings: Optional[StringTable] = None) -> ClaimRecord:
+    intern = strings if strings is not None else _keep
+    return ClaimRecord(
+        claim_id=_require_claim_id(row.get("claim_id")),
+        patient_id=normalize_string(row.get("patient_id")),
+        procedure_code=intern(normalize_code(row.get("procedure_code"))),
+        denial_reason=intern(title_case_denial(row.get("denial_reason"))),
+        status=normalize_status(row.get("status", "")),
+        submitted_at=normalize_datetime(row.get("submitted_at", "")),
+        source_system="alpha",
+        raw_payload=row,
+    )
+
+
+def from_beta(obj: Dict[str, Any], strings: Optional[StringTable] = None) -> ClaimRecord:
+    intern = strings if strings is not None else _keep
+    return ClaimRecord(
+        claim_id=_require_claim_id(obj.get("id")),
+        patient_id=normalize_string(obj.get("member")),
+        procedure_code=intern(normalize_code(obj.get("code"))),
+        denial_reason=intern(title_case_denial(obj.get("error_msg"))),
+        status=normalize_status(obj.get("status", "")),
+        submitted_at=normalize_datetime(obj.get("date", "")),
+        source_system="beta",
+        raw_payload=obj,
+    )
+
+
+# Input columns each adapter cannot do without (the others may be blank or absent)
+REQUIRED_COLUMNS: Dict[str, tuple] = {
+    "alpha": ("claim_id", "status", "submitted_at"),
+    "beta": ("id", "status", "date"),
+}
+
+Adapter = Callable[[Dict[str, Any], Optional[StringTable]], ClaimRecord]
+
+ADAPTERS: Dict[str, Adapter] = {
+    "alpha": from_alpha,
+    "beta": from_beta,
+}
+
+
+def _unknown_source(row: Dict[str, Any], strings: Optional[StringTable] = None) -> ClaimRecord:
+    raise NormalizationError("unknown_source", "unknown source system")
+
+
+def get_adapter(source: str) -> Adapter:
+    """Adapter for ``source``; unknown sources reject every row rather than the whole run."""
+    return ADAPTERS.get(source, _unknown_source)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from .config import get_settings
+
+
+class RejectionAggregator:
+    """Counts rejected rows per error code and decides which ones to keep.
+
+    A structurally bad file (wrong header, one bad date format) rejects every
+    row for the same reason; storing each of them only repeats that reason.
+    Counts are kept for every code, but only the first ``sample_cap`` raw rows
+    per code are written to ``rejections``. ``broken()`` reports when the
+    rejection rate says the file as a whole is unusable.
+    """
+
+    def __init__(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        sample_cap: Optional[int] = None,
+        fail_rate: Optional[float] = None,
+        fail_min_rows: Optional[int] = None,
+    ) -> None:
+        settings = get_settings()
+        # Seeded from the dataset's committed counts when an ingest is resumed
+        self.counts: Dict[str, int] = dict(counts or {})
+        self.sample_cap = settings.rejection_sample_cap if sample_cap is None else sample_cap
+        self.fail_rate = settings.rejection_fail_rate if fail_rate is None else fail_rate
+        self.fail_min_rows = settings.rejection_fail_min_rows if fail_min_rows is None else fail_min_rows
+        # Rows seen by this run only: the fail-fast check looks at the file, not at history
+        self.seen = 0
+        self.rejected = 0
+
+    def accept(self) -> None:
+        self.seen += 1
+
+    def reject(self, code: str) -> bool:
+        """Count a rejection; True if its raw row should be stored as a sample."""
+        self.seen += 1
+        self.rejected += 1
+        count = self.counts.get(code, 0)
+        self.counts[code] = count + 1
+        return count < self.sample_cap
+
+    def broken(self) -> bool:
+        if self.fail_rate <= 0 or self.seen < max(self.fail_min_rows, 1):
+            return False
+        return self.rejected / self.seen >= self.fail_rate
+
+    def describe(self) -> str:
+        top = sorted(self.counts.items(), key=lambda kv: -kv[1])[:3]
+        reasons = ", ".join(f"{code}: {n}" for code, n in top)
+        return f"{self.rejected} of the first {self.seen} rows rejected ({reasons})"
+
+
+def merge_counts(*counts: Dict[str, int]) -> Dict[str, int]:
+    merged: Dict[str, int] = {}
+    for c in counts:
+        for code, n in c.items():
+            merged[code] = merged.get(code, 0) + n
+    return merged
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from .candidates import CANDIDATES_COLLECTION
+from .columnar import write_parquet
+from .config import get_settings
+from .db import bump_version, dataset_filter, get_db
+from .jobs import track_ingest_job
+from .metrics import retention_deleted_documents
+from .rollups import remove_dataset
+from .serialization import dumps
+from .storage import COMPRESSED_FIELD, PAYLOADS_COLLECTION, decode_claim, decompress_payload
+
+
+logger = structlog.get_logger(__name__)
+
+# Archiving and deletion share one path. A dataset is claimed by moving it to
+# "archiving" (retention) or "deleting" (DELETE /api/datasets/{id}); the claim
+# records what to do in ``purge`` so a purge interrupted by a crash is finished
+# by the next retention pass:
+#
+#   ingested|failed --claim--> archiving --archive, delete claims--> archived
+#   ingested|failed|archived --claim--> deleting --[archive], delete all--> (gone)
+#
+# An ingesting or queued dataset is purgeable only once its heartbeat is older
+# than ingest_stale_after_s: its process or workers are gone (a plain upload
+# without a source file is never resumed, a queue may have no workers left).
+PURGEABLE = ("ingested", "failed")
+STALLED = ("ingesting", "queued")
+PURGING = ("archiving", "deleting")
+
+# Everything keyed by dataset_id. Work-queue units first, so a worker still on
+# one loses its lease at the next batch; claims last, so a half-purged dataset
+# still has no candidates pointing at deleted claims
+DATASET_COLLECTIONS = ("ingest_tasks", CANDIDATES_COLLECTION, PAYLOADS_COLLECTION, "claims", "rejections")
+
+
+def purgeable_filter(statuses: Tuple[str, ...]) -> Dict[str, Any]:
+    """Datasets in ``statuses``, or ingesting/queued without a heartbeat for ingest_stale_after_s."""
+    stale = datetime.utcnow() - timedelta(seconds=get_settings().ingest_stale_after_s)
+    return {"$or": [
+        {"status": {"$in": list(statuses)}},
+        {"status": {"$in": list(STALLED)}, "heartbeat_at": {"$lt": stale}},
+    ]}
+
+ARCHIVE_COLUMNS = [
+    "id", "dataset_id", "claim_id", "source_system", "patient_id", "procedure_code", "denial_reason",
+    "status", "submitted_at", "classification_label", "canonical_reason", "eligibility",
+    "eligibility_reason", "exclusion_reason", "ingested_at", "updated_at", "raw_payload",
+]
+
+
+class DatasetBusy(Exception):
+    """The dataset is being ingested or purged; maps to HTTP 409."""
+
+
+def claim_for_purge(db, dataset_id: str, drop: bool, archive: bool) -> Optional[Dict[str, Any]]:  # type: ignore[no-untyped-def]
+    """Atomically take a finished dataset for archiving (``drop`` off) or deletion.
+
+    Returns None if the dataset does not exist; raises ``DatasetBusy`` if it is
+    not in a state that can be purged.
+    """
+    from pymongo import ReturnDocument
+
+    allowed = PURGEABLE + ("archived",) if drop else PURGEABLE
+    doc = db["datasets"].find_one_and_update(
+        {**dataset_filter(dataset_id), **purgeable_filter(allowed)},
+        bump_version({"$set": {
+            "status": "deleting" if drop else "archiving",
+            "purge": {"drop": drop, "archive": archive},
+            "heartbeat_at": datetime.utcnow(),
+        }}),
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        current = db["datasets"].find_one(dataset_filter(dataset_id), {"status": 1})
+        if current is None:
+            return None
+        raise DatasetBusy(f"dataset is {current.get('status')}")
+    return doc
+
+
+def _archive_rows(  # type: ignore[no-untyped-def]
+    db, dataset_id: str, batch_size: int, on_batch: Callable[[], None]
+) -> Iterator[Dict[str, Any]]:
+    """Decoded claims with their raw payloads, however they are stored; ``on_batch`` runs per batch."""
+    cursor = db["claims"].find({"dataset_id": dataset_id}, batch_size=batch_size)
+    batch: List[Dict[str, Any]] = []
+
+    def resolve(docs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        missing = [d["claim_id"] for d in docs if d.get("raw_payload") is None and d.get(COMPRESSED_FIELD) is None]
+        side: Dict[Any, Any] = {}
+        if missing:
+            for p in db[PAYLOADS_COLLECTION].find({"dataset_id": dataset_id, "claim_id": {"$in": missing}}):
+                side[(p["claim_id"], p["source_system"])] = p.get("raw_payload")
+        on_batch()
+        for doc in docs:
+            blob = doc.pop(COMPRESSED_FIELD, None)
+            if blob is not None:
+                doc["raw_payload"] = decompress_payload(blob)
+            elif doc.get("raw_payload") is None:
+                doc["raw_payload"] = side.get((doc["claim_id"], doc["source_system"]))
+            doc["id"] = str(doc.pop("_id"))
+            yield decode_claim(doc)
+
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield from resolve(batch)
+            batch = []
+    if batch:
+        yield from resolve(batch)
+
+
+def _flat(row: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for column in ARCHIVE_COLUMNS:
+        value = row.get(column)
+        if column == "raw_payload":
+            out[column] = json.dumps(value, default=str) if value is not None else None
+        elif isinstance(value, datetime):
+            out[column] = value.isoformat()
+        else:
+            out[column] = None if value is None else str(value)
+    return out
+
+
+def write_archive(  # type: ignore[no-untyped-def]
+    db, dataset_id: str, on_batch: Callable[[], None] = lambda: None
+) -> Dict[str, Any]:
+    """Export a dataset's claims to ``<retention_archive_dir>``; returns path and row count.
+
+    Written to a temporary file and renamed, so an archive that exists is complete.
+    ``on_batch`` is called every ``retention_delete_batch`` claims (the purge heartbeat).
+    """
+    settings = get_settings()
+    os.makedirs(settings.retention_archive_dir, exist_ok=True)
+    rows = _archive_rows(db, dataset_id, settings.retention_delete_batch, on_batch)
+    if settings.retention_archive_format == "parquet":
+        path = os.path.join(settings.retention_archive_dir, f"{dataset_id}.claims.parquet")
+        count = write_parquet((_flat(r) for r in rows), ARCHIVE_COLUMNS, path)
+    else:
+        path = os.path.join(settings.retention_archive_dir, f"{dataset_id}.claims.ndjson.gz")
+        count = 0
+        with gzip.open(f"{path}.tmp", "wb", compresslevel=6) as f:
+            for row in rows:
+                f.write(dumps(row) + b"\n")
+                count += 1
+        os.replace(f"{path}.tmp", path)
+    return {"path": path, "rows": count, "format": settings.retention_archive_format}
+
+
+def delete_batched(  # type: ignore[no-untyped-def]
+    collection, query: Dict[str, Any], batch_size: int, pause_s: float, on_batch: Callable[[], None]
+) -> int:
+    """Delete matching documents ``batch_size`` at a time by ``_id``, pausing between batches.
+
+    Small deletes keep each write short (and the replication lag and cache churn
+    it causes); the pause leaves room for production traffic.
+    """
+    deleted = 0
+    while True:
+        ids = [d["_id"] for d in collection.find(query, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return deleted
+        count = collection.delete_many({"_id": {"$in": ids}}).deleted_count
+        deleted += count
+        retention_deleted_documents.labels(collection=collection.name).inc(count)
+        on_batch()
+        if pause_s:
+            time.sleep(pause_s)
+
+
+def purge_dataset(db, doc: Dict[str, Any]) -> Dict[str, Any]:  # type: ignore[no-untyped-def]
+    """Run a claimed purge to the end: archive (once), delete in batches, finish."""
+    settings = get_settings()
+    dataset_id = str(doc["_id"])
+    key = dataset_filter(dataset_id)
+    purge = doc.get("purge") or {"drop": doc.get("status") == "deleting", "archive": True}
+    start = time.perf_counter()
+
+    def heartbeat() -> None:
+        db["datasets"].update_one(key, {"$set": {"heartbeat_at": datetime.utcnow()}})
+
+    archive = doc.get("archive")
+    if purge.get("archive") and archive is None:
+        # Heartbeats keep a long export from looking stalled to other workers' retention passes
+        archive = write_archive(db, dataset_id, heartbeat)
+        db["datasets"].update_one(key, {"$set": {"archive": archive, "heartbeat_at": datetime.utcnow()}})
+
+    if purge.get("drop"):
+        # Archived datasets keep counting towards trends; deleted ones do not
+        remove_dataset(db, dataset_id)
+    deleted = {
+        name: delete_batched(
+            db[name], {"dataset_id": dataset_id}, settings.retention_delete_batch, settings.retention_pause_s, heartbeat
+        )
+        for name in DATASET_COLLECTIONS
+    }
+    if purge.get("drop"):
+        db["uploads"].delete_many({"dataset_id": dataset_id})
+        db["datasets"].delete_one(key)
+    else:
+        db["datasets"].update_one(key, bump_version({
+            "$set": {"status": "archived", "archived_at": datetime.utcnow()},
+            "$unset": {"purge": ""},
+        }))
+    logger.info(
+        "dataset_purged",
+        dataset_id=dataset_id,
+        dropped=bool(purge.get("drop")),
+        archive=archive["path"] if archive else None,
+        deleted=deleted,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    return {"dataset_id": dataset_id, "archive": archive, "deleted": deleted}
+
+
+def run_purge(db, doc: Dict[str, Any]) -> None:  # type: ignore[no-untyped-def]
+    """Background task wrapper: failures are logged and left for the retention pass."""
+    try:
+        with track_ingest_job():
+            purge_dataset(db, doc)
+    except Exception:  # noqa: BLE001
+        logger.exception("dataset_purge_failed", dataset_id=str(doc["_id"]))
+
+
+def apply_retention(db) -> int:  # type: ignore[no-untyped-def]
+    """One retention pass: finish stalled purges, then archive datasets past ``retention_days``."""
+    from pymongo import ReturnDocument
+
+    settings = get_settings()
+    purged = 0
+    stale = datetime.utcnow() - timedelta(seconds=settings.ingest_stale_after_s)
+    for doc in list(db["datasets"].find({"status": {"$in": list(PURGING)}, "heartbeat_at": {"$lt": stale}}, {"_id": 1})):
+        # Take the stalled purge over; another worker may have done so first
+        claimed = db["datasets"].find_one_and_update(
+            {"_id": doc["_id"], "status": {"$in": list(PURGING)}, "heartbeat_at": {"$lt": stale}},
+            {"$set": {"heartbeat_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if claimed is not None:
+            run_purge(db, claimed)
+            purged += 1
+    if not settings.retention_days:
+        return purged
+    cutoff = datetime.utcnow() - timedelta(days=settings.retention_days)
+    for doc in list(db["datasets"].find({**purgeable_filter(PURGEABLE), "uploaded_at": {"$lt": cutoff}}, {"_id": 1})):
+        try:
+            claimed = claim_for_purge(db, str(doc["_id"]), drop=False, archive=True)
+        except DatasetBusy:
+            continue
+        if claimed is not None:
+            run_purge(db, claimed)
+            purged += 1
+    return purged
+
+
+async def retention_forever() -> None:
+    """Background loop: apply the retention policy every ``retention_interval_s``."""
+    interval = get_settings().retention_interval_s
+    while True:
+        try:
+            count = await asyncio.to_thread(apply_retention, get_db())
+            if count:
+                logger.info("retention_applied", datasets=count)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("retention_pass_failed", error=str(exc))
+        await asyncio.sleep(interval)
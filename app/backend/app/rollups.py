@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+
+import structlog
+
+from .config import get_settings
+from .db import bump_version, dataset_filter
+from .storage import decode_value
+
+
+logger = structlog.get_logger(__name__)
+
+# Daily counts across all datasets, one document per (day, source, reason), kept
+# current with $inc upserts so trend queries read O(days) rollups, not claims.
+# ``day`` is the claim's submitted_at date as YYYY-MM-DD (sorts like a date).
+#
+# A dataset is added once, when its ingest completes (``rolled_up_at`` on the
+# dataset records that, set only after the counts are written; ``rolling_up_at``
+# claims it meanwhile), reclassify applies per-claim deltas, and an explicit
+# delete subtracts it. Archiving by retention keeps its counts: trends outlive claims.
+#
+# Each dataset's own share is kept alongside, in ``dataset_rollups`` (same key
+# plus dataset_id), so deleting an archived dataset, whose claims are gone,
+# still subtracts exactly what it added.
+ROLLUPS_COLLECTION = "claim_rollups"
+DATASET_ROLLUPS_COLLECTION = "dataset_rollups"
+ROLLUP_KEY = ("day", "source_system", "canonical_reason")
+INTERVALS = ("day", "week", "month")
+GROUP_BY = ("canonical_reason", "source_system", "none")
+
+Key = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def day_of(value: Any) -> Optional[str]:
+    return value.strftime("%Y-%m-%d") if isinstance(value, (date, datetime)) else None
+
+
+def rollup_key(claim: Dict[str, Any]) -> Key:
+    """(day, source_system, canonical_reason) of a claim document, decoded."""
+    return (
+        day_of(claim.get("submitted_at")),
+        decode_value("source_system", claim.get("source_system")),
+        decode_value("canonical_reason", claim.get("canonical_reason")),
+    )
+
+
+class RollupDeltas:
+    """Accumulates count changes per rollup key; ``apply`` writes them in one bulk_write."""
+
+    def __init__(self) -> None:
+        self.counts: DefaultDict[Key, List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, key: Key, claims: int, eligible: int) -> None:
+        entry = self.counts[key]
+        entry[0] += claims
+        entry[1] += eligible
+
+    def claim(self, claim: Dict[str, Any], sign: int = 1) -> None:
+        self.add(rollup_key(claim), sign, sign if claim.get("eligibility") else 0)
+
+    def negated(self) -> RollupDeltas:
+        out = RollupDeltas()
+        for key, (claims, eligible) in self.counts.items():
+            out.add(key, -claims, -eligible)
+        return out
+
+    def changes(self) -> Dict[Key, List[int]]:
+        # A claim reclassified back to the same key nets out to nothing to write
+        return {key: counts for key, counts in self.counts.items() if counts != [0, 0]}
+
+    def apply(self, db, dataset_id: Optional[str] = None) -> int:  # type: ignore[no-untyped-def]
+        """Write the changes; with ``dataset_id`` also to that dataset's stored share."""
+        from pymongo import UpdateOne
+
+        now = datetime.utcnow()
+        changes = self.changes()
+        targets: List[Tuple[str, Dict[str, Any]]] = [(ROLLUPS_COLLECTION, {})]
+        if dataset_id is not None:
+            targets.append((DATASET_ROLLUPS_COLLECTION, {"dataset_id": dataset_id}))
+        for collection, scope in targets:
+            ops = [
+                UpdateOne(
+                    {**scope, **dict(zip(ROLLUP_KEY, key))},
+                    {"$inc": {"claims": claims, "eligible": eligible}, "$set": {"updated_at": now}},
+                    upsert=True,
+                )
+                for key, (claims, eligible) in changes.items()
+            ]
+            if ops:
+                db[collection].bulk_write(ops, ordered=False)
+        return len(changes)
+
+
+def dataset_contribution(db, dataset_id: str) -> RollupDeltas:  # type: ignore[no-untyped-def]
+    """A dataset's counts per rollup key, grouped inside Mongo over its (indexed) claims."""
+    deltas = RollupDeltas()
+    pipeline = [
+        {"$match": {"dataset_id": dataset_id}},
+        {
+            "$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
+                    "source_system": "$source_system",
+                    "canonical_reason": "$canonical_reason",
+                },
+                "claims": {"$sum": 1},
+                "eligible": {"$sum": {"$cond": [{"$eq": ["$eligibility", True]}, 1, 0]}},
+            }
+        },
+    ]
+    for row in db["claims"].aggregate(pipeline):
+        group = row["_id"]
+        # Grouped on stored values; a compact code and its plain value add up to one key
+        key = (
+            group.get("day"),
+            decode_value("source_system", group.get("source_system")),
+            decode_value("canonical_reason", group.get("canonical_reason")),
+        )
+        deltas.add(key, row["claims"], row["eligible"])
+    return deltas
+
+
+def stored_contribution(db, dataset_id: str) -> RollupDeltas:  # type: ignore[no-untyped-def]
+    """A dataset's counts as recorded when it was rolled up (plus reclassify deltas)."""
+    deltas = RollupDeltas()
+    for doc in db[DATASET_ROLLUPS_COLLECTION].find({"dataset_id": dataset_id}):
+        key = (doc.get("day"), doc.get("source_system"), doc.get("canonical_reason"))
+        deltas.add(key, doc.get("claims", 0), doc.get("eligible", 0))
+    return deltas
+
+
+def roll_up_dataset(db, dataset_id: str) -> bool:  # type: ignore[no-untyped-def]
+    """Add a freshly ingested dataset to the rollups, at most once.
+
+    The dataset is claimed with ``rolling_up_at`` and marked ``rolled_up_at``
+    only once its counts are written. A claim older than ``ingest_stale_after_s``
+    belongs to a process that died, so it may be taken over (by ``backfill``);
+    if that process got as far as storing the dataset's share, which is written
+    after the global counts, the counts are not added again.
+    """
+    from pymongo import ReturnDocument
+
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=get_settings().ingest_stale_after_s)
+    claimed = db["datasets"].find_one_and_update(
+        {
+            **dataset_filter(dataset_id),
+            "rolled_up_at": None,
+            "$or": [{"rolling_up_at": None}, {"rolling_up_at": {"$lt": stale}}],
+        },
+        {"$set": {"rolling_up_at": now}},
+        {"rolling_up_at": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if claimed is None:
+        return False
+    retried = claimed.get("rolling_up_at") is not None
+    if retried and stored_contribution(db, dataset_id).counts:
+        keys = 0
+    else:
+        keys = dataset_contribution(db, dataset_id).apply(db, dataset_id)
+    db["datasets"].update_one(
+        dataset_filter(dataset_id),
+        bump_version({"$set": {"rolled_up_at": datetime.utcnow()}, "$unset": {"rolling_up_at": ""}}),
+    )
+    logger.info("rollups_updated", dataset_id=dataset_id, keys=keys, retried=retried)
+    return True
+
+
+def is_rolled_up(db, dataset_id: str) -> bool:  # type: ignore[no-untyped-def]
+    doc = db["datasets"].find_one(dataset_filter(dataset_id), {"rolled_up_at": 1})
+    return doc is not None and doc.get("rolled_up_at") is not None
+
+
+def remove_dataset(db, dataset_id: str) -> bool:  # type: ignore[no-untyped-def]
+    """Subtract a dataset from the rollups, at most once.
+
+    Uses the stored share, so it also works once retention has deleted the
+    claims; datasets rolled up before shares were stored are grouped from claims.
+    """
+    from pymongo import ReturnDocument
+
+    claimed = db["datasets"].find_one_and_update(
+        {**dataset_filter(dataset_id), "rolled_up_at": {"$ne": None}},
+        {"$set": {"rolled_up_at": None}},
+        {"_id": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if claimed is None:
+        return False
+    deltas = stored_contribution(db, dataset_id)
+    if not deltas.counts:
+        deltas = dataset_contribution(db, dataset_id)
+    deltas.negated().apply(db)
+    db[DATASET_ROLLUPS_COLLECTION].delete_many({"dataset_id": dataset_id})
+    return True
+
+
+def _period(day: str, interval: str) -> str:
+    if interval == "day":
+        return day
+    if interval == "month":
+        return day[:7]
+    start = date.fromisoformat(day)
+    return (start - timedelta(days=start.weekday())).isoformat()  # ISO week, by its Monday
+
+
+def trends(  # type: ignore[no-untyped-def]
+    db,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: str = "day",
+    group_by: str = "canonical_reason",
+    source_system: Optional[str] = None,
+    canonical_reason: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Claim and eligibility counts per period (and group), read from the rollups only.
+
+    ``start`` and ``end`` are inclusive. Claims without a submission date are
+    not part of any period.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY)}")
+    day: Dict[str, Any] = {"$ne": None}
+    if start is not None:
+        day["$gte"] = start.isoformat()
+    if end is not None:
+        day["$lte"] = end.isoformat()
+    query: Dict[str, Any] = {"day": day}
+    if source_system:
+        query["source_system"] = source_system
+    if canonical_reason:
+        query["canonical_reason"] = canonical_reason
+
+    buckets: DefaultDict[Tuple[str, Optional[str]], List[int]] = defaultdict(lambda: [0, 0])
+    for doc in db[ROLLUPS_COLLECTION].find(query, {"_id": 0, "updated_at": 0}):
+        group = None if group_by == "none" else doc.get(group_by)
+        entry = buckets[(_period(doc["day"], interval), group)]
+        entry[0] += doc.get("claims", 0)
+        entry[1] += doc.get("eligible", 0)
+
+    series: List[Dict[str, Any]] = []
+    for (period, group), (claims, eligible) in sorted(buckets.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+        if claims <= 0:
+            continue
+        row: Dict[str, Any] = {"period": period}
+        if group_by != "none":
+            row[group_by] = group
+        row.update(claims=claims, eligible=eligible, eligible_rate=round(eligible / claims, 4))
+        series.append(row)
+    return series
+
+
+def backfill(db) -> int:  # type: ignore[no-untyped-def]
+    """Roll up ingested datasets that are not yet counted.
+
+    Those from before rollups existed, and those whose roll-up was interrupted.
+    """
+    pending = db["datasets"].find({"status": "ingested", "rolled_up_at": None}, {"_id": 1})
+    return sum(roll_up_dataset(db, str(doc["_id"])) for doc in list(pending))
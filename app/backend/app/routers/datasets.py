@@ -1,30 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import io
 import json
 import os
-from datetime import datetime
+import tempfile
+from datetime import date
 from typing import Any
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Request, Response, UploadFile
 import structlog
 
+from ..candidates import CANDIDATE_FIELDS, find_candidates
+from ..columnar import write_parquet
 from ..config import get_settings
-from ..db import get_db
-from ..metrics import processed_records, ingestion_latency
-from ..schemas import DatasetCreateResponse, NormalizedClaimIn
-from ..utils_normalize import (
-    normalize_datetime,
-    normalize_status,
-    normalize_string,
-    title_case_denial,
-)
-from ..classifier import classify_reason
-from ..recommendations import recommend_change
+from ..db import dataset_filter, get_db
+from ..eligibility import backfill_labels, forecast_filter
+from ..http_cache import dataset_validators, datasets_list_validators, not_modified, with_validators
+from ..ingest import UnsupportedInput, ingest_dataset
+from ..jobs import track_ingest_job
+from ..metrics import ingestion_latency
+from ..schemas import DatasetCreateResponse
+from ..profiling import ProfileRequest, profile_request, run_profiled
+from ..progress import FINAL_STAGES, broker
+from ..retention import DatasetBusy, claim_for_purge, run_purge
+from ..serialization import dumps, json_response, stream_json_array
+from ..sniff import SchemaMismatch
+from ..storage import LEAN_PROJECTION, decode_claim, load_raw_payload
 
 
 router = APIRouter(prefix="/datasets", tags=["datasets"])
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
 logger = structlog.get_logger(__name__)
 
 
@@ -33,23 +40,15 @@ def health_check():
     return {"status": "ok", "message": "Datasets API is working"}
 
 
-def detect_source(filename: str, provided: str | None) -> str:
-    if provided:
-        return provided
-    if filename.endswith(".csv"):
-        return "alpha"
-    if filename.endswith(".json"):
-        return "beta"
-    return "unknown"
-
-
 # POST /datasets — upload a dataset file and trigger normalization/classification
 # Supports both trailing-slash and non-trailing-slash to avoid 307 redirect loops.
 @router.post("/", response_model=DatasetCreateResponse)
 @router.post("", response_model=DatasetCreateResponse)
 async def upload_dataset(
+    response: Response,
     file: UploadFile = File(...),
     source_system: str | None = Form(None),
+    profile_req: ProfileRequest | None = Depends(profile_request),
 ):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
@@ -63,221 +62,136 @@ async def upload_dataset(
     if len(data) > size_limit:
         raise HTTPException(status_code=413, detail="File too large")
 
-    src = detect_source(file.filename, source_system)
     db = get_db()
 
-    # Create a dataset document for auditability and progress tracking
-    dataset_doc = {
-        "filename": file.filename,
-        "source_system": src,
-        "uploaded_by": None,
-        "uploaded_at": datetime.utcnow(),
-        "record_count": 0,
-        "metrics_json": None,
-    }
-
     # Time the ingestion end-to-end using a Prometheus histogram
-    with ingestion_latency.time():
+    with track_ingest_job(), ingestion_latency.time():
         try:
-            dataset_id = db["datasets"].insert_one(dataset_doc).inserted_id
-
-            count_ok = 0
-            count_rej = 0
-
-            if src == "alpha" and file.filename.endswith(".csv"):
-                text = data.decode("utf-8", errors="replace")
-                reader = csv.DictReader(io.StringIO(text))
-                for row in reader:
-                    ok = _process_row_alpha(row, str(dataset_id), db)
-                    if ok:
-                        count_ok += 1
-                    else:
-                        count_rej += 1
-            elif src == "beta" and file.filename.endswith(".json"):
-                try:
-                    items = json.loads(data)
-                except json.JSONDecodeError:
-                    raise HTTPException(status_code=400, detail="Invalid JSON")
-                if not isinstance(items, list):
-                    raise HTTPException(status_code=400, detail="JSON must be an array of objects")
-                for obj in items:
-                    ok = _process_row_beta(obj, str(dataset_id), db)
-                    if ok:
-                        count_ok += 1
-                    else:
-                        count_rej += 1
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported file for detected source")
-
-            # Update dataset metrics and emit counters
-            db["datasets"].update_one({"_id": dataset_id}, {"$set": {"record_count": count_ok}})
-            processed_records.labels(source_system=src, result="accepted").inc(count_ok)
-            processed_records.labels(source_system=src, result="rejected").inc(count_rej)
-
-            logger.info(
-                "dataset_ingested",
-                dataset_id=str(dataset_id),
-                filename=file.filename,
-                source_system=src,
-                accepted=count_ok,
-                rejected=count_rej,
+            # In the threadpool: the loop stays free to push progress events to viewers
+            result, profile = await asyncio.to_thread(
+                run_profiled, profile_req, "datasets", ingest_dataset, db, data, file.filename, source_system
             )
-
+            metrics: dict[str, Any] = {"rejected": result.rejected, "rejection_codes": result.rejection_codes}
+            if profile is not None and profile_req is not None and profile_req.admin:
+                response.headers["X-Profile"] = profile.url
+                metrics["profile"] = profile.out()
             return DatasetCreateResponse(
-                id=str(dataset_id), filename=file.filename, source_system=src, record_count=count_ok, metrics={"rejected": count_rej}
+                id=result.dataset_id,
+                filename=result.filename,
+                source_system=result.source_system,
+                record_count=result.accepted,
+                metrics=metrics,
             )
-        except HTTPException:
-            # Re-raise known HTTP errors untouched
-            raise
+        except SchemaMismatch as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+        except UnsupportedInput as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except ImportError as exc:
+            raise HTTPException(status_code=415, detail=str(exc)) from exc
         except Exception as exc:  # noqa: BLE001
             # Log unexpected errors and surface a generic message
-            logger.exception("dataset_ingestion_failed", filename=file.filename, source_system=src)
+            logger.exception("dataset_ingestion_failed", filename=file.filename, source_system=source_system)
             raise HTTPException(status_code=500, detail="Failed to ingest dataset") from exc
 
 
-def _persist_claim(norm: NormalizedClaimIn, dataset_id: str, db) -> None:  # type: ignore[no-untyped-def]
-    existing = db["claims"].find_one({
-        "dataset_id": dataset_id,
-        "claim_id": norm.claim_id,
-        "source_system": norm.source_system,
-    })
-
-    denial = norm.denial_reason
-    classification = classify_reason(denial)
-
-    eligibility = False
-    eligibility_reason = None
-    exclusion_reason = None
-
-    ref_date = get_settings().eligibility_reference_date
-    if (
-        norm.status == "denied"
-        and norm.patient_id
-        and (ref_date - norm.submitted_at.date()).days > 7
-    ):
-        if classification.label == "retryable" and classification.canonical_reason:
-            eligibility = True
-            eligibility_reason = classification.canonical_reason
-        elif classification.label == "non-retryable":
-            exclusion_reason = classification.canonical_reason
-        else:
-            exclusion_reason = "Ambiguous"
-    else:
-        exclusion_reason = "Not eligible by rules"
-
-    doc = {
-        "dataset_id": dataset_id,
-        "claim_id": norm.claim_id,
-        "patient_id": norm.patient_id,
-        "procedure_code": norm.procedure_code,
-        "denial_reason": denial,
-        "status": norm.status,
-        "submitted_at": norm.submitted_at,
-        "source_system": norm.source_system,
-        "raw_payload": norm.raw_payload,
-        "eligibility": eligibility,
-        "eligibility_reason": eligibility_reason,
-        "exclusion_reason": exclusion_reason,
-        "ingested_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
-    }
-    if existing:
-        db["claims"].update_one({"_id": existing["_id"]}, {"$set": doc})
-    else:
-        db["claims"].insert_one(doc)
-
+def _parquet_response(rows, columns: list[str], filename: str):  # type: ignore[no-untyped-def]
+    from fastapi.responses import FileResponse
+    from starlette.background import BackgroundTask
 
-def _process_row_alpha(row: dict[str, Any], dataset_id: str, db) -> bool:  # type: ignore[no-untyped-def]
-    try:
-        norm = NormalizedClaimIn(
-            claim_id=normalize_string(row.get("claim_id")) or "",
-            patient_id=normalize_string(row.get("patient_id")) or None,
-            procedure_code=normalize_string(row.get("procedure_code")) or None,
-            denial_reason=title_case_denial(normalize_string(row.get("denial_reason"))),
-            status=normalize_status(row.get("status", "")),
-            submitted_at=normalize_datetime(row.get("submitted_at", "")),
-            source_system="alpha",
-            raw_payload=row,
-        )
-        if norm.claim_id == "":
-            raise ValueError("claim_id required")
-        _persist_claim(norm, dataset_id, db)
-        return True
-    except Exception as exc:  # noqa: BLE001
-        db["rejections"].insert_one({
-            "dataset_id": dataset_id,
-            "raw_payload": row,
-            "reason": str(exc),
-            "created_at": datetime.utcnow(),
-        })
-        return False
-
-
-def _process_row_beta(obj: dict[str, Any], dataset_id: str, db) -> bool:  # type: ignore[no-untyped-def]
+    settings = get_settings()
+    os.makedirs(settings.data_dir, exist_ok=True)
+    # One file per request, so concurrent downloads never share a path; removed once sent
+    fd, path = tempfile.mkstemp(dir=settings.data_dir, prefix="export_", suffix=".parquet")
+    os.close(fd)
     try:
-        norm = NormalizedClaimIn(
-            claim_id=normalize_string(obj.get("id")) or "",
-            patient_id=normalize_string(obj.get("member")) or None,
-            procedure_code=normalize_string(obj.get("code")) or None,
-            denial_reason=title_case_denial(normalize_string(obj.get("error_msg"))),
-            status=normalize_status(obj.get("status", "")),
-            submitted_at=normalize_datetime(obj.get("date", "")),
-            source_system="beta",
-            raw_payload=obj,
-        )
-        if norm.claim_id == "":
-            raise ValueError("claim_id required")
-        _persist_claim(norm, dataset_id, db)
-        return True
-    except Exception as exc:  # noqa: BLE001
-        db["rejections"].insert_one({
-            "dataset_id": dataset_id,
-            "raw_payload": obj,
-            "reason": str(exc),
-            "created_at": datetime.utcnow(),
-        })
-        return False
+        count = write_parquet(rows, columns, path)
+    except ImportError as exc:
+        os.remove(path)
+        raise HTTPException(status_code=415, detail=str(exc)) from exc
+    except BaseException:
+        os.remove(path)
+        raise
+    logger.info("parquet_exported", filename=filename, count=count)
+    return FileResponse(
+        path=path, media_type=PARQUET_MEDIA_TYPE, filename=filename, background=BackgroundTask(os.remove, path)
+    )
 
 
 # List datasets (supports both trailing and non-trailing slash)
 @router.get("/")
 @router.get("")
-def list_datasets():  # type: ignore[no-untyped-def]
+def list_datasets(request: Request):  # type: ignore[no-untyped-def]
     db = get_db()
+    validators = datasets_list_validators(db)
+    cached = not_modified(request, validators)
+    if cached is not None:
+        return cached
     rows = list(db["datasets"].find().sort("uploaded_at", -1))
     for r in rows:
         r["id"] = str(r.pop("_id"))
     logger.info("datasets_listed", count=len(rows))
-    return rows
+    return with_validators(json_response(rows), validators)
+
+
+def _claim_out(c: dict[str, Any]) -> dict[str, Any]:
+    c["id"] = str(c.pop("_id"))
+    return decode_claim(c)
 
 
 # Fetch claims for a dataset (minimal filters for now)
+# Streamed straight from the cursor so large datasets are never materialized in memory
 @router.get("/{dataset_id}/claims")
-def dataset_claims(dataset_id: str):  # type: ignore[no-untyped-def]
+def dataset_claims(dataset_id: str, request: Request):  # type: ignore[no-untyped-def]
+    from fastapi.responses import StreamingResponse
+
     db = get_db()
-    items = list(db["claims"].find({"dataset_id": str(dataset_id)}))
-    for c in items:
-        c["id"] = str(c.pop("_id"))
-    logger.info("claims_listed", dataset_id=str(dataset_id), count=len(items))
-    return items
+    validators = dataset_validators(db, str(dataset_id), "claims")
+    cached = not_modified(request, validators)
+    if cached is not None:
+        return cached
+    cursor = db["claims"].find({"dataset_id": str(dataset_id)}, LEAN_PROJECTION, batch_size=2000)
+
+    def done(count: int) -> None:
+        logger.info("claims_listed", dataset_id=str(dataset_id), count=count)
+
+    return with_validators(
+        StreamingResponse(stream_json_array(cursor, transform=_claim_out, on_complete=done), media_type="application/json"),
+        validators,
+    )
+
+
+# Fetch the original source row for a single claim (stored out of line in lean modes)
+@router.get("/{dataset_id}/claims/{claim_id}/raw")
+def claim_raw_payload(dataset_id: str, claim_id: str):  # type: ignore[no-untyped-def]
+    db = get_db()
+    claim = db["claims"].find_one({"dataset_id": str(dataset_id), "claim_id": claim_id})
+    if claim is None:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    return {"claim_id": claim_id, "raw_payload": load_raw_payload(db, claim)}
 
 
 # Generate resubmission candidates and optionally stream as CSV
 @router.get("/{dataset_id}/candidates")
-def dataset_candidates(dataset_id: str, format: str | None = None):  # type: ignore[no-untyped-def]
+def dataset_candidates(  # type: ignore[no-untyped-def]
+    dataset_id: str, request: Request, response: Response, format: str | None = None
+):
     from fastapi.responses import StreamingResponse
 
     db = get_db()
-    items = list(db["claims"].find({"dataset_id": str(dataset_id), "eligibility": True}))
-    results = []
-    for c in items:
-        reason = c.get("eligibility_reason") or ""
-        results.append({
-            "claim_id": c["claim_id"],
-            "resubmission_reason": reason,
-            "source_system": c["source_system"],
-            "recommended_changes": recommend_change(reason) if reason else "Review claim details and resubmit if appropriate",
-        })
+    # Unchanged since the client's copy: no scan, no export file, no encoding
+    validators = dataset_validators(db, str(dataset_id), f"candidates.{format or 'json'}")
+    cached = not_modified(request, validators)
+    if cached is not None:
+        return cached
+    if format == "parquet":
+        # Written batch by batch straight from the cursor, no JSON encoding
+        return with_validators(
+            _parquet_response(find_candidates(db, str(dataset_id)), CANDIDATE_FIELDS, f"candidates_{dataset_id}.parquet"),
+            validators,
+        )
+
+    # Materialized by an aggregation at ingest/reclassify time; this is an indexed scan
+    results = list(find_candidates(db, str(dataset_id)))
 
     # Persist JSON export
     settings = get_settings()
@@ -291,7 +205,7 @@ def dataset_candidates(dataset_id: str, format: str | None = None):  # type: ign
     if format == "csv":
         def gen():  # type: ignore[no-untyped-def]
             output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=["claim_id", "resubmission_reason", "source_system", "recommended_changes"])
+            writer = csv.DictWriter(output, fieldnames=CANDIDATE_FIELDS)
             writer.writeheader()
             yield output.getvalue()
             output.seek(0)
@@ -301,21 +215,161 @@ def dataset_candidates(dataset_id: str, format: str | None = None):  # type: ign
                 yield output.getvalue()
                 output.seek(0)
                 output.truncate(0)
-        return StreamingResponse(gen(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=candidates.csv"})
+        return with_validators(
+            StreamingResponse(gen(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=candidates.csv"}),
+            validators,
+        )
 
+    with_validators(response, validators)
     return results
 
 
+# How many claims would be eligible at a given reference date (e.g. "next week")
+@router.get("/{dataset_id}/eligibility/forecast")
+def eligibility_forecast(dataset_id: str, reference_date: date | None = None):  # type: ignore[no-untyped-def]
+    db = get_db()
+    ref = reference_date or get_settings().eligibility_reference_date
+    # Claims ingested before labels were stored would never match
+    backfill_labels(db, str(dataset_id))
+    eligible = db["claims"].count_documents(forecast_filter(str(dataset_id), ref))
+    current = db["claims"].count_documents({"dataset_id": str(dataset_id), "eligibility": True})
+    return {
+        "dataset_id": str(dataset_id),
+        "reference_date": ref.isoformat(),
+        "eligible": eligible,
+        "currently_eligible": current,
+    }
+
+
+def _progress_snapshot(dataset_id: str) -> dict[str, Any] | None:
+    # Initial state for a new viewer, and the fallback when the ingest runs in another process
+    doc = get_db()["datasets"].find_one(
+        dataset_filter(dataset_id),
+        {"status": 1, "checkpoint_offset": 1, "record_count": 1, "rejected_count": 1, "row_total": 1, "error": 1},
+    )
+    if doc is None:
+        return None
+    return {
+        "dataset_id": str(dataset_id),
+        "stage": doc.get("status"),
+        "rows": doc.get("checkpoint_offset", 0),
+        "rows_total": doc.get("row_total"),
+        "accepted": doc.get("record_count", 0),
+        "rejected": doc.get("rejected_count", 0),
+        "error": doc.get("error"),
+        "snapshot": True,
+    }
+
+
+def _sse(event: dict[str, Any]) -> bytes:
+    return b"event: progress\ndata: " + dumps(event) + b"\n\n"
+
+
+# Live ingest progress as Server-Sent Events. Viewers share the in-process broker,
+# so any number of them cost one update per progress tick rather than one poll each.
+@router.get("/{dataset_id}/events")
+async def dataset_events(dataset_id: str, request: Request):  # type: ignore[no-untyped-def]
+    from fastapi.responses import StreamingResponse
+
+    keepalive = get_settings().progress_keepalive_s
+    queue = broker.subscribe(dataset_id)  # before the snapshot, so no event falls in between
+    first = broker.last(dataset_id) or await asyncio.to_thread(_progress_snapshot, dataset_id)
+    if first is None:
+        broker.unsubscribe(dataset_id, queue)
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    async def gen():  # type: ignore[no-untyped-def]
+        try:
+            yield _sse(first)
+            if first["stage"] in FINAL_STAGES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    if broker.last(dataset_id) is not None:
+                        yield b": keepalive\n\n"
+                        continue
+                    # No producer in this process: fall back to a (rare) Mongo read
+                    event = await asyncio.to_thread(_progress_snapshot, dataset_id)
+                    if event is None:
+                        return
+                yield _sse(event)
+                if event["stage"] in FINAL_STAGES:
+                    return
+        finally:
+            broker.unsubscribe(dataset_id, queue)
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Only the first REJECTION_SAMPLE_CAP rows per error code are stored; the summary has the full counts.
+# Their ETags follow the dataset version, which TTL expiry of rows (REJECTIONS_TTL_DAYS) does not change
+REJECTION_FIELDS = ["id", "raw_payload", "code", "reason", "created_at"]
+
+
+@router.get("/{dataset_id}/rejections/summary")
+def dataset_rejection_summary(dataset_id: str, request: Request, response: Response):  # type: ignore[no-untyped-def]
+    db = get_db()
+    validators = dataset_validators(db, str(dataset_id), "rejections.summary")
+    cached = not_modified(request, validators)
+    if cached is not None:
+        return cached
+    with_validators(response, validators)
+    dataset = db["datasets"].find_one(dataset_filter(dataset_id), {"rejected_count": 1, "rejection_codes": 1, "error": 1})
+    if dataset is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    sampled = {
+        r["_id"]: r["count"]
+        for r in db["rejections"].aggregate([
+            {"$match": {"dataset_id": str(dataset_id)}},
+            {"$group": {"_id": "$code", "count": {"$sum": 1}}},
+        ])
+    }
+    codes = dataset.get("rejection_codes") or {}
+    return {
+        "dataset_id": str(dataset_id),
+        "rejected": dataset.get("rejected_count", 0),
+        "error": dataset.get("error"),
+        "codes": [
+            {"code": code, "count": count, "samples": sampled.get(code, 0)}
+            for code, count in sorted(codes.items(), key=lambda kv: -kv[1])
+        ],
+    }
+
+
 @router.get("/{dataset_id}/rejections")
-def dataset_rejections(dataset_id: str):  # type: ignore[no-untyped-def]
+def dataset_rejections(dataset_id: str, request: Request, format: str | None = None):  # type: ignore[no-untyped-def]
     from fastapi.responses import StreamingResponse
 
     db = get_db()
+    validators = dataset_validators(db, str(dataset_id), f"rejections.{format or 'csv'}")
+    cached = not_modified(request, validators)
+    if cached is not None:
+        return cached
+    if format == "parquet":
+        rows = (
+            {
+                "id": str(r.get("_id")),
+                "raw_payload": json.dumps(r.get("raw_payload"), default=str),
+                "code": r.get("code"),
+                "reason": r.get("reason"),
+                "created_at": r.get("created_at").isoformat() if r.get("created_at") else "",
+            }
+            for r in db["rejections"].find({"dataset_id": str(dataset_id)}, batch_size=2000)
+        )
+        return with_validators(_parquet_response(rows, REJECTION_FIELDS, f"rejections_{dataset_id}.parquet"), validators)
     rows = list(db["rejections"].find({"dataset_id": str(dataset_id)}))
 
     def gen():  # type: ignore[no-untyped-def]
         output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=["id", "raw_payload", "reason", "created_at"])
+        writer = csv.DictWriter(output, fieldnames=REJECTION_FIELDS)
         writer.writeheader()
         yield output.getvalue()
         output.seek(0)
@@ -324,6 +378,7 @@ def dataset_rejections(dataset_id: str):  # type: ignore[no-untyped-def]
             writer.writerow({
                 "id": str(r.get("_id")),
                 "raw_payload": json.dumps(r.get("raw_payload")),
+                "code": r.get("code"),
                 "reason": r.get("reason"),
                 "created_at": r.get("created_at").isoformat() if r.get("created_at") else "",
             })
@@ -331,5 +386,23 @@ def dataset_rejections(dataset_id: str):  # type: ignore[no-untyped-def]
             output.seek(0)
             output.truncate(0)
 
-    return StreamingResponse(gen(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=rejections.csv"})
+    return with_validators(
+        StreamingResponse(gen(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=rejections.csv"}),
+        validators,
+    )
+
 
+
+# DELETE /datasets/{id} — remove a dataset and everything keyed by it, in the background
+@router.delete("/{dataset_id}", status_code=202)
+def delete_dataset(dataset_id: str, background_tasks: BackgroundTasks, archive: bool = False):  # type: ignore[no-untyped-def]
+    db = get_db()
+    try:
+        doc = claim_for_purge(db, str(dataset_id), drop=True, archive=archive)
+    except DatasetBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    # Same throttled batches as retention; a crash mid-way is finished by the next retention pass
+    background_tasks.add_task(run_purge, db, doc)
+    return {"id": str(dataset_id), "status": "deleting", "archive": archive}
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from ..readiness import pending_checks
+
+
+router = APIRouter(tags=["health"])
+
+
+# Liveness: the process is up and serving; never touches the database
+@router.get("/health")
+def health():  # type: ignore[no-untyped-def]
+    return {"status": "ok"}
+
+
+# Readiness: startup work is done and a Mongo server is known to be reachable
+@router.get("/ready")
+def ready():  # type: ignore[no-untyped-def]
+    from ..db import get_mongo
+
+    pending = pending_checks()
+    if not pending and not get_mongo().topology_description.has_readable_server():
+        pending = ["mongo"]
+    if pending:
+        return ORJSONResponse({"status": "starting", "pending": pending}, status_code=503)
+    return {"status": "ready"}
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from ..metrics import render_metrics
 
 
 router = APIRouter()
@@ -10,7 +12,7 @@ router = APIRouter()
 
 @router.get("/metrics", response_class=PlainTextResponse)
 def metrics() -> PlainTextResponse:
-    return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 
@@ -3,14 +3,18 @@ from __future__ import annotations
 import csv
 import io
 import json
-from typing import Any, List
+from typing import Any, Iterable
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
 import structlog
 
+from .. import tracing
+from ..columnar import column_names, is_columnar, iter_rows, source_for_columns
 from ..core import PipelineResult, run_pipeline_from_rows, save_artifacts
 from ..config import get_settings
+from ..http_cache import conditional_file
+from ..jobs import track_ingest_job
+from ..profiling import ProfileRequest, profile_request, run_profiled
 
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
@@ -18,12 +22,17 @@ logger = structlog.get_logger(__name__)
 
 
 @router.post("/run")
-async def run_pipeline(file: UploadFile | None = File(default=None)):  # type: ignore[no-untyped-def]
-    """Run the pipeline on an uploaded CSV or JSON array.
+async def run_pipeline(  # type: ignore[no-untyped-def]
+    response: Response,
+    file: UploadFile | None = File(default=None),
+    profile_req: ProfileRequest | None = Depends(profile_request),
+):
+    """Run the pipeline on an uploaded CSV, JSON array, Parquet or Arrow IPC file.
 
     Returns candidates, metrics, and rejections_count. Always writes artifacts.
+    With ``?profile=`` (admin) the response also links the stored profile.
     """
-    rows: List[dict[str, Any]]
+    rows: Iterable[dict[str, Any]]
     source = "unknown"
 
     if file is None:
@@ -35,7 +44,16 @@ async def run_pipeline(file: UploadFile | None = File(default=None)):  # type: i
         raise HTTPException(status_code=400, detail=f"Error reading file: {exc}") from exc
 
     filename = file.filename or ""
-    if filename.endswith(".csv"):
+    if is_columnar(filename):
+        try:
+            source = source_for_columns(column_names(data, filename))
+        except ImportError as exc:
+            raise HTTPException(status_code=415, detail=str(exc)) from exc
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=400, detail="Invalid Parquet/Arrow file") from exc
+        # Record batches are read lazily from the (zero-copy) upload buffer
+        rows = iter_rows(data, filename)
+    elif filename.endswith(".csv"):
         source = "alpha"
         text = data.decode("utf-8", errors="replace")
         reader = csv.DictReader(io.StringIO(text))
@@ -52,8 +70,14 @@ async def run_pipeline(file: UploadFile | None = File(default=None)):  # type: i
     else:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    result: PipelineResult = run_pipeline_from_rows(rows, source)
-    save_artifacts(result)
+    def run() -> PipelineResult:
+        result = run_pipeline_from_rows(rows, source)
+        with tracing.span("pipeline.save_artifacts"):
+            save_artifacts(result)
+        return result
+
+    with track_ingest_job():
+        result, profile = run_profiled(profile_req, "pipeline", run)
 
     logger.info(
         "pipeline_completed",
@@ -62,11 +86,15 @@ async def run_pipeline(file: UploadFile | None = File(default=None)):  # type: i
         rejected=result.metrics.get("rejected"),
     )
 
-    return {
+    body = {
         "candidates": result.candidates,
         "metrics": result.metrics,
         "rejections_count": len(result.rejections),
     }
+    if profile is not None and profile_req is not None and profile_req.admin:
+        response.headers["X-Profile"] = profile.url
+        body["profile"] = profile.out()
+    return body
 
 
 @router.get("/last")
@@ -97,34 +125,34 @@ def last_run():  # type: ignore[no-untyped-def]
 
 
 @router.get("/download/candidates.json")
-def download_candidates():  # type: ignore[no-untyped-def]
+def download_candidates(request: Request):  # type: ignore[no-untyped-def]
     """Download pretty-formatted candidates JSON."""
     import os
     art = get_settings().artifacts_dir
     path = os.path.join(art, "resubmission_candidates.json")
-    return FileResponse(path=path, media_type="application/json", filename="resubmission_candidates.json")
+    return conditional_file(request, path, media_type="application/json", filename="resubmission_candidates.json")
 
 
 @router.get("/download/metrics.json")
-def download_metrics():  # type: ignore[no-untyped-def]
+def download_metrics(request: Request):  # type: ignore[no-untyped-def]
     import os
     art = get_settings().artifacts_dir
     path = os.path.join(art, "resubmission_metrics.json")
-    return FileResponse(path=path, media_type="application/json", filename="resubmission_metrics.json")
+    return conditional_file(request, path, media_type="application/json", filename="resubmission_metrics.json")
 
 
 @router.get("/download/rejections.jsonl")
-def download_rejections_log():  # type: ignore[no-untyped-def]
+def download_rejections_log(request: Request):  # type: ignore[no-untyped-def]
     import os
     art = get_settings().artifacts_dir
     path = os.path.join(art, "rejections.log.jsonl")
-    return FileResponse(path=path, media_type="text/plain", filename="rejections.log.jsonl")
+    return conditional_file(request, path, media_type="text/plain", filename="rejections.log.jsonl")
 
 
 @router.get("/download/rejections.json")
-def download_rejections_json():  # type: ignore[no-untyped-def]
+def download_rejections_json(request: Request):  # type: ignore[no-untyped-def]
     import os
     art = get_settings().artifacts_dir
     path = os.path.join(art, "rejections.json")
-    return FileResponse(path=path, media_type="application/json", filename="rejections.json")
+    return conditional_file(request, path, media_type="application/json", filename="rejections.json")
 
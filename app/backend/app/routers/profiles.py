@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import os
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from ..profiling import check_admin_token, profiles_dir
+
+
+# Stored profiles (PROFILE_DIR): stack samples name internal code paths, so like
+# ?profile= itself they need X-Admin-Token rather than the public /artifacts mount
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+@router.get("/{name}")
+def get_profile(name: str, x_admin_token: str | None = Header(None)):  # type: ignore[no-untyped-def]
+    try:
+        check_admin_token(x_admin_token)
+    except PermissionError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from exc
+    path = os.path.join(profiles_dir(), os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(path))
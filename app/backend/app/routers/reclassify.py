@@ -2,9 +2,14 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
+from ..candidates import refresh_candidates
 from ..config import get_settings
-from ..db import get_db
+from ..db import bump_version, dataset_filter, get_db
 from ..classifier import classify_reason
+from ..classifier_backends import resolve_reasons
+from ..eligibility import evaluate, predicate_for
+from ..rollups import RollupDeltas, is_rolled_up
+from ..storage import decode_claim, encode_claim
 
 
 router = APIRouter(prefix="/reclassify", tags=["classifier"])
@@ -16,37 +21,43 @@ def reclassify(dataset_id: str, mode: str | None = None):  # type: ignore[no-unt
     mode_eff = mode or settings.classifier_mode
     updated = 0
     db = get_db()
-    items = list(db["claims"].find({"dataset_id": str(dataset_id)}))
+    # Classify each distinct reason once (batched through the model backend for "llm")
+    reasons = db["claims"].distinct("denial_reason", {"dataset_id": str(dataset_id)})
+    resolved = resolve_reasons(reasons, mode_eff, db=db)
+    items = db["claims"].find(
+        {"dataset_id": str(dataset_id)},
+        {
+            "denial_reason": 1, "status": 1, "patient_id": 1, "submitted_at": 1,
+            "source_system": 1, "canonical_reason": 1, "eligibility": 1,
+        },
+    )
+    passes_rules = predicate_for(settings.eligibility_reference_date)
+    # Old and new rollup key of every claim, from the documents read here anyway;
+    # a dataset still ingesting is rolled up as a whole when it completes
+    deltas = RollupDeltas() if is_rolled_up(db, str(dataset_id)) else None
     for c in items:
-        cls = classify_reason(c.get("denial_reason"), mode=mode_eff)
-        if (
-            c.get("status") == "denied"
-            and c.get("patient_id")
-            and c.get("submitted_at")
-            and c["submitted_at"].date() < settings.eligibility_reference_date
-        ):
-            if cls.label == "retryable" and cls.canonical_reason:
-                c["eligibility"] = True
-                c["eligibility_reason"] = cls.canonical_reason
-                c["exclusion_reason"] = None
-            elif cls.label == "non-retryable":
-                c["eligibility"] = False
-                c["eligibility_reason"] = None
-                c["exclusion_reason"] = cls.canonical_reason
-            else:
-                c["eligibility"] = False
-                c["eligibility_reason"] = None
-                c["exclusion_reason"] = "Ambiguous"
+        decode_claim(c)
+        reason = c.get("denial_reason")
+        cls = resolved.get(reason) or classify_reason(reason, mode=mode_eff)
+        eligible_by_rules = passes_rules(c)
+        outcome = evaluate(eligible_by_rules, cls)
+        if eligible_by_rules:
             updated += 1
-        else:
-            c["eligibility"] = False
-            c["eligibility_reason"] = None
-            c["exclusion_reason"] = "Not eligible by rules"
-        db["claims"].update_one({"_id": c["_id"]}, {"$set": {
-            "eligibility": c["eligibility"],
-            "eligibility_reason": c.get("eligibility_reason"),
-            "exclusion_reason": c.get("exclusion_reason"),
-        }})
+        db["claims"].update_one({"_id": c["_id"]}, {"$set": encode_claim({
+            "classification_label": cls.label,
+            "canonical_reason": cls.canonical_reason,
+            "eligibility": outcome.eligible,
+            "eligibility_reason": outcome.eligibility_reason,
+            "exclusion_reason": outcome.exclusion_reason,
+        })})
+        if deltas is not None:
+            deltas.claim(c, -1)
+            deltas.claim({**c, "canonical_reason": cls.canonical_reason, "eligibility": outcome.eligible})
+    refresh_candidates(db, str(dataset_id))
+    if deltas is not None:
+        deltas.apply(db, str(dataset_id))
+    # Claims changed even when candidates are not materialized
+    db["datasets"].update_one(dataset_filter(str(dataset_id)), bump_version({}))
     return {"updated": updated, "mode": mode_eff}
 
 
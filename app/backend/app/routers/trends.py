@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import APIRouter, HTTPException
+import structlog
+
+from ..db import get_db
+from ..rollups import trends
+
+
+router = APIRouter(prefix="/trends", tags=["trends"])
+logger = structlog.get_logger(__name__)
+
+
+# Denial-reason and eligibility trends across all datasets, from the daily rollups
+@router.get("")
+@router.get("/")
+def claim_trends(  # type: ignore[no-untyped-def]
+    start: date | None = None,
+    end: date | None = None,
+    interval: str = "day",
+    group_by: str = "canonical_reason",
+    source_system: str | None = None,
+    canonical_reason: str | None = None,
+):
+    try:
+        series = trends(get_db(), start, end, interval, group_by, source_system, canonical_reason)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"interval": interval, "group_by": group_by, "series": series}
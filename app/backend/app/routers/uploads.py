@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from fastapi import APIRouter, Form, HTTPException, Request
+import structlog
+
+from ..config import get_settings
+from ..columnar import is_columnar
+from ..db import dataset_filter, get_db
+from ..ingest import (
+    UnsupportedInput,
+    claim_for_resume,
+    complete_upload,
+    create_dataset,
+    detect_source,
+    resume_dataset,
+    run_ingest,
+)
+from ..jobs import track_ingest_job
+from ..metrics import ingestion_latency
+from ..schemas import DatasetCreateResponse
+from ..sniff import SchemaMismatch, sniff
+
+
+# Chunked, resumable uploads:
+#   POST /uploads                          -> {"upload_id", "offset": 0}
+#   PUT  /uploads/{id}?offset=N  (body)    -> {"offset": N + len(body)}; 409 + current offset on mismatch
+#   GET  /uploads/{id}                     -> current offset, to resume after a dropped connection
+#   POST /uploads/{id}/finalize            -> ingest the spooled file (retry resumes from the checkpoint)
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+logger = structlog.get_logger(__name__)
+
+
+def _spool_path(upload_id: str) -> str:
+    return os.path.join(get_settings().upload_spool_dir, f"{upload_id}.part")
+
+
+def _get_upload(db, upload_id: str) -> Dict[str, Any]:  # type: ignore[no-untyped-def]
+    from bson import ObjectId
+
+    if not ObjectId.is_valid(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    upload = db["uploads"].find_one({"_id": ObjectId(upload_id)})
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def _upload_out(upload: Dict[str, Any]) -> Dict[str, Any]:
+    path = _spool_path(str(upload["_id"]))
+    return {
+        "upload_id": str(upload["_id"]),
+        "filename": upload["filename"],
+        "status": upload["status"],
+        "offset": os.path.getsize(path) if os.path.exists(path) else upload.get("size", 0),
+        "total_size": upload.get("total_size"),
+        "dataset_id": upload.get("dataset_id"),
+    }
+
+
+@router.post("")
+@router.post("/")
+def init_upload(  # type: ignore[no-untyped-def]
+    filename: str = Form(...),
+    source_system: str | None = Form(None),
+    total_size: int | None = Form(None),
+):
+    settings = get_settings()
+    if total_size is not None and total_size > settings.max_chunked_upload_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="File too large")
+    os.makedirs(settings.upload_spool_dir, exist_ok=True)
+    db = get_db()
+    upload = {
+        "filename": os.path.basename(filename),
+        "source_system": source_system,
+        "total_size": total_size,
+        "size": 0,
+        "status": "open",
+        "dataset_id": None,
+        "created_at": datetime.utcnow(),
+    }
+    upload["_id"] = db["uploads"].insert_one(upload).inserted_id
+    open(_spool_path(str(upload["_id"])), "wb").close()
+    logger.info("upload_started", upload_id=str(upload["_id"]), filename=upload["filename"])
+    return _upload_out(upload)
+
+
+@router.get("/{upload_id}")
+def upload_status(upload_id: str):  # type: ignore[no-untyped-def]
+    return _upload_out(_get_upload(get_db(), upload_id))
+
+
+def _append(path: str, offset: int, chunk: bytes) -> int:
+    """Append ``chunk`` if the spool file is exactly ``offset`` bytes long.
+
+    The file size is the source of truth for the offset; the exclusive lock
+    serializes concurrent appends to the same upload.
+    """
+    with open(path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            current = os.fstat(f.fileno()).st_size
+            if current != offset:
+                return -current - 1
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+            return current + len(chunk)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@router.put("/{upload_id}")
+async def append_chunk(upload_id: str, offset: int, request: Request):  # type: ignore[no-untyped-def]
+    settings = get_settings()
+    db = get_db()
+    upload = _get_upload(db, upload_id)
+    if upload["status"] != "open":
+        raise HTTPException(status_code=409, detail="Upload is already finalized")
+    chunk = await request.body()
+    if len(chunk) > settings.upload_chunk_max_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    if offset + len(chunk) > settings.max_chunked_upload_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    if offset == 0 and not is_columnar(upload["filename"]):
+        # The first chunk is the file's head: refuse a mismatched file before the rest is sent
+        try:
+            src = detect_source(upload["filename"], upload.get("source_system"))
+            sniff(chunk, upload["filename"], src, partial=len(chunk) != upload.get("total_size"))
+        except SchemaMismatch as exc:
+            db["uploads"].update_one({"_id": upload["_id"]}, {"$set": {"status": "failed", "error": str(exc)}})
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    size = await asyncio.to_thread(_append, _spool_path(upload_id), offset, chunk)
+    if size < 0:
+        current = -size - 1
+        raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": current})
+    db["uploads"].update_one({"_id": upload["_id"]}, {"$set": {"size": size}})
+    return {"upload_id": upload_id, "offset": size}
+
+
+@router.post("/{upload_id}/finalize", response_model=DatasetCreateResponse)
+def finalize_upload(upload_id: str):  # type: ignore[no-untyped-def]
+    db = get_db()
+    upload = _get_upload(db, upload_id)
+    path = _spool_path(upload_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Upload data is no longer available")
+    size = os.path.getsize(path)
+    if upload.get("total_size") is not None and size != upload["total_size"]:
+        raise HTTPException(
+            status_code=409, detail={"message": "Upload incomplete", "offset": size, "total_size": upload["total_size"]}
+        )
+
+    with track_ingest_job(), ingestion_latency.time():
+        try:
+            if upload.get("dataset_id") is None:
+                # A finalize that died before creating its dataset may be taken over once stale
+                stale = datetime.utcnow() - timedelta(seconds=get_settings().ingest_stale_after_s)
+                claimed = db["uploads"].find_one_and_update(
+                    {
+                        "_id": upload["_id"],
+                        "dataset_id": None,
+                        "$or": [{"status": "open"}, {"status": "finalizing", "finalizing_at": {"$lt": stale}}],
+                    },
+                    {"$set": {"status": "finalizing", "finalizing_at": datetime.utcnow(), "size": size}},
+                )
+                if claimed is None:
+                    raise HTTPException(status_code=409, detail="Upload is already being finalized")
+                src = detect_source(upload["filename"], upload.get("source_system"), path)
+                layout = sniff(path, upload["filename"], src)
+                dataset_id = create_dataset(db, upload["filename"], src, source_path=path, layout=layout)
+                db["uploads"].update_one({"_id": upload["_id"]}, {"$set": {"dataset_id": dataset_id}})
+                result = run_ingest(db, dataset_id, path, upload["filename"], src, layout=layout)
+            else:
+                # Retry after a crash: continue from the dataset's checkpoint
+                dataset = db["datasets"].find_one(dataset_filter(upload["dataset_id"]))
+                if dataset is not None and dataset.get("status") == "ingested":
+                    raise HTTPException(status_code=409, detail="Upload is already ingested")
+                claimed = claim_for_resume(db, upload["dataset_id"])
+                if claimed is None:
+                    raise HTTPException(status_code=409, detail="Ingest is still in progress")
+                result = resume_dataset(db, claimed)
+        except HTTPException:
+            raise
+        except SchemaMismatch as exc:
+            db["uploads"].update_one({"_id": upload["_id"]}, {"$set": {"status": "failed"}})
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+        except UnsupportedInput as exc:
+            db["uploads"].update_one({"_id": upload["_id"]}, {"$set": {"status": "failed"}})
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except ImportError as exc:
+            raise HTTPException(status_code=415, detail=str(exc)) from exc
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("upload_finalize_failed", upload_id=upload_id)
+            raise HTTPException(status_code=500, detail="Failed to ingest dataset") from exc
+
+    complete_upload(db, result.dataset_id, path)
+    return DatasetCreateResponse(
+        id=result.dataset_id,
+        filename=result.filename,
+        source_system=result.source_system,
+        record_count=result.accepted,
+        metrics={"rejected": result.rejected, "rejection_codes": result.rejection_codes},
+    )
@@ -0,0 +1,29 @@
+"""Add datasets ingested before trend rollups existed to ``claim_rollups``.
+
+Each pending dataset is grouped once over its own claims; datasets already
+counted are skipped, so the script can be re-run safely. It also finishes
+roll-ups interrupted by a crash, once their claim is older than
+INGEST_STALE_AFTER_S.
+
+Usage:
+    python -m app.scripts.backfill_rollups
+"""
+from __future__ import annotations
+
+import argparse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    from ..db import get_db
+    from ..logging import configure_logging
+    from ..rollups import backfill
+
+    configure_logging()
+    print(f"rolled up {backfill(get_db())} dataset(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Lookup cost of the fuzzy reason index versus a linear scan as vocabulary grows.
+
+Builds synthetic payer-phrase vocabularies, then times whole-string lookups of
+misspelled phrases through ``FuzzyIndex.lookup`` (n-gram candidates + rapidfuzz)
+and ``FuzzyIndex.scan`` (score every phrase).
+
+Usage:
+    python -m app.scripts.bench_fuzzy --sizes 100,1000,10000,100000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from ..fuzzy_index import FuzzyIndex
+
+# English letter frequencies, so n-gram selectivity resembles real payer text
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+LETTER_WEIGHTS = [12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8, 2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1, 0.1]
+
+
+def synthetic_vocabulary(n: int, rng: random.Random) -> Dict[str, str]:
+    # Payer phrases draw from a long-tailed vocabulary of a few thousand words
+    words = [
+        "".join(rng.choices(LETTERS, weights=LETTER_WEIGHTS, k=rng.randint(3, 10))) for _ in range(5000)
+    ]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    vocab: Dict[str, str] = {}
+    while len(vocab) < n:
+        phrase = " ".join(rng.choices(words, weights=weights, k=rng.randint(2, 5)))
+        vocab[phrase] = "Incorrect NPI"
+    return vocab
+
+
+def typo(text: str, rng: random.Random) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1 :]
+
+
+def per_lookup_us(fn, queries: List[str]) -> float:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f"{'vocab':>8} {'build s':>8} {'index us':>9} {'scan us':>9} {'speedup':>8} {'agree':>6}")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        vocab = synthetic_vocabulary(n, rng)
+        start = time.perf_counter()
+        index = FuzzyIndex(vocab)
+        build_s = time.perf_counter() - start
+
+        phrases = list(vocab)
+        queries = [typo(rng.choice(phrases).lower(), rng) for _ in range(args.queries)]
+        index_us = per_lookup_us(lambda q: index.lookup(q, partial_cutoff=None), queries)
+        scan_us = per_lookup_us(index.scan, queries)
+        agree = sum(
+            (a.phrase if (a := index.lookup(q, partial_cutoff=None)) else None)
+            == (b.phrase if (b := index.scan(q)) else None)
+            for q in queries[:100]
+        )
+        print(f"{n:>8} {build_s:>8.2f} {index_us:>9.1f} {scan_us:>9.1f} {scan_us / index_us:>7.1f}x {agree:>5}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure what logging costs a request thread, before and after the queued writer.
+
+- sync json:        the previous setup (json.dumps, printed to the stream on the caller)
+- queue+orjson:     ``app.logging`` (orjson on the caller, a QueueListener thread writes)
+- queue, throttled: the same for an event under ``log_rate_limits``
+
+Each simulated request logs ``--events`` events. ``--sink-delay-ms`` makes every
+write slow, like a blocked stdout pipe or a backed-up container log driver.
+
+Usage:
+    python -m app.scripts.bench_logging --requests 20000 --sink-delay-ms 0,0.2
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import structlog
+
+from .. import logging as app_logging
+from ..config import get_settings
+
+
+class Sink(io.TextIOBase):
+    """Counts lines; optionally sleeps on every write."""
+
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.lines = 0
+
+    def write(self, s: str) -> int:
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        self.lines += s.count("\n")
+        return len(s)
+
+
+def configure_sync(sink: Sink) -> None:
+    # configure_logging before the queued writer
+    app_logging.shutdown_logging()
+    structlog.reset_defaults()
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.dict_tracebacks,
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        logger_factory=structlog.PrintLoggerFactory(sink),
+        cache_logger_on_first_use=True,
+    )
+
+
+def configure_queued(sink: Sink) -> None:
+    app_logging.shutdown_logging()
+    app_logging.configure_logging(stream=sink)
+
+
+MODES: Dict[str, tuple[Callable[[Sink], None], str]] = {
+    "sync json": (configure_sync, "request_handled"),
+    "queue+orjson": (configure_queued, "request_handled"),
+    "queue, throttled": (configure_queued, "claims_listed"),
+}
+
+
+def run(mode: str, requests: int, events: int, delay_s: float) -> None:
+    configure, event = MODES[mode]
+    sink = Sink(delay_s)
+    configure(sink)
+    log = structlog.get_logger("bench")
+    per_request: List[float] = []
+    for i in range(requests):
+        start = time.perf_counter()
+        for j in range(events):
+            log.info(event, dataset_id="6650c0ffee0000000000000a", count=i, step=j, path="/api/datasets")
+        per_request.append(time.perf_counter() - start)
+    app_logging.shutdown_logging()  # flush outside the timed section
+    per_request.sort()
+    mean_us = statistics.fmean(per_request) * 1e6
+    p99_us = per_request[int(len(per_request) * 0.99)] * 1e6
+    print(f"{delay_s * 1000:>8.2f} {mode:>18} {mean_us:>10.1f} {p99_us:>10.1f} {sink.lines:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=3, help="log events per request")
+    parser.add_argument("--sink-delay-ms", default="0,0.2", help="comma separated write delays")
+    args = parser.parse_args()
+
+    # Room for every line, so the queued modes are timed without drops
+    get_settings().log_queue_size = args.requests * args.events
+    print(f"{'delay_ms':>8} {'mode':>18} {'mean_us':>10} {'p99_us':>10} {'written':>9}")
+    for delay_ms in [float(d) for d in args.sink_delay_ms.split(",")]:
+        for mode in MODES:
+            run(mode, args.requests, args.events, delay_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Measure the normalize stage with and without string sharing.
+
+Rows are round-tripped through CSV text so every value is a fresh string, as
+with ``csv.DictReader`` on an upload.
+
+- plain:    uncached normalizers, every record owns its strings
+- interned: memoized normalizers plus a per-ingest ``StringTable``
+
+Reports best-of-N wall time per row and ``tracemalloc`` bytes retained by the
+normalized records (raw rows excluded), plus the distinct strings in the table.
+
+Usage:
+    python -m app.scripts.bench_normalize --rows 200000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import io
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from ..records import ClaimRecord, from_alpha
+from ..utils_normalize import (
+    StringTable,
+    normalize_code,
+    normalize_datetime,
+    normalize_string,
+    title_case_denial,
+)
+from .measure_storage import synthetic_claims
+
+
+def csv_rows(n: int) -> List[Dict[str, Any]]:
+    raws = [raw for _, raw in synthetic_claims(n)]
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(raws[0]))
+    writer.writeheader()
+    writer.writerows(raws)
+    buf.seek(0)
+    return list(csv.DictReader(buf))
+
+
+def plain_alpha(row: Dict[str, Any]) -> ClaimRecord:
+    status = (row.get("status") or "").strip().lower()
+    if status not in {"approved", "denied"}:
+        raise ValueError(f"unknown status: {status}")
+    return ClaimRecord(
+        claim_id=normalize_string(row.get("claim_id")) or "",
+        patient_id=normalize_string(row.get("patient_id")),
+        procedure_code=normalize_string(row.get("procedure_code")),
+        denial_reason=title_case_denial.__wrapped__(row.get("denial_reason")),
+        status=status,
+        submitted_at=normalize_datetime.__wrapped__(row.get("submitted_at", "")),
+        source_system="alpha",
+    )
+
+
+def clear_caches() -> None:
+    normalize_code.cache_clear()
+    normalize_datetime.cache_clear()
+    title_case_denial.cache_clear()
+
+
+def run(
+    rows: List[Dict[str, Any]], build: Callable[[Dict[str, Any]], ClaimRecord], repeat: int
+) -> Tuple[float, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        clear_caches()
+        gc.collect()
+        start = time.perf_counter()
+        for row in rows:
+            build(row)
+        best = min(best, time.perf_counter() - start)
+
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(row) for row in rows]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return best / len(rows) * 1e6, retained / len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = csv_rows(args.rows)
+    from_alpha(rows[0])  # import dateutil outside the timed region
+
+    plain_us, plain_bytes = run(rows, plain_alpha, args.repeat)
+    table = StringTable()
+    interned_us, interned_bytes = run(rows, lambda row: from_alpha(row, table), args.repeat)
+
+    print(f"{'path':>9} {'us/row':>8} {'retained B/row':>15}")
+    print(f"{'plain':>9} {plain_us:8.2f} {plain_bytes:15.0f}")
+    print(f"{'interned':>9} {interned_us:8.2f} {interned_bytes:15.0f}")
+    print(
+        f"speedup {plain_us / interned_us:.2f}x, memory {plain_bytes / interned_bytes:.2f}x smaller,"
+        f" {len(table)} distinct strings in the table"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare response serialization paths for large claim lists.
+
+- jsonable_encoder: what FastAPI does for a plain return value (recursive
+  encoder walk, then ORJSONResponse.render)
+- orjson direct:    ``serialization.dumps`` with the BSON ``default`` hook
+- streamed:         ``serialization.stream_json_array`` chunked encoding
+
+Usage:
+    python -m app.scripts.bench_serialization --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from ..serialization import dumps, stream_json_array
+from .measure_storage import synthetic_claims
+
+
+def build_docs(n: int) -> List[Dict[str, Any]]:
+    docs = []
+    for doc, raw in synthetic_claims(n):
+        doc["id"] = str(ObjectId())
+        doc["raw_payload"] = raw
+        docs.append(doc)
+    return docs
+
+
+def via_jsonable_encoder(docs: List[Dict[str, Any]]) -> bytes:
+    return ORJSONResponse(content=None).render(jsonable_encoder(docs))
+
+
+def via_orjson(docs: List[Dict[str, Any]]) -> bytes:
+    return dumps(docs)
+
+
+def via_stream(docs: List[Dict[str, Any]]) -> bytes:
+    return b"".join(stream_json_array(docs))
+
+
+PATHS: Dict[str, Callable[[List[Dict[str, Any]]], bytes]] = {
+    "jsonable_encoder": via_jsonable_encoder,
+    "orjson direct": via_orjson,
+    "streamed": via_stream,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    print(f"{'claims':>9} {'path':>18} {'seconds':>9} {'MB':>8} {'speedup':>8}")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        docs = build_docs(n)
+        baseline = None
+        for name, fn in PATHS.items():
+            start = time.perf_counter()
+            body = fn(docs)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{n:>9} {name:>18} {elapsed:>9.3f} {len(body) / 1e6:>8.1f} {baseline / elapsed:>7.1f}x")
+        del docs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Startup benchmark with a time budget.
+
+1. Runs ``python -X importtime -c "import app.main"`` and reports the total
+   import time, the slowest modules, and any heavy dependency that leaked onto
+   the import path.
+2. Starts uvicorn and measures time-to-first-request against ``/health``
+   (liveness does not wait for Mongo, so this works without a database).
+
+Exits non-zero when a budget is exceeded, so it can run in CI.
+
+Usage:
+    python -m app.scripts.bench_startup [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+IMPORT_BUDGET_MS = 600.0
+TTFR_BUDGET_MS = 2000.0
+
+# Must only be imported on first use, never by ``import app.main``
+LAZY_MODULES = ("rapidfuzz", "dateutil", "pymongo", "prefect", "pandas", "polars", "pyarrow")
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def importtime() -> Tuple[float, Dict[str, int], List[str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    self_us: Dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        own, cumulative, _, module = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        self_us[module] = own
+        if module == "app.main":
+            total_us = cumulative
+    leaked = sorted({m.split(".")[0] for m in self_us if m.split(".")[0] in LAZY_MODULES})
+    return total_us / 1000, self_us, leaked
+
+
+def time_to_first_request(port: int) -> float:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("server exited before answering")
+            if time.perf_counter() - start > 30:
+                raise RuntimeError("server did not answer within 30s")
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    imports = [importtime() for _ in range(args.runs)]
+    import_ms = statistics.median(run[0] for run in imports)
+    _, self_us, leaked = imports[-1]
+    ttfr_ms = statistics.median(time_to_first_request(args.port) for _ in range(args.runs))
+
+    print(f"import app.main: {import_ms:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)")
+    print("slowest modules (self time, last run):")
+    for module, us in sorted(self_us.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"  {us / 1000:8.1f}ms  {module}")
+    print(f"time to first request: {ttfr_ms:.0f}ms (budget {TTFR_BUDGET_MS:.0f}ms)")
+
+    failures = []
+    if leaked:
+        failures.append(f"heavy modules imported eagerly: {', '.join(leaked)}")
+    if import_ms > IMPORT_BUDGET_MS:
+        failures.append("import budget exceeded")
+    if ttfr_ms > TTFR_BUDGET_MS:
+        failures.append("time-to-first-request budget exceeded")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
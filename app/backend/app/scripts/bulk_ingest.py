@@ -0,0 +1,156 @@
+"""Bulk-ingest a drop folder straight into Mongo, bypassing HTTP.
+
+Each file becomes one dataset, processed by the same normalize/classify/persist
+code as ``POST /api/datasets`` (``app.ingest.ingest_dataset``) in a pool of
+worker processes. Finished files are recorded in a JSON checkpoint (keyed by
+path, size and mtime), so an interrupted backfill resumes where it stopped and
+changed files are picked up again.
+
+Usage:
+    python -m app.scripts.bulk_ingest /data/drop --workers 8
+    python -m app.scripts.bulk_ingest "/data/drop/2024-*/*.csv" --source-system alpha
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..columnar import COLUMNAR_SUFFIXES
+
+DEFAULT_SUFFIXES = (".csv", ".json") + COLUMNAR_SUFFIXES
+
+
+def discover(targets: List[str]) -> List[str]:
+    """Expand directories (recursively, known suffixes) and glob patterns to files."""
+    found = []
+    for target in targets:
+        if os.path.isdir(target):
+            for root, _, names in os.walk(target):
+                found.extend(os.path.join(root, n) for n in names if n.lower().endswith(DEFAULT_SUFFIXES))
+        else:
+            found.extend(p for p in glob.glob(target, recursive=True) if os.path.isfile(p))
+    return sorted({os.path.abspath(p) for p in found})
+
+
+def _fingerprint(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"done": {}}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)  # atomic: a crash never leaves a truncated checkpoint
+
+
+def ingest_one(path: str, source_system: Optional[str]) -> Dict[str, Any]:
+    """Worker entry point; each process opens its own Mongo client on first use."""
+    from ..db import get_db
+    from ..ingest import ingest_dataset
+
+    result = ingest_dataset(get_db(), path, path, source_system, uploaded_by="bulk_ingest")
+    return asdict(result)
+
+
+def _report(results: List[Dict[str, Any]], failures: List[Tuple[str, str]], elapsed: float) -> None:
+    rows = sum(r["accepted"] + r["rejected"] for r in results)
+    rejected = sum(r["rejected"] for r in results)
+    mb = sum(r["bytes_read"] for r in results) / 1e6
+    elapsed = max(elapsed, 1e-9)
+    print(f"files:    {len(results)} ingested, {len(failures)} failed")
+    print(f"rows:     {rows} ({rejected} rejected)")
+    print(f"elapsed:  {elapsed:.1f}s")
+    print(f"rate:     {rows / elapsed:,.0f} rows/s, {mb / elapsed:.2f} MB/s ({mb:.1f} MB)")
+    for path, error in failures:
+        print(f"FAILED {path}: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="+", help="directories and/or glob patterns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 runs inline")
+    parser.add_argument("--source-system", default=None, help="override source detection")
+    parser.add_argument("--checkpoint", default=None, help="default: <artifacts_dir>/bulk_ingest_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the existing checkpoint")
+    args = parser.parse_args()
+
+    from ..config import get_settings
+    from ..db import create_indexes
+    from ..logging import configure_logging
+    from ..tracing import configure_tracing
+
+    configure_logging()
+    configure_tracing()
+    # The API builds indexes in the background; ingest relies on the unique claim
+    # and candidate keys, so make sure they exist before any file is written
+    create_indexes()
+    checkpoint_path = args.checkpoint or os.path.join(get_settings().artifacts_dir, "bulk_ingest_checkpoint.json")
+    checkpoint = {"done": {}} if args.restart else load_checkpoint(checkpoint_path)
+    done = checkpoint["done"]
+
+    files = discover(args.targets)
+    pending = [
+        p for p in files
+        if not (p in done and {k: done[p].get(k) for k in ("size", "mtime")} == _fingerprint(p))
+    ]
+    print(f"{len(files)} files found, {len(files) - len(pending)} already done, {len(pending)} to ingest")
+
+    results: List[Dict[str, Any]] = []
+    failures: List[Tuple[str, str]] = []
+
+    def record(path: str, result: Dict[str, Any]) -> None:
+        results.append(result)
+        done[path] = {**_fingerprint(path), "dataset_id": result["dataset_id"],
+                      "accepted": result["accepted"], "rejected": result["rejected"]}
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    start = time.perf_counter()
+    if args.workers <= 0:
+        for path in pending:
+            try:
+                record(path, ingest_one(path, args.source_system))
+            except Exception as exc:  # noqa: BLE001
+                failures.append((path, str(exc)))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            # Bounded submission keeps the checkpoint close to what has actually finished
+            queue = iter(pending)
+            running: Dict[Future, str] = {}
+            for path in queue:
+                running[pool.submit(ingest_one, path, args.source_system)] = path
+                if len(running) >= args.workers * 2:
+                    break
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = running.pop(future)
+                    try:
+                        record(path, future.result())
+                    except Exception as exc:  # noqa: BLE001
+                        failures.append((path, str(exc)))
+                    nxt = next(queue, None)
+                    if nxt is not None:
+                        running[pool.submit(ingest_one, nxt, args.source_system)] = nxt
+    _report(results, failures, time.perf_counter() - start)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Distributed ingestion worker (see ``app.work_queue``).
+
+Files are split into byte-range work units in the ``ingest_tasks`` collection;
+workers on any host pointed at the same MongoDB lease units, renew the lease
+while processing, and re-queue units whose worker died. Enqueued files must be
+readable at the same path by every worker (shared volume).
+
+Usage:
+    python -m app.scripts.ingest_worker --enqueue /shared/claims.csv --unit-mb 64
+    python -m app.scripts.ingest_worker                         # one worker, runs until killed
+    python -m app.scripts.ingest_worker --processes 4 --exit-when-idle
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from typing import List, Optional
+
+
+def _work(exit_when_idle: bool, poll_s: Optional[float]) -> None:
+    from ..db import get_db
+    from ..logging import configure_logging
+    from ..tracing import configure_tracing
+    from ..work_queue import run_worker
+
+    configure_logging()
+    configure_tracing()
+    run_worker(get_db(), poll_s=poll_s, exit_when_idle=exit_when_idle)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--enqueue", nargs="+", default=[], metavar="PATH", help="split files into work units")
+    parser.add_argument("--unit-mb", type=int, default=None, help="default: INGEST_UNIT_MB")
+    parser.add_argument("--source-system", default=None, help="override source detection")
+    parser.add_argument("--processes", type=int, default=1, help="local worker processes to run (0: enqueue only)")
+    parser.add_argument("--exit-when-idle", action="store_true", help="stop once no units are pending or running")
+    parser.add_argument("--poll", type=float, default=None, help="idle poll interval in seconds")
+    args = parser.parse_args()
+
+    from ..db import create_indexes, dataset_filter, get_db
+    from ..logging import configure_logging
+    from ..tracing import configure_tracing
+    from ..work_queue import TASKS_COLLECTION, enqueue_dataset
+
+    configure_logging()
+    configure_tracing()
+    # Units upsert on the unique claim key and finish_dataset $merges candidates;
+    # only the API builds indexes otherwise
+    create_indexes()
+    db = get_db()
+    dataset_ids: List[str] = []
+    for path in args.enqueue:
+        dataset_ids.append(
+            enqueue_dataset(db, os.path.abspath(path), source_system=args.source_system,
+                            uploaded_by="ingest_worker", unit_bytes=args.unit_mb and args.unit_mb * 1024 * 1024)
+        )
+        print(f"enqueued {path} as dataset {dataset_ids[-1]}")
+    if args.processes <= 0:
+        return
+
+    start = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=_work, args=(args.exit_when_idle, args.poll), name=f"ingest-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        raise
+    elapsed = time.perf_counter() - start
+
+    failed = db[TASKS_COLLECTION].count_documents({"status": "failed"})
+    for dataset_id in dataset_ids:
+        doc = db["datasets"].find_one(dataset_filter(dataset_id)) or {}
+        print(f"dataset {dataset_id}: {doc.get('status')} "
+              f"({doc.get('record_count', 0)} accepted, {doc.get('rejected_count', 0)} rejected)")
+    print(f"elapsed: {elapsed:.1f}s with {args.processes} processes; failed units: {failed}")
+    sys.exit(1 if failed or any(p.exitcode for p in procs) else 0)
+
+
+if __name__ == "__main__":
+    main()
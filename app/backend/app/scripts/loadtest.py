@@ -0,0 +1,108 @@
+"""Measure requests/sec against the production server for several worker counts.
+
+For each worker count this starts ``python -m app.server`` on a scratch port,
+waits for it to answer, drives it with concurrent keep-alive clients for a
+fixed duration and reports throughput and latency percentiles.
+
+Usage:
+    python -m app.scripts.loadtest --workers 1,2,4 --concurrency 64 --duration 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import httpx
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:  # type: ignore[type-arg]
+    env = dict(os.environ, SERVER_WORKERS=str(workers), SERVER_PORT=str(port), SERVER_HOST="127.0.0.1")
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, path: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + path, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready in {timeout}s")
+
+
+async def drive(base_url: str, path: str, concurrency: int, duration: float) -> Tuple[int, int, List[float]]:
+    latencies: List[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10.0) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    if resp.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(latencies), errors, latencies
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--path", default="/api/datasets/health")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        base_url = f"http://127.0.0.1:{args.port}"
+        proc = start_server(workers, args.port)
+        try:
+            wait_ready(base_url, args.path)
+            count, errors, latencies = asyncio.run(drive(base_url, args.path, args.concurrency, args.duration))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        rps = count / args.duration
+        baseline = baseline or rps
+        print(
+            f"{workers:>8} {rps:>10.0f} {percentile(latencies, 0.5) * 1000:>8.1f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7} {rps / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
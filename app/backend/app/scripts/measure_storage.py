@@ -0,0 +1,153 @@
+"""Compare claim storage modes on a synthetic dataset.
+
+For each storage layout this loads N synthetic claims into a scratch database,
+then reports collection/index sizes from ``collStats`` and the latency of the
+typical read paths (dataset listing and eligible-claim scan).
+
+Usage:
+    python -m app.scripts.measure_storage --claims 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pymongo import MongoClient
+
+from ..config import get_settings
+from ..storage import LEAN_PROJECTION, PAYLOADS_COLLECTION, prepare_claim_doc
+
+# (label, raw_payload_storage, compact_codes)
+LAYOUTS: List[Tuple[str, str, bool]] = [
+    ("inline", "inline", False),
+    ("compressed+codes", "compressed", True),
+    ("collection+codes", "collection", True),
+]
+
+REASONS = ["Missing modifier", "Incorrect NPI", "Prior auth required", "Authorization expired", None]
+DATASET_ID = "bench-dataset"
+
+
+def synthetic_claims(n: int, seed: int = 7) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    rng = random.Random(seed)
+    base = datetime(2025, 6, 1, tzinfo=UTC)
+    for i in range(n):
+        source = "alpha" if i % 2 == 0 else "beta"
+        reason = rng.choice(REASONS)
+        status = "denied" if rng.random() < 0.7 else "approved"
+        submitted = base + timedelta(days=rng.randint(0, 60))
+        raw = {
+            "claim_id": f"C{i:08d}",
+            "patient_id": f"P{rng.randint(0, 99999):05d}",
+            "procedure_code": str(rng.choice([99213, 99214, 99215, 93000, 93010])),
+            "denial_reason": reason or "",
+            "submitted_at": submitted.date().isoformat(),
+            "status": status,
+        }
+        eligible = status == "denied" and reason in REASONS[:3]
+        doc = {
+            "dataset_id": DATASET_ID,
+            "claim_id": raw["claim_id"],
+            "patient_id": raw["patient_id"],
+            "procedure_code": raw["procedure_code"],
+            "denial_reason": reason,
+            "status": status,
+            "submitted_at": submitted,
+            "source_system": source,
+            "eligibility": eligible,
+            "eligibility_reason": reason if eligible else None,
+            "exclusion_reason": None if eligible else "Not eligible by rules",
+            "ingested_at": base,
+            "updated_at": base,
+        }
+        yield doc, raw
+
+
+def load(db, n: int, mode: str, batch_size: int) -> float:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    claims: List[Dict[str, Any]] = []
+    payloads: List[Dict[str, Any]] = []
+    for doc, raw in synthetic_claims(n):
+        doc, side = prepare_claim_doc(doc, raw, mode=mode)
+        claims.append(doc)
+        if side is not None:
+            payloads.append(side)
+        if len(claims) >= batch_size:
+            db["claims"].insert_many(claims, ordered=False)
+            if payloads:
+                db[PAYLOADS_COLLECTION].insert_many(payloads, ordered=False)
+            claims, payloads = [], []
+    if claims:
+        db["claims"].insert_many(claims, ordered=False)
+    if payloads:
+        db[PAYLOADS_COLLECTION].insert_many(payloads, ordered=False)
+    db["claims"].create_index([("dataset_id", 1), ("eligibility", 1)])
+    return time.perf_counter() - start
+
+
+def timed_scan(cursor) -> Tuple[float, int]:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    count = sum(1 for _ in cursor)
+    return time.perf_counter() - start, count
+
+
+def coll_stats(db, name: str) -> Dict[str, Any]:  # type: ignore[no-untyped-def]
+    stats = db.command("collStats", name)
+    return {
+        "count": stats.get("count", 0),
+        "size_mb": stats.get("size", 0) / 1e6,
+        "storage_mb": stats.get("storageSize", 0) / 1e6,
+        "index_mb": stats.get("totalIndexSize", 0) / 1e6,
+        "avg_obj_bytes": stats.get("avgObjSize", 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch databases")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    client: MongoClient = MongoClient(settings.mongo_url)
+
+    for label, mode, compact in LAYOUTS:
+        settings.compact_codes = compact
+        db_name = f"{settings.mongo_db}_storage_bench_{mode}"
+        client.drop_database(db_name)
+        db = client[db_name]
+
+        load_s = load(db, args.claims, mode, args.batch_size)
+        list_s, listed = timed_scan(db["claims"].find({"dataset_id": DATASET_ID}, LEAN_PROJECTION))
+        elig_s, eligible = timed_scan(
+            db["claims"].find(
+                {"dataset_id": DATASET_ID, "eligibility": True},
+                {"claim_id": 1, "eligibility_reason": 1, "source_system": 1},
+            )
+        )
+
+        claims = coll_stats(db, "claims")
+        print(f"== {label} ({args.claims} claims)")
+        print(f"   load: {load_s:.1f}s ({args.claims / load_s:,.0f} claims/s)")
+        print(
+            f"   claims: size={claims['size_mb']:.1f}MB storage={claims['storage_mb']:.1f}MB "
+            f"indexes={claims['index_mb']:.1f}MB avg_obj={claims['avg_obj_bytes']}B"
+        )
+        if mode == "collection":
+            side = coll_stats(db, PAYLOADS_COLLECTION)
+            print(f"   {PAYLOADS_COLLECTION}: size={side['size_mb']:.1f}MB storage={side['storage_mb']:.1f}MB")
+        print(f"   list dataset: {list_s * 1000:.0f}ms for {listed} docs")
+        print(f"   eligible scan: {elig_s * 1000:.0f}ms for {eligible} docs")
+
+        if not args.keep:
+            client.drop_database(db_name)
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
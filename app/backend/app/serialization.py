@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import base64
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+import orjson
+from fastapi.responses import Response
+
+
+# Same options ORJSONResponse uses (minus numpy), so output is unchanged
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def bson_default(obj: Any) -> Any:
+    """orjson ``default`` hook for the BSON types Mongo hands back.
+
+    datetime/date/UUID are serialized natively by orjson; this only sees the rest.
+    """
+    type_name = type(obj).__name__
+    if type_name in ("ObjectId", "Decimal128"):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):  # bson.Binary subclasses bytes
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type_name}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=bson_default, option=ORJSON_OPTIONS)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize straight to bytes, skipping FastAPI's recursive ``jsonable_encoder``."""
+    return Response(dumps(content), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def stream_json_array(
+    docs: Iterable[Dict[str, Any]],
+    transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    chunk_size: int = 1000,
+    on_complete: Optional[Callable[[int], None]] = None,
+) -> Iterator[bytes]:
+    """Encode documents into a JSON array chunk by chunk as the cursor yields them."""
+    count = 0
+    buf: list[bytes] = []
+    yield b"["
+    for doc in docs:
+        if transform is not None:
+            doc = transform(doc)
+        buf.append(dumps(doc))
+        count += 1
+        if len(buf) >= chunk_size:
+            yield (b"," if count > len(buf) else b"") + b",".join(buf)
+            buf = []
+    if buf:
+        yield (b"," if count > len(buf) else b"") + b",".join(buf)
+    yield b"]"
+    if on_complete is not None:
+        on_complete(count)
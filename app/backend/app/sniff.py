@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .columnar import column_names, is_columnar
+from .config import get_settings
+from .records import REQUIRED_COLUMNS, get_adapter
+from .utils_normalize import error_code
+
+# In-memory upload body, or a path on disk (CLI; columnar files are memory-mapped)
+Input = Union[bytes, str]
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+DELIMITERS = ",;\t|"
+
+
+class SchemaMismatch(ValueError):
+    """The file's header or sample rows cannot work for its source adapter; maps to HTTP 422."""
+
+
+@dataclass
+class Layout:
+    """What the readers need to know about a file, decided from its first bytes."""
+
+    encoding: str = "utf-8"
+    delimiter: str = ","
+    columns: List[str] = field(default_factory=list)
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"encoding": self.encoding, "delimiter": self.delimiter}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> "Layout":
+        return cls(**(doc or {}))
+
+
+def _head(data: Input, size: int) -> bytes:
+    if isinstance(data, str):
+        with open(data, "rb") as f:
+            return f.read(size)
+    return bytes(data[:size])
+
+
+def detect_encoding(head: bytes) -> str:
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # The head may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        # Payer exports that are not UTF-8 are almost always Windows-1252
+        return "cp1252"
+
+
+def _complete_lines(text: str, truncated: bool) -> str:
+    # Drop a partial last line when the head cut the file short
+    return text[: text.rfind("\n") + 1] if truncated and "\n" in text else text
+
+
+def _csv_head(text: str, truncated: bool, sample_rows: int) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+    text = _complete_lines(text, truncated)
+    first_line = text.split("\n", 1)[0]
+    try:
+        delimiter = csv.Sniffer().sniff(first_line, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    reader = csv.DictReader(io.StringIO(text, newline=""), delimiter=delimiter)
+    columns = list(reader.fieldnames or [])
+    rows = [row for _, row in zip(range(sample_rows), reader)]
+    return delimiter, columns, rows
+
+
+def _json_head(text: str, truncated: bool, sample_rows: int) -> List[Dict[str, Any]]:
+    """Decode the first objects of a JSON array without parsing the whole file."""
+    decoder = json.JSONDecoder()
+    pos = len(text) - len(text.lstrip())
+    if not text.startswith("[", pos):
+        raise SchemaMismatch("JSON must be an array of objects")
+    pos += 1
+    rows: List[Dict[str, Any]] = []
+    while len(rows) < sample_rows:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            break
+        try:
+            obj, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError as exc:
+            if truncated:
+                break  # the head ends mid-object; judge the objects before it
+            raise SchemaMismatch(f"Invalid JSON near character {exc.pos}: {exc.msg}") from exc
+        if not isinstance(obj, dict):
+            raise SchemaMismatch("JSON must be an array of objects")
+        rows.append(obj)
+    return rows
+
+
+def _check_columns(src: str, columns: List[str]) -> None:
+    required = REQUIRED_COLUMNS.get(src)
+    if required is None:
+        raise SchemaMismatch(f"Unknown source system: {src}")
+    missing = [c for c in required if c not in columns]
+    if not missing:
+        return
+    found = ", ".join(columns[:20]) or "none"
+    hint = ""
+    loose = {c.strip().lower(): c for c in columns}
+    near = [f"{loose[c]!r} for {c!r}" for c in missing if c in loose]
+    if near:
+        hint = f" (names must match exactly: found {', '.join(near)})"
+    raise SchemaMismatch(f"Missing required {src} columns: {', '.join(missing)}; found: {found}{hint}")
+
+
+def _check_sample(src: str, rows: List[Dict[str, Any]]) -> None:
+    adapter = get_adapter(src)
+    codes: Dict[str, int] = {}
+    for row in rows:
+        try:
+            adapter(row, None)
+            return
+        except Exception as exc:  # noqa: BLE001
+            code = error_code(exc)
+            codes[code] = codes.get(code, 0) + 1
+    if codes:
+        reasons = ", ".join(f"{code}: {n}" for code, n in sorted(codes.items(), key=lambda kv: -kv[1]))
+        raise SchemaMismatch(f"All {len(rows)} sampled rows were rejected ({reasons})")
+
+
+def sniff(data: Input, filename: str, src: str, partial: bool = False) -> Layout:
+    """Check a file against its source adapter from its head only.
+
+    Detects encoding and CSV delimiter, checks the header (CSV), the keys of the
+    first objects (JSON) or the schema (Parquet/Arrow) against the adapter's
+    required columns, and runs the adapter over the first rows. A file whose
+    sample is rejected entirely is refused before anything is written. Raises
+    ``SchemaMismatch``; files the readers cannot handle at all are left to
+    ``read_rows``. ``partial`` marks ``data`` as only the start of the file.
+    """
+    settings = get_settings()
+    if is_columnar(filename):
+        try:
+            layout = Layout(columns=column_names(data, filename))
+        except ImportError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            raise SchemaMismatch("Invalid Parquet/Arrow file") from exc
+        _check_columns(src, layout.columns)
+        return layout
+
+    head = _head(data, settings.sniff_bytes)
+    truncated = partial or len(head) == settings.sniff_bytes
+    encoding = detect_encoding(head)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head, final=not truncated)
+    if filename.endswith(".csv"):
+        if truncated and "\n" not in text:
+            return Layout(encoding=encoding)  # not even a whole header line yet
+        delimiter, columns, rows = _csv_head(text, truncated, settings.sniff_sample_rows)
+        layout = Layout(encoding=encoding, delimiter=delimiter, columns=columns)
+    elif filename.endswith(".json"):
+        rows = _json_head(text, truncated, settings.sniff_sample_rows)
+        keys = dict.fromkeys(k for row in rows for k in row)
+        layout = Layout(encoding=encoding, columns=list(keys))
+    else:
+        return Layout(encoding=encoding)
+    if not rows:
+        return layout
+    _check_columns(src, layout.columns)
+    _check_sample(src, rows)
+    return layout
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from .config import get_settings
+
+
+# raw_payload storage modes:
+# - inline:     full raw dict on the claim document (original behaviour)
+# - compressed: zlib-compressed BSON in ``raw_payload_z``, excluded from list reads
+# - collection: raw dict in the separate ``claim_payloads`` collection
+# - none:       raw payload is dropped after normalization
+RAW_PAYLOAD_MODES = {"inline", "compressed", "collection", "none"}
+
+PAYLOADS_COLLECTION = "claim_payloads"
+COMPRESSED_FIELD = "raw_payload_z"
+
+# Short codes for low-cardinality strings. Codes are part of the on-disk format:
+# never renumber an existing entry, only append new ones.
+SOURCE_CODES = {
+    "alpha": "a",
+    "beta": "b",
+}
+
+STATUS_CODES = {
+    "approved": "A",
+    "denied": "D",
+}
+
+REASON_CODES = {
+    "Missing modifier": "MM",
+    "Incorrect NPI": "NPI",
+    "Prior auth required": "PA",
+    "Authorization expired": "AE",
+    "Incorrect provider type": "PT",
+    "Ambiguous": "AMB",
+    "Not eligible by rules": "NER",
+}
+
+LABEL_CODES = {
+    "retryable": "R",
+    "non-retryable": "N",
+    "ambiguous": "U",
+}
+
+FIELD_CODES: Dict[str, Dict[str, str]] = {
+    "source_system": SOURCE_CODES,
+    "status": STATUS_CODES,
+    "eligibility_reason": REASON_CODES,
+    "exclusion_reason": REASON_CODES,
+    "classification_label": LABEL_CODES,
+    "canonical_reason": REASON_CODES,
+}
+
+_FIELD_DECODES: Dict[str, Dict[str, str]] = {
+    field: {code: value for value, code in codes.items()} for field, codes in FIELD_CODES.items()
+}
+
+# Projection used by list/scan reads so large payloads never leave the server
+LEAN_PROJECTION = {COMPRESSED_FIELD: 0}
+
+
+def compact_enabled() -> bool:
+    return get_settings().compact_codes
+
+
+def encode_value(field: str, value: Any) -> Any:
+    """Encode a single field value (e.g. for query filters); unknown values pass through."""
+    if not compact_enabled() or not isinstance(value, str):
+        return value
+    codes = FIELD_CODES.get(field)
+    if codes is None:
+        return value
+    return codes.get(value, value)
+
+
+def decode_value(field: str, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    codes = _FIELD_DECODES.get(field)
+    if codes is None:
+        return value
+    return codes.get(value, value)
+
+
+def encode_claim(doc: Dict[str, Any]) -> Dict[str, Any]:
+    if not compact_enabled():
+        return doc
+    for field, codes in FIELD_CODES.items():
+        value = doc.get(field)
+        if isinstance(value, str):
+            doc[field] = codes.get(value, value)
+    return doc
+
+
+def decode_claim(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode short codes back to display values.
+
+    Decoding is unconditional so documents written with ``compact_codes`` on stay
+    readable after the setting is turned off.
+    """
+    for field, codes in _FIELD_DECODES.items():
+        value = doc.get(field)
+        if isinstance(value, str):
+            doc[field] = codes.get(value, value)
+    return doc
+
+
+def compress_payload(raw: Dict[str, Any]) -> Any:
+    from bson import BSON, Binary
+
+    return Binary(zlib.compress(BSON.encode(raw), 6))
+
+
+def decompress_payload(blob: bytes) -> Dict[str, Any]:
+    from bson import BSON
+
+    return BSON(zlib.decompress(blob)).decode()
+
+
+def prepare_claim_doc(
+    doc: Dict[str, Any], raw_payload: Optional[Dict[str, Any]], mode: Optional[str] = None
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Attach the raw payload according to the storage mode and apply short codes.
+
+    Returns the claim document and, for ``collection`` mode, the side document to
+    upsert into ``claim_payloads`` keyed by the claim's natural key.
+    """
+    mode = mode or get_settings().raw_payload_storage
+    if mode not in RAW_PAYLOAD_MODES:
+        raise ValueError(f"unknown raw_payload_storage: {mode}")
+
+    side: Optional[Dict[str, Any]] = None
+    if raw_payload is not None:
+        if mode == "inline":
+            doc["raw_payload"] = raw_payload
+        elif mode == "compressed":
+            doc[COMPRESSED_FIELD] = compress_payload(raw_payload)
+        elif mode == "collection":
+            side = {
+                "dataset_id": doc["dataset_id"],
+                "claim_id": doc["claim_id"],
+                "source_system": doc["source_system"],
+                "raw_payload": raw_payload,
+            }
+    encode_claim(doc)
+    if side is not None:
+        side["source_system"] = doc["source_system"]
+    return doc, side
+
+
+def load_raw_payload(db, claim: Dict[str, Any]) -> Optional[Dict[str, Any]]:  # type: ignore[no-untyped-def]
+    """Fetch the raw payload for a (still encoded) claim document on demand."""
+    if claim.get("raw_payload") is not None:
+        return claim["raw_payload"]
+    blob = claim.get(COMPRESSED_FIELD)
+    if blob is not None:
+        return decompress_payload(blob)
+    side = db[PAYLOADS_COLLECTION].find_one(
+        {
+            "dataset_id": claim["dataset_id"],
+            "claim_id": claim["claim_id"],
+            "source_system": claim["source_system"],
+        },
+        {"raw_payload": 1},
+    )
+    return side.get("raw_payload") if side else None
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import structlog
+
+from .config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Set by ``configure_tracing`` when an exporter is configured and the optional
+# OpenTelemetry packages are installed; every helper below is a no-op otherwise,
+# so call sites never need to check.
+_tracer: Any = None
+_trace: Any = None  # the ``opentelemetry.trace`` module, once imported
+
+EXPORTERS = ("otlp", "file")
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def _exporter(kind: str):  # type: ignore[no-untyped-def]
+    settings = get_settings()
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    path = settings.tracing_file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # One JSON span per line; the file is appended to across restarts
+    out = open(path, "a", encoding="utf-8")  # noqa: SIM115 - owned by the exporter
+    return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+
+
+def configure_tracing() -> bool:
+    """Install the tracer provider once per process; True when spans are recorded.
+
+    Must run before ``connect_mongo`` so the client gets the command listener.
+    A missing ``tracing`` extra only logs a warning: the service runs untraced.
+    """
+    global _tracer, _trace
+    if _tracer is not None:
+        return True
+    settings = get_settings()
+    kind = settings.tracing_exporter
+    if not kind:
+        return False
+    if kind not in EXPORTERS:
+        raise ValueError(f"TRACING_EXPORTER must be one of: {', '.join(EXPORTERS)}")
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("tracing_unavailable", reason="install the 'tracing' extra", exporter=kind)
+        return False
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name, "process.pid": os.getpid()}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    # Spans are exported off the request path, in batches
+    provider.add_span_processor(BatchSpanProcessor(_exporter(kind)))
+    trace.set_tracer_provider(provider)
+    _trace = trace
+    _tracer = trace.get_tracer("claims-backend")
+    logger.info("tracing_configured", exporter=kind, sample_ratio=settings.tracing_sample_ratio)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans (the provider also does this at interpreter exit)."""
+    if _trace is not None:
+        provider = _trace.get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+
+
+def _attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    # OpenTelemetry rejects None; everything else here is already a str/number/bool
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """A child of the current span; yields the span (or None when tracing is off).
+
+    Exceptions are recorded on the span and re-raised.
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def start_span(name: str, kind: str = "INTERNAL", **attributes: Any) -> Any:
+    """Start a child of the current span without making it current; the caller ends it."""
+    if _tracer is None:
+        return None
+    return _tracer.start_span(name, kind=getattr(_trace.SpanKind, kind), attributes=_attributes(attributes))
+
+
+def set_error(current: Any, description: str) -> None:
+    if current is not None:
+        current.set_status(_trace.Status(_trace.StatusCode.ERROR, description))
+
+
+def add_trace_ids(_logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """structlog processor: tag events logged inside a sampled span with its ids."""
+    if _trace is not None:
+        context = _trace.get_current_span().get_span_context()
+        if context.is_valid:
+            event_dict.setdefault("trace_id", format(context.trace_id, "032x"))
+            event_dict.setdefault("span_id", format(context.span_id, "016x"))
+    return event_dict
+
+
+def instrument_app(app) -> None:  # type: ignore[no-untyped-def]
+    """One server span per HTTP request, continuing an incoming ``traceparent``."""
+    from fastapi import Request
+
+    @app.middleware("http")
+    async def trace_request(request: Request, call_next):  # type: ignore[no-untyped-def]
+        if _tracer is None:
+            return await call_next(request)
+        from opentelemetry.propagate import extract
+
+        method = request.method
+        with _tracer.start_as_current_span(
+            f"{method} {request.url.path}",
+            context=extract(request.headers),
+            kind=_trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": request.url.path},
+        ) as current:
+            response = await call_next(request)
+            # The route template is only known once routing has run
+            route = request.scope.get("route")
+            if route is not None:
+                current.update_name(f"{method} {route.path}")
+                current.set_attribute("http.route", route.path)
+            current.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                set_error(current, f"HTTP {response.status_code}")
+            return response
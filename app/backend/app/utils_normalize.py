@@ -3,13 +3,39 @@ from __future__ import annotations
 import json
 import re
 from datetime import UTC, datetime
-from typing import Any, Dict, Iterable, Iterator, Tuple
-
-from dateutil import parser
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 WHITESPACE_RE = re.compile(r"\s+")
 
 
+class NormalizationError(ValueError):
+    """A field could not be normalized; ``code`` is a stable, aggregatable reason.
+
+    The message may carry the offending value; group and count by ``code``.
+    """
+
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+# Code for rejections that did not come from a normalizer
+UNEXPECTED_ERROR = "unexpected_error"
+
+
+def error_code(exc: BaseException) -> str:
+    return getattr(exc, "code", None) or UNEXPECTED_ERROR
+
+
+@lru_cache(maxsize=None)
+def _dateutil_parser():  # type: ignore[no-untyped-def]
+    # dateutil is imported on first use to keep it off the startup path
+    from dateutil import parser
+
+    return parser
+
+
 def normalize_string(value: str | None) -> str | None:
     if value is None:
         return None
@@ -20,20 +46,48 @@ def normalize_string(value: str | None) -> str | None:
     return collapsed
 
 
+@lru_cache(maxsize=8192)
+def normalize_code(value: str | None) -> str | None:
+    """``normalize_string`` memoized for low-cardinality columns (codes, reasons).
+
+    Repeated inputs return the same string object. Not for ids: unique values
+    would only churn the cache.
+    """
+    return normalize_string(value)
+
+
+# Canonical status objects, so every row shares them instead of a fresh .lower() copy
+_STATUSES = {"approved": "approved", "denied": "denied"}
+
+
 def normalize_status(value: str) -> str:
     v = (value or "").strip().lower()
-    if v not in {"approved", "denied"}:
-        raise ValueError(f"unknown status: {value}")
-    return v
+    status = _STATUSES.get(v)
+    if status is None:
+        raise NormalizationError("invalid_status" if v else "missing_status", f"unknown status: {value}")
+    return status
 
 
+@lru_cache(maxsize=4096)
 def normalize_datetime(value: str) -> datetime:
-    dt = parser.isoparse(value) if "T" in value or "+" in value else parser.parse(value)
+    # Cached: submission dates repeat heavily within a file and parsing dominates row cost
+    return _parse_datetime(value)
+
+
+def _parse_datetime(value: str) -> datetime:
+    if not isinstance(value, str) or not value.strip():
+        raise NormalizationError("missing_date", f"missing date: {value!r}")
+    parser = _dateutil_parser()
+    try:
+        dt = parser.isoparse(value) if "T" in value or "+" in value else parser.parse(value)
+    except (ValueError, OverflowError) as exc:
+        raise NormalizationError("invalid_date", f"invalid date {value!r}: {exc}") from exc
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=UTC)
     return dt.astimezone(UTC)
 
 
+@lru_cache(maxsize=4096)
 def title_case_denial(value: str | None) -> str | None:
     if value is None:
         return None
@@ -46,6 +100,28 @@ def title_case_denial(value: str | None) -> str | None:
     return " ".join(words)
 
 
+class StringTable:
+    """Per-ingest string table: one shared object per distinct value.
+
+    Rows from ``csv.DictReader``/``json.loads`` carry fresh strings even for
+    repeated values; passing low-cardinality fields through the table keeps a
+    single copy for the life of the ingest (an LRU cache alone may evict).
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self) -> None:
+        self._values: Dict[str, str] = {}
+
+    def __call__(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return self._values.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
 def serialize_raw(obj: dict[str, Any]) -> str:
     return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
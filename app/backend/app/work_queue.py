@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from . import tracing
+from .accounting import IngestAccounting, merge_summaries, observe
+from .candidates import refresh_candidates
+from .config import get_settings
+from .db import bump_version, dataset_filter
+from .columnar import file_parts, is_columnar, iter_rows
+from .ingest import ClaimBatch, Input, TooManyRejections, UnsupportedInput, create_dataset, detect_source, read_rows
+from .metrics import processed_records
+from .records import get_adapter
+from .rejections import RejectionAggregator, merge_counts
+from .rollups import roll_up_dataset
+from .sniff import Layout, sniff
+from .utils_normalize import StringTable
+
+
+# Distributed ingestion: a dataset is split into work units in ``ingest_tasks``;
+# any number of worker processes (``app.scripts.ingest_worker``) lease units
+# with find_one_and_update, renew the lease while they work, and the worker
+# that completes the last unit merges the results into the dataset.
+#
+#   pending --claim--> running --complete--> done
+#      ^                  |
+#      +--lease expired---+  (or failed after ingest_task_max_attempts)
+#
+# A unit is a range each worker can read on its own, so no worker parses the
+# rows before its range (``kind``):
+#   bytes  [start, stop) byte offsets of whole records in a CSV
+#   parts  [start, stop) Parquet row groups / Arrow record batches
+#   rows   [start, stop) rows of the parsed file (JSON, UTF-16 CSV: one unit)
+TASKS_COLLECTION = "ingest_tasks"
+SCAN_BLOCK = 1 << 20
+
+logger = structlog.get_logger(__name__)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def csv_bounds(path: str, unit_bytes: int) -> List[int]:
+    """Byte offsets splitting a CSV's data rows into ranges of about ``unit_bytes``.
+
+    A range ends at a newline outside quotes, i.e. after an even number of
+    ``"`` (escaped ``""`` keeps the parity), so a quoted field spanning lines
+    is never cut. One sequential scan counting bytes; nothing is decoded.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        bounds = [f.tell()]
+        cut = bounds[0] + unit_bytes
+        pos, odd = bounds[0], 0
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                break
+            end, counted = pos + len(block), 0
+            nl = block.find(b"\n", max(cut - pos, 0)) if cut < end else -1
+            while nl != -1:
+                odd ^= block.count(b'"', counted, nl) & 1
+                counted = nl
+                if odd:
+                    nl = block.find(b"\n", nl + 1)
+                    continue
+                if pos + nl + 1 < size:
+                    bounds.append(pos + nl + 1)
+                cut = pos + nl + 1 + unit_bytes
+                nl = block.find(b"\n", cut - pos) if cut < end else -1
+            odd ^= block.count(b'"', counted) & 1
+            pos = end
+    if size > bounds[-1]:
+        bounds.append(size)
+    return bounds
+
+
+def plan_units(
+    path: str, filename: str, src: str, layout: Layout, unit_bytes: int
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Unit ranges for a file, and its row count when that is known without reading it."""
+    if is_columnar(filename):
+        units: List[Dict[str, Any]] = []
+        row = size = 0
+        for i, (rows, nbytes) in enumerate(file_parts(path, filename)):
+            if not units or size >= unit_bytes:
+                units.append({"kind": "parts", "start": i, "stop": i, "row_start": row})
+                size = 0
+            units[-1]["stop"] = i + 1
+            row += rows
+            size += nbytes
+        return units, row
+    if src == "alpha" and filename.endswith(".csv") and not layout.encoding.startswith("utf-16"):
+        bounds = csv_bounds(path, unit_bytes)
+        return [{"kind": "bytes", "start": a, "stop": b} for a, b in zip(bounds, bounds[1:])], None
+    if (src, os.path.splitext(filename)[1]) in (("alpha", ".csv"), ("beta", ".json")):
+        return [{"kind": "rows", "start": 0, "stop": None}], None
+    raise UnsupportedInput("Unsupported file for detected source")
+
+
+def read_unit(
+    data: str, filename: str, src: str, layout: Layout, task: Dict[str, Any]
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(row key, row) for one unit; only the unit's range of the file is read.
+
+    Rows of a byte range are keyed by its start offset plus their index, which
+    cannot collide with the next range because every row takes at least a byte.
+    """
+    if task["kind"] == "bytes":
+        with open(data, "rb") as f:
+            header = f.readline()
+            f.seek(task["start"])
+            chunk = f.read(task["stop"] - task["start"])
+        return enumerate(read_rows(header + chunk, filename, src, layout), task["start"])
+    if task["kind"] == "parts":
+        return enumerate(iter_rows(data, filename, parts=range(task["start"], task["stop"])), task["row_start"])
+    return enumerate(islice(read_rows(data, filename, src, layout), task["start"], task["stop"]), task["start"])
+
+
+def enqueue_dataset(  # type: ignore[no-untyped-def]
+    db,
+    path: str,
+    filename: Optional[str] = None,
+    source_system: Optional[str] = None,
+    uploaded_by: Optional[str] = None,
+    unit_bytes: Optional[int] = None,
+) -> str:
+    """Create a queued dataset for ``path`` and one task per ``unit_bytes`` of it.
+
+    ``path`` must be readable by every worker (shared volume). Only the head
+    (sniffing) and, for CSV, a byte scan for record ends are read here.
+    """
+    filename = filename or path
+    unit_bytes = unit_bytes or get_settings().ingest_unit_mb * 1024 * 1024
+    src = detect_source(filename, source_system, path)
+    layout = sniff(path, filename, src)
+    units, total = plan_units(path, filename, src, layout, unit_bytes)
+
+    dataset_id = create_dataset(db, filename, src, uploaded_by, source_path=path, layout=layout)
+    now = datetime.utcnow()
+    tasks = [
+        {
+            **unit,
+            "dataset_id": dataset_id,
+            "unit": i,
+            "status": "pending",
+            "attempts": 0,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "created_at": now,
+        }
+        for i, unit in enumerate(units)
+    ]
+    if tasks:
+        db[TASKS_COLLECTION].insert_many(tasks)
+    # "queued" keeps the single-node resume loop away from distributed datasets
+    db["datasets"].update_one(
+        dataset_filter(dataset_id),
+        bump_version({"$set": {"status": "queued", "units_total": len(tasks), "units_done": 0, "row_total": total}}),
+    )
+    logger.info("dataset_enqueued", dataset_id=dataset_id, rows=total, units=len(tasks), source_system=src)
+    if not tasks:
+        finish_dataset(db, dataset_id)
+    return dataset_id
+
+
+def claim_task(db, worker: str) -> Optional[Dict[str, Any]]:  # type: ignore[no-untyped-def]
+    """Atomically lease the oldest pending unit (or one whose lease has expired)."""
+    from pymongo import ReturnDocument
+
+    settings = get_settings()
+    now = datetime.utcnow()
+    return db[TASKS_COLLECTION].find_one_and_update(
+        {
+            "$or": [
+                {"status": "pending"},
+                {"status": "running", "lease_expires_at": {"$lt": now}},
+            ],
+            "attempts": {"$lt": settings.ingest_task_max_attempts},
+        },
+        {
+            "$set": {
+                "status": "running",
+                "lease_owner": worker,
+                "lease_expires_at": now + timedelta(seconds=settings.ingest_lease_s),
+                "started_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1), ("unit", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def renew_lease(db, task: Dict[str, Any], worker: str) -> bool:  # type: ignore[no-untyped-def]
+    """Heartbeat; False means the lease expired and another worker took the unit."""
+    result = db[TASKS_COLLECTION].update_one(
+        {"_id": task["_id"], "status": "running", "lease_owner": worker},
+        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=get_settings().ingest_lease_s)}},
+    )
+    return result.matched_count == 1
+
+
+def requeue_expired(db) -> int:  # type: ignore[no-untyped-def]
+    """Put units with expired leases back to pending; fail those out of attempts.
+
+    ``claim_task`` also takes over expired leases directly, so this only keeps
+    the collection (and the progress endpoint) honest between claims.
+    """
+    settings = get_settings()
+    expired = {"status": "running", "lease_expires_at": {"$lt": datetime.utcnow()}}
+    failed = db[TASKS_COLLECTION].update_many(
+        {**expired, "attempts": {"$gte": settings.ingest_task_max_attempts}},
+        {"$set": {"status": "failed", "lease_owner": None}},
+    )
+    for dataset_id in db[TASKS_COLLECTION].distinct("dataset_id", {"status": "failed"}):
+        db["datasets"].update_one({**dataset_filter(dataset_id), "status": "queued"}, bump_version({"$set": {"status": "failed"}}))
+    requeued = db[TASKS_COLLECTION].update_many(
+        expired, {"$set": {"status": "pending", "lease_owner": None, "lease_expires_at": None}}
+    )
+    if requeued.modified_count or failed.modified_count:
+        logger.warning("ingest_tasks_requeued", requeued=requeued.modified_count, failed=failed.modified_count)
+    return requeued.modified_count
+
+
+class LeaseLost(RuntimeError):
+    """The unit's lease expired and was taken over; the rest of the unit is dropped."""
+
+
+def process_task(db, task: Dict[str, Any], worker: str) -> Dict[str, Any]:  # type: ignore[no-untyped-def]
+    """Ingest the task's range of its dataset, renewing the lease per batch.
+
+    Writes are upserts keyed by claim and row offset, so a unit that is redone
+    after a lost lease does not duplicate anything. Units run concurrently, so a
+    claim id repeated in two units keeps whichever write lands last.
+    """
+    dataset = db["datasets"].find_one(dataset_filter(task["dataset_id"]))
+    if dataset is None:
+        raise LeaseLost(f"dataset {task['dataset_id']} no longer exists")
+    src = dataset["source_system"]
+    accounting = IngestAccounting(src)
+    with accounting.active(), tracing.span(
+        "ingest.unit", dataset_id=task["dataset_id"], unit=task["unit"], source_system=src
+    ):
+        return _process_rows(db, task, worker, dataset, accounting)
+
+
+def _process_rows(  # type: ignore[no-untyped-def]
+    db, task: Dict[str, Any], worker: str, dataset: Dict[str, Any], accounting: IngestAccounting
+) -> Dict[str, Any]:
+    src = dataset["source_system"]
+    aggregator = RejectionAggregator()
+    batch = ClaimBatch(db, task["dataset_id"], StringTable(), aggregator)
+    adapter = get_adapter(src)
+    batch_size = get_settings().ingest_batch_size
+    accepted = rejected = 0
+
+    def commit() -> None:
+        nonlocal accepted, rejected
+        if aggregator.broken():
+            batch.flush(samples_only=True)
+            raise TooManyRejections(f"File looks malformed: {aggregator.describe()}")
+        with accounting.stage("write"):
+            ok, rej = batch.flush()
+        accepted += ok
+        rejected += rej
+        processed_records.labels(source_system=src, result="accepted").inc(ok)
+        processed_records.labels(source_system=src, result="rejected").inc(rej)
+        with accounting.stage("checkpoint"):
+            renewed = renew_lease(db, task, worker)
+        if not renewed:
+            raise LeaseLost(f"lease on unit {task['unit']} of {task['dataset_id']} lost")
+
+    data: Input = dataset["source_path"]
+    layout = Layout.from_doc(dataset.get("layout"))
+    loop_start = time.perf_counter()
+    for key, row in read_unit(data, dataset["filename"], src, layout, task):
+        batch.add(key, row, adapter)
+        if len(batch) >= batch_size:
+            commit()
+    if len(batch):
+        commit()
+    written = accounting.stages.get("write", 0.0) + accounting.stages.get("checkpoint", 0.0)
+    accounting.stages["parse"] = max(time.perf_counter() - loop_start - written, 0.0)
+    resources = accounting.finish(accepted + rejected, 0, record=False)
+    return {"accepted": accepted, "rejected": rejected, "rejection_codes": aggregator.counts, "resources": resources}
+
+
+def complete_task(db, task: Dict[str, Any], worker: str, counts: Dict[str, Any], seconds: float) -> bool:  # type: ignore[no-untyped-def]
+    result = db[TASKS_COLLECTION].update_one(
+        {"_id": task["_id"], "status": "running", "lease_owner": worker},
+        {"$set": {"status": "done", "finished_at": datetime.utcnow(), "seconds": seconds, **counts}},
+    )
+    if result.matched_count != 1:
+        return False
+    db["datasets"].update_one(
+        dataset_filter(task["dataset_id"]),
+        bump_version({"$inc": {"units_done": 1}, "$set": {"heartbeat_at": datetime.utcnow()}}),
+    )
+    return True
+
+
+def fail_dataset(db, dataset_id: str, error: str) -> None:  # type: ignore[no-untyped-def]
+    """Stop a dataset: no further units are claimed and the dataset is marked failed."""
+    db[TASKS_COLLECTION].update_many(
+        {"dataset_id": dataset_id, "status": {"$in": ["pending", "running"]}},
+        {"$set": {"status": "failed", "lease_owner": None}},
+    )
+    db["datasets"].update_one(
+        {**dataset_filter(dataset_id), "status": "queued"}, bump_version({"$set": {"status": "failed", "error": error}})
+    )
+    logger.warning("dataset_failed", dataset_id=dataset_id, error=error)
+
+
+def finish_dataset(db, dataset_id: str) -> bool:  # type: ignore[no-untyped-def]
+    """Merge unit results into the dataset once every unit is done.
+
+    The status transition is conditional, so exactly one worker finalizes even
+    when several finish their last units at the same time.
+    """
+    tasks = db[TASKS_COLLECTION]
+    if tasks.count_documents({"dataset_id": dataset_id, "status": {"$ne": "done"}}):
+        return False
+    done: List[Dict[str, Any]] = list(tasks.find({"dataset_id": dataset_id}))
+    accepted = sum(t.get("accepted", 0) for t in done)
+    rejected = sum(t.get("rejected", 0) for t in done)
+    metrics = {
+        "units": len(done),
+        "attempts": sum(t.get("attempts", 0) for t in done),
+        "workers": sorted({t["lease_owner"] for t in done if t.get("lease_owner")}),
+        "unit_seconds": round(sum(t.get("seconds", 0.0) for t in done), 3),
+        "accepted": accepted,
+        "rejected": rejected,
+    }
+    codes = merge_counts(*(t.get("rejection_codes") or {} for t in done))
+    dataset = db["datasets"].find_one(dataset_filter(dataset_id), {"uploaded_at": 1, "source_path": 1, "source_system": 1})
+    if dataset is None:
+        return False
+    resources = merge_summaries(
+        [t["resources"] for t in done if t.get("resources")],
+        (datetime.utcnow() - dataset["uploaded_at"]).total_seconds(),
+    )
+    if dataset.get("source_path") and os.path.exists(dataset["source_path"]):
+        resources["bytes_read"] = os.path.getsize(dataset["source_path"])
+    claimed = db["datasets"].find_one_and_update(
+        {**dataset_filter(dataset_id), "status": "queued"},
+        bump_version({"$set": {
+            "status": "ingested",
+            "record_count": accepted,
+            "rejected_count": rejected,
+            "checkpoint_offset": accepted + rejected,
+            "row_total": accepted + rejected,
+            "rejection_codes": codes,
+            "resources": resources,
+            "metrics_json": json.dumps(metrics),
+        }}),
+    )
+    if claimed is None:
+        return False
+    observe(dataset["source_system"], resources)
+    refresh_candidates(db, dataset_id)
+    roll_up_dataset(db, dataset_id)
+    logger.info("dataset_ingested", dataset_id=dataset_id, distributed=True, **metrics)
+    return True
+
+
+def run_worker(  # type: ignore[no-untyped-def]
+    db,
+    worker: Optional[str] = None,
+    poll_s: Optional[float] = None,
+    exit_when_idle: bool = False,
+) -> int:
+    """Claim and process units until stopped (or, with ``exit_when_idle``, until
+    the queue is empty). Returns the number of units completed."""
+    worker = worker or worker_name()
+    poll_s = get_settings().ingest_worker_poll_s if poll_s is None else poll_s
+    completed = 0
+    logger.info("ingest_worker_started", worker=worker)
+    while True:
+        task = claim_task(db, worker)
+        if task is None:
+            requeue_expired(db)
+            if exit_when_idle and not db[TASKS_COLLECTION].count_documents({"status": {"$in": ["pending", "running"]}}):
+                break
+            time.sleep(poll_s)
+            continue
+
+        start = time.perf_counter()
+        try:
+            counts = process_task(db, task, worker)
+        except TooManyRejections as exc:
+            # Structurally broken file: retrying the unit (or running the others) cannot help
+            fail_dataset(db, task["dataset_id"], str(exc))
+            continue
+        except LeaseLost as exc:
+            logger.warning("ingest_task_lease_lost", worker=worker, error=str(exc))
+            continue
+        except Exception:  # noqa: BLE001
+            # Leave the lease to expire: the unit is retried up to ingest_task_max_attempts
+            logger.exception("ingest_task_failed", worker=worker, dataset_id=task["dataset_id"], unit=task["unit"])
+            continue
+        if complete_task(db, task, worker, counts, time.perf_counter() - start):
+            completed += 1
+            finish_dataset(db, task["dataset_id"])
+    logger.info("ingest_worker_stopped", worker=worker, completed=completed)
+    return completed
@@ -0,0 +1,160 @@
+"""Just enough of a pymongo database, in memory, for ingest and work-queue tests.
+
+Filters support equality, ``$or`` and ``$ne/$lt/$lte/$gt/$gte/$in/$nin``;
+updates support ``$set/$unset/$inc/$setOnInsert``.
+"""
+from __future__ import annotations
+
+import copy
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$ne": lambda v, a: v != a,
+    "$lt": lambda v, a: v is not None and v < a,
+    "$lte": lambda v, a: v is not None and v <= a,
+    "$gt": lambda v, a: v is not None and v > a,
+    "$gte": lambda v, a: v is not None and v >= a,
+    "$in": lambda v, a: v in a,
+    "$nin": lambda v, a: v not in a,
+}
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not all(_OPS[op](value, arg) for op, arg in cond.items()):
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    for field, value in update.get("$set", {}).items():
+        doc[field] = copy.deepcopy(value)
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+    for field, value in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + value
+    if inserting:
+        for field, value in update.get("$setOnInsert", {}).items():
+            doc.setdefault(field, copy.deepcopy(value))
+
+
+class FakeCursor(list):
+    def sort(self, key: Any, direction: int = 1) -> "FakeCursor":
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self[:] = sorted(self, key=lambda d: d.get(field), reverse=order < 0)
+        return self
+
+    def limit(self, n: int) -> "FakeCursor":
+        return FakeCursor(self[:n]) if n else self
+
+
+class FakeCollection:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.docs: List[Dict[str, Any]] = []
+        self.fail_on: Optional[Callable[[str], Optional[BaseException]]] = None
+
+    def _check(self, method: str) -> None:
+        if self.fail_on is not None:
+            exc = self.fail_on(method)
+            if exc is not None:
+                raise exc
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [d for d in self.docs if matches(d, query or {})]
+
+    def insert_one(self, doc: Dict[str, Any]) -> SimpleNamespace:
+        self._check("insert_one")
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs: List[Dict[str, Any]]) -> SimpleNamespace:
+        return SimpleNamespace(inserted_ids=[self.insert_one(d).inserted_id for d in docs])
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Any = None, **kwargs: Any) -> FakeCursor:
+        return FakeCursor(copy.deepcopy(d) for d in self._find(query))
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Any = None) -> Optional[Dict[str, Any]]:
+        found = self._find(query)
+        return copy.deepcopy(found[0]) if found else None
+
+    def count_documents(self, query: Dict[str, Any]) -> int:
+        return len(self._find(query))
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        apply_update(doc, update, inserting=True)
+        self.docs.append(doc)
+        return doc
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> SimpleNamespace:
+        self._check("update_one")
+        return self._update_one(query, update, upsert)
+
+    def _update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool) -> SimpleNamespace:
+        found = self._find(query)
+        if found:
+            apply_update(found[0], update)
+        elif upsert:
+            self._upsert(query, update)
+        return SimpleNamespace(matched_count=len(found[:1]), modified_count=len(found[:1]))
+
+    def update_many(self, query: Dict[str, Any], update: Dict[str, Any]) -> SimpleNamespace:
+        self._check("update_many")
+        found = self._find(query)
+        for doc in found:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    def find_one_and_update(  # type: ignore[no-untyped-def]
+        self, query, update, projection=None, sort=None, upsert=False, return_document=False, **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        self._check("find_one_and_update")
+        found = FakeCursor(self._find(query))
+        if sort:
+            found.sort(sort)
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        apply_update(found[0], update)
+        # pymongo's ReturnDocument.AFTER is True
+        return copy.deepcopy(found[0]) if return_document else before
+
+    def delete_many(self, query: Dict[str, Any]) -> SimpleNamespace:
+        keep = [d for d in self.docs if not matches(d, query)]
+        deleted = len(self.docs) - len(keep)
+        self.docs = keep
+        return SimpleNamespace(deleted_count=deleted)
+
+    def bulk_write(self, ops: List[Any], ordered: bool = True) -> SimpleNamespace:
+        self._check("bulk_write")
+        for op in ops:
+            self._update_one(op._filter, op._doc, op._upsert)
+        return SimpleNamespace(upserted_count=0)
+
+    def distinct(self, field: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return sorted({d.get(field) for d in self._find(query)}, key=str)
+
+
+class FakeDB(dict):
+    def __missing__(self, name: str) -> FakeCollection:
+        self[name] = FakeCollection(name)
+        return self[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        return self[name]
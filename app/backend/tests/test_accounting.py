@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import time
+
+from app.accounting import IngestAccounting, current_accounting, merge_summaries
+
+
+def test_stages_and_summary():
+    accounting = IngestAccounting("payer_a")
+    with accounting.active():
+        assert current_accounting() is accounting
+        with accounting.stage("write"):
+            time.sleep(0.01)
+        accounting.count_command("insert")
+        accounting.count_command("insert")
+        accounting.write_ops += 5
+    assert current_accounting() is None
+    summary = accounting.finish(rows=100, bytes_read=2048, record=False)
+    assert summary["stages_s"]["write"] >= 0.01
+    assert summary["wall_s"] >= summary["stages_s"]["write"]
+    assert summary["rows"] == 100 and summary["bytes_read"] == 2048
+    assert summary["mongo_commands"] == {"insert": 2}
+    assert summary["mongo_write_ops"] == 5
+
+
+def test_merge_summaries_sums_work_and_uses_end_to_end_wall():
+    a = {"cpu_s": 1.0, "rows": 50, "stages_s": {"write": 0.5}, "mongo_commands": {"update": 3}, "mongo_write_ops": 50, "bytes_read": 0}
+    b = {"cpu_s": 2.0, "rows": 150, "stages_s": {"write": 1.0, "parse": 0.2}, "mongo_commands": {"update": 1}, "mongo_write_ops": 150, "bytes_read": 0}
+    merged = merge_summaries([a, b], wall_s=2.0)
+    assert merged["cpu_s"] == 3.0
+    assert merged["rows"] == 200 and merged["rows_per_s"] == 100.0
+    assert merged["stages_s"] == {"write": 1.5, "parse": 0.2}
+    assert merged["mongo_commands"] == {"update": 4}
+    assert merged["mongo_write_ops"] == 200
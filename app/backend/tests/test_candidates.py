@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from app.candidates import candidate_pipeline
+from app.recommendations import DEFAULT_RECOMMENDATION, TEMPLATES
+
+
+def test_candidate_pipeline_mirrors_templates():
+    match, project, add = candidate_pipeline("d1")
+    assert match == {"$match": {"dataset_id": "d1", "eligibility": True}}
+    assert project["$project"]["_id"] == 0
+
+    switch = add["$set"]["recommended_changes"]["$switch"]
+    branches = {b["case"]["$eq"][1]: b["then"] for b in switch["branches"]}
+    assert branches == TEMPLATES
+    assert switch["default"] == DEFAULT_RECOMMENDATION
+
+
+def test_candidate_pipeline_decodes_short_codes():
+    _, project, _ = candidate_pipeline("d1")
+    reason = project["$project"]["resubmission_reason"]["$switch"]
+    decoded = {b["case"]["$eq"][1]: b["then"] for b in reason["branches"]}
+    assert decoded["NPI"] == "Incorrect NPI"
+
+
+def test_refresh_creates_the_merge_key_index_first(monkeypatch):
+    from types import SimpleNamespace
+
+    import app.candidates as candidates
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "candidates_materialized", True)
+    monkeypatch.setattr(candidates, "_key_indexed", set())
+    calls = []
+
+    class Collection:
+        def __init__(self, name):
+            self.name = name
+
+        def create_index(self, keys, unique=False):
+            calls.append(("create_index", self.name, unique))
+
+        def aggregate(self, pipeline):
+            calls.append(("aggregate", self.name, "$merge" in pipeline[-1]))
+
+        def delete_many(self, query):
+            return SimpleNamespace(deleted_count=0)
+
+        def update_one(self, query, update):
+            pass
+
+    class DB(dict):
+        name = "claims_pipeline"
+
+        def __missing__(self, name):
+            return Collection(name)
+
+    for _ in range(2):
+        candidates.refresh_candidates(DB(), "d1")
+    assert calls == [
+        ("create_index", "candidates", True),
+        ("aggregate", "claims", True),
+        ("aggregate", "claims", True),
+    ]
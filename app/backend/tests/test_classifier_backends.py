@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.classifier_backends import HTTPLLMBackend, SqliteClassificationCache, classify_unique, get_cache
+from app.config import get_settings
+
+
+class StubModel(BaseHTTPRequestHandler):
+    calls: list[list[str]] = []
+    fail_next = 0
+
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if StubModel.fail_next:
+            StubModel.fail_next -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        StubModel.calls.append(body["inputs"])
+        results = [
+            {"label": "retryable", "canonical_reason": "Prior auth required"}
+            if "auth" in text
+            else {"label": "ambiguous"}
+            for text in body["inputs"]
+        ]
+        payload = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # silence test output
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubModel)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubModel.calls = []
+    StubModel.fail_next = 0
+    yield f"http://127.0.0.1:{server.server_address[1]}/classify"
+    server.shutdown()
+
+
+def test_only_unique_ambiguous_reasons_reach_backend_once(stub_url, tmp_path):
+    backend = HTTPLLMBackend(stub_url, model="stub", batch_size=2, concurrency=2, backoff_s=0.01)
+    cache = SqliteClassificationCache(str(tmp_path / "var" / "cache.sqlite3"))
+    reasons = ["Incorrect NPI", "needs auth letter", "needs auth letter", "form incomplete", "coding query", None]
+    StubModel.fail_next = 1  # first batch is retried
+
+    resolved = asyncio.run(classify_unique(reasons, backend, cache))
+
+    sent = sorted(t for batch in StubModel.calls for t in batch)
+    assert sent == ["coding query", "form incomplete", "needs auth letter"]
+    assert resolved["needs auth letter"].canonical_reason == "Prior auth required"
+    assert resolved["Incorrect NPI"].label == "retryable"
+
+    StubModel.calls = []
+    again = asyncio.run(classify_unique(reasons, backend, cache))
+    assert StubModel.calls == []
+    assert again["needs auth letter"].label == "retryable"
+
+
+def test_sqlite_cache_is_one_connection_per_process(monkeypatch, tmp_path):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_cache", "sqlite")
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "a.sqlite3"))
+    first = get_cache()
+    assert get_cache() is first
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "b.sqlite3"))
+    assert get_cache() is not first
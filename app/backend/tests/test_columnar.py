@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import io
+from datetime import datetime
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from app.columnar import column_names, iter_rows, source_for_columns, write_parquet  # noqa: E402
+
+
+def test_parquet_rows_are_strings(tmp_path):
+    table = pa.table({
+        "claim_id": ["A1", "A2"],
+        "procedure_code": [99213, None],
+        "submitted_at": pa.array([datetime(2025, 7, 1), datetime(2025, 7, 2)], pa.timestamp("us")),
+    })
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    data = buf.getvalue()
+
+    assert source_for_columns(column_names(data, "x.parquet")) == "alpha"
+    rows = list(iter_rows(data, "x.parquet", batch_rows=1))
+    assert rows[0]["procedure_code"] == "99213"
+    assert rows[1]["procedure_code"] is None
+    assert rows[0]["submitted_at"].startswith("2025-07-01")
+
+    path = str(tmp_path / "out.parquet")
+    assert write_parquet(iter([{"claim_id": "A1"}]), ["claim_id"], path) == 1
+    assert list(iter_rows(path, path)) == [{"claim_id": "A1"}]
+
+
+def test_each_parquet_download_gets_its_own_file(monkeypatch, tmp_path):
+    import asyncio
+    import os
+
+    from app.config import get_settings
+    from app.routers.datasets import _parquet_response
+
+    monkeypatch.setattr(get_settings(), "data_dir", str(tmp_path))
+    first = _parquet_response(iter([{"claim_id": "A1"}]), ["claim_id"], "candidates_x.parquet")
+    second = _parquet_response(iter([{"claim_id": "B1"}]), ["claim_id"], "candidates_x.parquet")
+    assert first.path != second.path
+    assert list(iter_rows(first.path, first.path)) == [{"claim_id": "A1"}]
+    assert 'filename="candidates_x.parquet"' in first.headers["content-disposition"]
+    asyncio.run(first.background())
+    assert not os.path.exists(first.path) and os.path.exists(second.path)
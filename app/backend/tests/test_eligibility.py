@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from app.classifier import Classification
+from app.eligibility import compile_predicate, evaluate, to_mongo_filter
+
+
+REF = date(2025, 7, 30)
+
+
+def _claim(days_before: int, hour: int = 12, **overrides):
+    submitted = datetime.combine(REF - timedelta(days=days_before), datetime.min.time(), tzinfo=timezone.utc)
+    claim = {"status": "denied", "patient_id": "P1", "submitted_at": submitted.replace(hour=hour)}
+    claim.update(overrides)
+    return claim
+
+
+def _matches(query, claim) -> bool:
+    # Minimal evaluator for the operators the rule compiler emits
+    for field, cond in query.items():
+        value = claim.get(field)
+        if isinstance(cond, dict):
+            if "$nin" in cond and value in cond["$nin"]:
+                return False
+            if "$lt" in cond and not (value is not None and value < cond["$lt"]):
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def test_predicate_and_mongo_filter_agree():
+    predicate = compile_predicate(REF)
+    query = to_mongo_filter(REF)
+    claims = [_claim(d, hour=h) for d in range(5, 11) for h in (0, 23)]
+    claims += [_claim(30, status="approved"), _claim(30, patient_id=None), _claim(30, patient_id="")]
+    for claim in claims:
+        assert predicate(claim) == _matches(query, claim), claim
+    # More than seven whole days before the reference date
+    assert not predicate(_claim(7, hour=0))
+    assert predicate(_claim(8, hour=23))
+
+
+def test_evaluate_outcomes():
+    retryable = Classification(label="retryable", canonical_reason="Incorrect NPI")
+    assert evaluate(True, retryable) == (True, "Incorrect NPI", None)
+    assert evaluate(False, retryable) == (False, None, "Not eligible by rules")
+    assert evaluate(True, Classification(label="ambiguous")) == (False, None, "Ambiguous")
+
+
+def test_forecast_labels_claims_ingested_without_them(monkeypatch):
+    from fake_mongo import FakeDB
+
+    from app.config import get_settings
+    from app.eligibility import backfill_labels, forecast_filter
+
+    monkeypatch.setattr(get_settings(), "classifier_mode", "rules")
+    db = FakeDB()
+    dataset_id = str(db.datasets.insert_one({"rolled_up_at": None}).inserted_id)
+    old = {"dataset_id": dataset_id, **_claim(10)}
+    db.claims.insert_many([
+        {**old, "denial_reason": "Incorrect NPI"},
+        {**old, "denial_reason": "Authorization expired", "canonical_reason": "Authorization expired"},
+    ])
+    assert db.claims.count_documents(forecast_filter(dataset_id, REF)) == 0
+    assert backfill_labels(db, dataset_id) == 2
+    assert db.claims.count_documents(forecast_filter(dataset_id, REF)) == 1
+    assert backfill_labels(db, dataset_id) == 0
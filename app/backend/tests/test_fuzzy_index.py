@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from app.classifier import _heuristic_canonical, classify_reason
+from app.config import get_settings
+from app.fuzzy_index import FuzzyIndex
+
+
+VOCAB = {
+    "Missing modifier": "Missing modifier",
+    "Incorrect NPI": "Incorrect NPI",
+    "Prior auth required": "Prior auth required",
+    "rendering provider npi invalid": "Incorrect NPI",
+}
+
+
+@pytest.mark.parametrize("linear_below", [0, 1024])
+def test_full_match_tolerates_typos(linear_below):
+    match = FuzzyIndex(VOCAB, linear_below=linear_below).lookup("missing modifer")
+    assert match is not None and match.canonical == "Missing modifier" and match.kind == "full"
+
+
+@pytest.mark.parametrize("linear_below", [0, 1024])
+def test_partial_match_in_long_message(linear_below):
+    text = "Claim rejected: rendering provider NPI invalid per payer file, see remit"
+    index = FuzzyIndex(VOCAB, linear_below=linear_below)
+    assert index.lookup(text) is None  # partial matching is opt-in
+    match = index.lookup(text, partial_cutoff=92.0)
+    assert match is not None and match.canonical == "Incorrect NPI" and match.kind == "partial"
+
+
+def test_no_match_below_cutoff():
+    assert FuzzyIndex(VOCAB).lookup("form incomplete") is None
+
+
+NEAR_MISSES = ["Missing documentation", "Incorrect procedure code", "Incorrect patient information"]
+
+
+@pytest.mark.parametrize("reason", NEAR_MISSES)
+def test_partial_match_needs_whole_words(reason):
+    vocab = {**VOCAB, "missing mod": "Missing modifier", "wrong npi": "Incorrect NPI"}
+    # "missing mod" is 90.0 against "missing d", "incorrect npi" 91.7 against "incorrect p"
+    assert FuzzyIndex(vocab).lookup(reason, partial_cutoff=90.0) is None
+
+
+@pytest.mark.parametrize("reason", NEAR_MISSES)
+def test_classifier_leaves_near_misses_ambiguous(reason):
+    cls = classify_reason(reason)
+    assert cls.label == "ambiguous" and cls.canonical_reason is None
+
+
+def test_classifier_uses_index_for_free_text(monkeypatch):
+    text = "Denied - prior authorisation requird for this service line"
+    assert classify_reason(text).label == "ambiguous"
+    monkeypatch.setattr(get_settings(), "classifier_partial_cutoff", 92.0)
+    _heuristic_canonical.cache_clear()
+    cls = classify_reason(text)
+    assert cls.label == "retryable"
+    assert cls.canonical_reason == "Prior auth required"
+
+
+def test_heuristic_never_concludes_non_retryable():
+    # Closest to "Authorization expired": the heuristic stage does not decide that
+    assert classify_reason("Authorizaton expird", mode="heuristic").label == "ambiguous"
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from starlette.requests import Request
+
+from app.db import bump_version
+from app.http_cache import Validators, not_modified
+
+
+def _request(**headers: str) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_if_none_match_uses_weak_comparison():
+    validators = Validators(etag='W/"d1.3.claims"')
+    assert validators.fresh(_request(if_none_match='"d1.3.claims"'))
+    assert validators.fresh(_request(if_none_match='W/"x", W/"d1.3.claims"'))
+    assert validators.fresh(_request(if_none_match="*"))
+    assert not validators.fresh(_request(if_none_match='W/"d1.2.claims"'))
+    assert not validators.fresh(_request())
+
+
+def test_if_modified_since_and_304_headers():
+    validators = Validators(etag='W/"d1.3"', last_modified=datetime(2025, 7, 1, 12, 0, 0, 500000))
+    assert validators.fresh(_request(if_modified_since="Tue, 01 Jul 2025 12:00:00 GMT"))
+    assert not validators.fresh(_request(if_modified_since="Tue, 01 Jul 2025 11:59:59 GMT"))
+    # If-None-Match takes precedence over the date
+    assert not validators.fresh(_request(if_none_match='W/"d1.2"', if_modified_since="Tue, 01 Jul 2025 12:00:00 GMT"))
+    response = not_modified(_request(if_none_match='W/"d1.3"'), validators)
+    assert response is not None and response.status_code == 304 and response.body == b""
+    assert response.headers["etag"] == 'W/"d1.3"'
+    assert response.headers["last-modified"] == "Tue, 01 Jul 2025 12:00:00 GMT"
+    assert not_modified(_request(), None) is None
+
+
+def test_bump_version_keeps_existing_operators():
+    update = bump_version({"$inc": {"units_done": 1}, "$set": {"status": "queued"}})
+    assert update["$inc"] == {"units_done": 1, "version": 1}
+    assert update["$set"]["status"] == "queued" and "modified_at" in update["$set"]
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from app.config import get_settings
+from app.ingest import (
+    UnsupportedInput,
+    claim_for_resume,
+    detect_source,
+    ingest_dataset,
+    read_rows,
+    resume_dataset,
+    resume_stale_ingests,
+)
+
+
+def test_read_rows_from_bytes_and_path(tmp_path):
+    data = b"claim_id,status\nA1,denied\n"
+    assert list(read_rows(data, "a.csv", "alpha")) == [{"claim_id": "A1", "status": "denied"}]
+    path = tmp_path / "b.json"
+    path.write_text('[{"id": "B1"}]')
+    assert detect_source(str(path), None) == "beta"
+    assert list(read_rows(str(path), str(path), "beta")) == [{"id": "B1"}]
+
+
+@pytest.mark.parametrize(
+    "data,filename,src,message",
+    [
+        (b"{", "b.json", "beta", "Invalid JSON"),
+        (b"{}", "b.json", "beta", "array of objects"),
+        (b"x", "c.txt", "unknown", "Unsupported file"),
+    ],
+)
+def test_read_rows_rejects_bad_files(data, filename, src, message):
+    with pytest.raises(UnsupportedInput, match=message):
+        list(read_rows(data, filename, src))
+
+
+HEADER = "claim_id,patient_id,procedure_code,denial_reason,status,submitted_at\n"
+
+
+class Crash(BaseException):
+    """A killed worker: nothing in the ingest gets to handle it."""
+
+
+@pytest.fixture
+def ingest_db(monkeypatch, tmp_path):
+    from fake_mongo import FakeDB
+
+    import app.ingest as ingest
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ingest_batch_size", 2)
+    monkeypatch.setattr(settings, "ingest_stale_after_s", 0)
+    monkeypatch.setattr(settings, "candidates_materialized", False)
+    monkeypatch.setattr(ingest, "roll_up_dataset", lambda db, dataset_id: False)
+    path = tmp_path / "claims.csv"
+    path.write_text(HEADER + "".join(f"C{i},P{i},99213,Incorrect NPI,denied,2025-07-01\n" for i in range(5)))
+    return FakeDB(), str(path)
+
+
+def _fail_second_write(exc):
+    calls = []
+
+    def fail_on(method):
+        calls.append(method)
+        return exc if len(calls) == 2 else None
+
+    return fail_on
+
+
+def test_crashed_ingest_resumes_from_checkpoint(ingest_db):
+    db, path = ingest_db
+    db.claims.fail_on = _fail_second_write(Crash())
+    with pytest.raises(Crash):
+        ingest_dataset(db, path, path, "alpha", source_path=path)
+    dataset = db.datasets.find_one()
+    assert dataset["status"] == "ingesting" and dataset["checkpoint_offset"] == 2
+
+    db.claims.fail_on = None
+    assert resume_stale_ingests(db) == 1
+    dataset = db.datasets.find_one()
+    assert dataset["status"] == "ingested" and dataset["record_count"] == 5
+    assert sorted(c["claim_id"] for c in db.claims.docs) == [f"C{i}" for i in range(5)]
+
+
+def test_write_error_fails_dataset_and_retry_continues(ingest_db):
+    db, path = ingest_db
+    db.claims.fail_on = _fail_second_write(ConnectionError("mongo went away"))
+    with pytest.raises(ConnectionError):
+        ingest_dataset(db, path, path, "alpha", source_path=path)
+    dataset = db.datasets.find_one()
+    assert dataset["status"] == "failed" and dataset["resumable"] and dataset["error"] == "mongo went away"
+    # Failed, not stale-ingesting: only an explicit retry (finalize) takes it over
+    assert resume_stale_ingests(db) == 0
+
+    db.claims.fail_on = None
+    claimed = claim_for_resume(db, str(dataset["_id"]))
+    assert claimed is not None and claimed["checkpoint_offset"] == 2
+    assert resume_dataset(db, claimed).accepted == 5
+    dataset = db.datasets.find_one()
+    assert dataset["status"] == "ingested" and "error" not in dataset
+    assert claim_for_resume(db, str(dataset["_id"])) is None
+
+
+def test_resume_without_source_file_fails(ingest_db, tmp_path):
+    db, path = ingest_db
+    db.claims.fail_on = _fail_second_write(Crash())
+    with pytest.raises(Crash):
+        ingest_dataset(db, path, path, "alpha", source_path=path)
+    os.remove(path)
+    claimed = claim_for_resume(db, str(db.datasets.find_one()["_id"]))
+    with pytest.raises(UnsupportedInput, match="no longer available"):
+        resume_dataset(db, claimed)
+    assert db.datasets.find_one()["status"] == "failed"
+
+
+def test_heartbeat_continues_while_candidates_are_refreshed(ingest_db, monkeypatch):
+    import time
+
+    import app.ingest as ingest
+
+    db, path = ingest_db
+    seen = []
+
+    def slow_refresh(db, dataset_id):
+        seen.append(db.datasets.find_one()["heartbeat_at"])
+        time.sleep(0.1)
+        seen.append(db.datasets.find_one()["heartbeat_at"])
+
+    monkeypatch.setattr(ingest, "refresh_candidates", slow_refresh)
+    ingest_dataset(db, path, path, "alpha", source_path=path)
+    # A long $merge does not leave the dataset looking stale to resume_stale_ingests
+    assert seen[1] > seen[0]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+import structlog
+
+from app import logging as app_logging
+from app.logging import EventThrottle
+
+
+def test_throttle_caps_listed_events_and_reports_suppressed():
+    throttle = EventThrottle({"claims_listed": 2}, {})
+    kept = []
+    for i in range(5):
+        try:
+            kept.append(throttle(None, "info", {"event": "claims_listed", "i": i}))
+        except structlog.DropEvent:
+            pass
+    assert [e["i"] for e in kept] == [0, 1]
+    throttle._windows["claims_listed"][0] -= 1.0  # next one-second window
+    assert throttle(None, "info", {"event": "claims_listed"})["suppressed"] == 3
+    # Unlisted events and errors always pass
+    assert throttle(None, "info", {"event": "dataset_ingested"}) == {"event": "dataset_ingested"}
+    assert throttle(None, "error", {"event": "claims_listed"}) == {"event": "claims_listed"}
+
+
+def test_sampling_tags_kept_events():
+    throttle = EventThrottle({}, {"row_seen": 0.0, "batch_seen": 1.0})
+    with pytest.raises(structlog.DropEvent):
+        throttle(None, "info", {"event": "row_seen"})
+    assert throttle(None, "info", {"event": "batch_seen"})["sample_rate"] == 1.0
+
+
+def test_queued_writer_flushes_json_lines_on_shutdown():
+    out = io.StringIO()
+    app_logging.shutdown_logging()
+    try:
+        app_logging.configure_logging(stream=out)
+        log = structlog.get_logger("test")
+        for i in range(3):
+            log.info("dataset_ingested", n=i, codes={"invalid_date": 2})
+        app_logging.shutdown_logging()
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [line["n"] for line in lines] == [0, 1, 2]
+        assert lines[0]["codes"] == {"invalid_date": 2} and lines[0]["level"] == "info"
+    finally:
+        app_logging.shutdown_logging()
+        structlog.reset_defaults()
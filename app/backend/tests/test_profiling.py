@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from app import profiling
+from app.config import get_settings
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    s = get_settings()
+    monkeypatch.setattr(s, "profile_dir", str(tmp_path / "profiles"))
+    monkeypatch.setattr(s, "profile_admin_token", "secret")
+    monkeypatch.setattr(s, "profile_sample_every", 0)
+    monkeypatch.setattr(s, "profile_interval_ms", 1.0)
+    return s
+
+
+def test_explicit_profiling_needs_the_admin_token(settings):
+    assert profiling.choose_mode("cprofile", "secret") == profiling.ProfileRequest("cprofile", admin=True)
+    with pytest.raises(PermissionError):
+        profiling.choose_mode("sample", "wrong")
+    with pytest.raises(ValueError):
+        profiling.choose_mode("perf", "secret")
+    assert profiling.choose_mode(None, None) is None
+
+
+def test_one_in_n_sampling(settings, monkeypatch):
+    monkeypatch.setattr(settings, "profile_sample_every", 3)
+    chosen = [profiling.choose_mode(None, None) for _ in range(9)]
+    sampled = [c for c in chosen if c is not None]
+    # Sampled runs are not admin requests: their responses carry no profile link
+    assert len(sampled) == 3 and all(c == profiling.ProfileRequest("sample", admin=False) for c in sampled)
+
+
+def busy(n: int) -> int:
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+def test_run_profiled_writes_collapsed_stacks(settings):
+    result, profile = profiling.run_profiled(profiling.ProfileRequest("cprofile", admin=True), "test", busy, 1)
+    assert result > 1 and profile is not None and profile.samples > 0
+    names = sorted(os.listdir(settings.profile_dir))
+    assert [n.split(".", 1)[1] for n in names] == ["collapsed.txt", "pstats", "top.txt"]
+    with open(os.path.join(settings.profile_dir, names[0])) as f:
+        assert "busy (tests/test_profiling.py" in f.read()
+    assert profile.url == f"/api/profiles/{names[0]}"
+    assert profiling.run_profiled(None, "test", busy, 1)[1] is None
+
+
+def test_stored_profiles_need_the_admin_token(settings):
+    from fastapi import HTTPException
+
+    from app.routers.profiles import get_profile
+
+    _, profile = profiling.run_profiled(profiling.ProfileRequest("sample", admin=False), "test", busy, 1)
+    name = os.path.basename(profile.files[0])
+    with pytest.raises(HTTPException) as exc:
+        get_profile(name, None)
+    assert exc.value.status_code == 403
+    assert get_profile(name, "secret").path == os.path.join(settings.profile_dir, name)
+    with pytest.raises(HTTPException):
+        get_profile("../../etc/passwd", "secret")
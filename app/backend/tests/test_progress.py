@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from app.progress import ProgressBroker
+
+
+def test_broker_fans_out_thread_events_once_per_subscriber():
+    async def scenario():
+        broker = ProgressBroker(queue_size=2)
+        broker.bind(asyncio.get_running_loop())
+        a, b = broker.subscribe("d1"), broker.subscribe("d1")
+
+        def produce():
+            for rows in (10, 20, 30):
+                broker.publish("d1", {"stage": "ingesting", "rows": rows})
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+        # Slow viewers keep only the newest events
+        assert [a.get_nowait()["rows"] for _ in range(a.qsize())] == [20, 30]
+        assert b.qsize() == 2
+        assert broker.last("d1")["rows"] == 30
+
+        broker.publish("d1", {"stage": "ingested", "rows": 30})
+        assert broker.last("d1") is None
+        broker.unsubscribe("d1", a)
+        broker.unsubscribe("d1", b)
+        assert broker._subscribers == {}
+
+    asyncio.run(scenario())
+
+
+def test_stale_ingest_is_forgotten(monkeypatch):
+    import app.progress as progress
+
+    async def scenario():
+        broker = ProgressBroker(stale_after_s=60)
+        broker.bind(asyncio.get_running_loop())
+        broker.publish("d1", {"stage": "ingesting", "rows": 10})
+        assert broker.last("d1")["rows"] == 10
+        now = progress.time.monotonic()
+        monkeypatch.setattr(progress.time, "monotonic", lambda: now + 61)
+        # No event for a minute: viewers stop waiting on it and read Mongo
+        assert broker.last("d1") is None
+
+    asyncio.run(scenario())
+
+
+def test_failed_ingest_publishes_final_event(monkeypatch, tmp_path):
+    from fake_mongo import FakeDB
+
+    import app.ingest as ingest
+    import app.progress as progress
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "ingest_batch_size", 2)
+    path = tmp_path / "claims.csv"
+    path.write_text(
+        "claim_id,patient_id,procedure_code,denial_reason,status,submitted_at\n"
+        + "".join(f"C{i},P{i},99213,Incorrect NPI,denied,2025-07-01\n" for i in range(5))
+    )
+    db = FakeDB()
+    writes = []
+
+    def fail_second_write(method):
+        writes.append(method)
+        return RuntimeError("write failed") if len(writes) == 2 else None
+
+    db.claims.fail_on = fail_second_write
+
+    async def scenario():
+        broker = ProgressBroker()
+        broker.bind(asyncio.get_running_loop())
+        monkeypatch.setattr(progress, "broker", broker)
+        stages = []
+        fanout = broker._fanout
+
+        def record(dataset_id, event):
+            stages.append(event["stage"])
+            fanout(dataset_id, event)
+
+        monkeypatch.setattr(broker, "_fanout", record)
+        with pytest.raises(RuntimeError):
+            ingest.ingest_dataset(db, str(path), str(path), "alpha", source_path=str(path))
+        assert stages == ["ingesting", "failed"]
+        assert broker.last(str(db.datasets.find_one()["_id"])) is None
+
+    asyncio.run(scenario())
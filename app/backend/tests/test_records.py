@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pytest
+
+from app.records import from_alpha, from_beta, get_adapter
+from app.utils_normalize import NormalizationError, StringTable, error_code
+
+
+def test_adapters_share_low_cardinality_strings():
+    strings = StringTable()
+    rows = [
+        {"claim_id": f" A{i} ", "status": " Denied", "denial_reason": "incorrect npi",
+         "procedure_code": "".join(["992", "13"]), "submitted_at": "2025-07-01"}
+        for i in range(3)
+    ]
+    records = [from_alpha(row, strings) for row in rows]
+    assert records[0].claim_id == "A0"
+    assert records[0].denial_reason == "Incorrect NPI"
+    assert records[0].status == "denied"
+    assert records[0].procedure_code is records[2].procedure_code
+    assert records[0].denial_reason is records[2].denial_reason
+
+
+def test_adapters_validate_once():
+    with pytest.raises(ValueError, match="claim_id required"):
+        from_beta({"id": "  ", "status": "denied", "date": "2025-07-01"})
+    with pytest.raises(ValueError, match="unknown status"):
+        from_beta({"id": "B1", "status": "pending", "date": "2025-07-01"})
+    with pytest.raises(ValueError, match="unknown source system"):
+        get_adapter("gamma")({})
+
+
+def test_normalizers_raise_stable_codes():
+    with pytest.raises(NormalizationError) as exc:
+        from_alpha({"claim_id": "A1", "status": "denied", "submitted_at": "31/31/2024"})
+    assert exc.value.code == "invalid_date"
+    with pytest.raises(NormalizationError) as exc:
+        from_beta({"id": "B1", "status": "", "date": "2024-01-01"})
+    assert exc.value.code == "missing_status"
+    assert error_code(KeyError("x")) == "unexpected_error"
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from app.rejections import RejectionAggregator, merge_counts
+
+
+def test_samples_are_capped_per_code():
+    agg = RejectionAggregator(sample_cap=2, fail_rate=0)
+    kept = [agg.reject("invalid_date") for _ in range(5)]
+    assert kept == [True, True, False, False, False]
+    assert agg.reject("missing_claim_id") is True
+    assert agg.counts == {"invalid_date": 5, "missing_claim_id": 1}
+    # Resumed ingests continue from the committed counts
+    assert RejectionAggregator({"invalid_date": 2}, sample_cap=2).reject("invalid_date") is False
+
+
+def test_fail_fast_needs_min_rows_and_rate():
+    agg = RejectionAggregator(sample_cap=1, fail_rate=0.9, fail_min_rows=10)
+    for _ in range(9):
+        agg.reject("invalid_date")
+    assert not agg.broken()
+    agg.accept()
+    assert agg.broken()
+    assert "9 of the first 10 rows rejected (invalid_date: 9)" == agg.describe()
+    assert merge_counts({"a": 1}, {"a": 2, "b": 1}) == {"a": 3, "b": 1}
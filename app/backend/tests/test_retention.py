@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.retention import ARCHIVE_COLUMNS, _flat, delete_batched
+
+
+class _Cursor(list):
+    def limit(self, n: int) -> "_Cursor":
+        return _Cursor(self[:n])
+
+
+class _Collection:
+    name = "claims"
+
+    def __init__(self, docs: list[dict]) -> None:
+        self.docs = docs
+        self.deletes: list[int] = []
+
+    def find(self, query: dict, projection: dict) -> _Cursor:
+        return _Cursor({"_id": d["_id"]} for d in self.docs if d["dataset_id"] == query["dataset_id"])
+
+    def delete_many(self, query: dict) -> SimpleNamespace:
+        ids = set(query["_id"]["$in"])
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+        self.deletes.append(before - len(self.docs))
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+
+def test_delete_batched_deletes_in_bounded_batches():
+    coll = _Collection([{"_id": i, "dataset_id": "d1" if i < 25 else "d2"} for i in range(30)])
+    beats: list[int] = []
+    deleted = delete_batched(coll, {"dataset_id": "d1"}, 10, 0, lambda: beats.append(1))
+    assert deleted == 25
+    assert coll.deletes == [10, 10, 5] and len(beats) == 3
+    assert [d["dataset_id"] for d in coll.docs] == ["d2"] * 5
+
+
+def test_flat_archive_row_is_all_strings():
+    row = _flat({"id": "c1", "submitted_at": datetime(2025, 1, 2), "raw_payload": {"a": 1}, "status": None})
+    assert list(row) == ARCHIVE_COLUMNS
+    assert row["submitted_at"] == "2025-01-02T00:00:00"
+    assert json.loads(row["raw_payload"]) == {"a": 1}
+    assert row["status"] is None
+
+
+def test_archive_export_heartbeats_per_batch(monkeypatch, tmp_path):
+    import gzip
+
+    from fake_mongo import FakeDB
+
+    from app.config import get_settings
+    from app.retention import write_archive
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "retention_archive_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "retention_delete_batch", 10)
+    monkeypatch.setattr(settings, "retention_archive_format", "ndjson")
+    db = FakeDB()
+    db.claims.insert_many(
+        [{"dataset_id": "d1", "claim_id": f"C{i}", "source_system": "alpha", "raw_payload": {"i": i}} for i in range(25)]
+    )
+    beats: list[int] = []
+    archive = write_archive(db, "d1", lambda: beats.append(1))
+    assert archive["rows"] == 25 and len(beats) == 3
+    with gzip.open(archive["path"]) as f:
+        assert len(f.readlines()) == 25
+
+
+def test_private_dirs_must_stay_out_of_artifacts(tmp_path):
+    from app.config import Settings
+
+    artifacts = tmp_path / "artifacts"
+    settings = Settings(
+        artifacts_dir=str(artifacts),
+        upload_spool_dir=str(tmp_path / "var" / "uploads"),
+        retention_archive_dir=str(artifacts / "archive"),
+        llm_cache_path=str(artifacts / "classifier_cache.sqlite3"),
+    )
+    assert settings.exposed_private_dirs() == ["retention_archive_dir", "llm_cache_path"]
+
+
+def test_only_abandoned_ingests_can_be_purged(monkeypatch):
+    from datetime import timedelta
+
+    import pytest
+    from fake_mongo import FakeDB
+
+    from app.config import get_settings
+    from app.retention import DatasetBusy, claim_for_purge
+
+    monkeypatch.setattr(get_settings(), "ingest_stale_after_s", 120)
+    db = FakeDB()
+    now = datetime.utcnow()
+    live = str(db.datasets.insert_one({"status": "ingesting", "heartbeat_at": now}).inserted_id)
+    dead = str(db.datasets.insert_one({"status": "queued", "heartbeat_at": now - timedelta(minutes=5)}).inserted_id)
+    with pytest.raises(DatasetBusy, match="ingesting"):
+        claim_for_purge(db, live, drop=True, archive=False)
+    assert claim_for_purge(db, dead, drop=True, archive=False)["status"] == "deleting"
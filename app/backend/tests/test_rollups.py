@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from app.rollups import ROLLUPS_COLLECTION, RollupDeltas, trends
+
+
+class _Rollups:
+    def __init__(self, docs: list[dict]) -> None:
+        self.docs = docs
+
+    def find(self, query: dict, projection: dict) -> list[dict]:
+        day = query["day"]
+        return [d for d in self.docs if day.get("$gte", "") <= d["day"] <= day.get("$lte", "9999")]
+
+
+def test_reclassify_deltas_net_out_unchanged_keys():
+    deltas = RollupDeltas()
+    claim = {"submitted_at": datetime(2025, 7, 1), "source_system": "alpha", "canonical_reason": "Incorrect NPI", "eligibility": True}
+    deltas.claim(claim, -1)
+    deltas.claim(claim)
+    assert deltas.changes() == {}
+    deltas.claim(claim, -1)
+    deltas.claim({**claim, "canonical_reason": "Missing modifier", "eligibility": False})
+    assert deltas.changes() == {
+        ("2025-07-01", "alpha", "Incorrect NPI"): [-1, -1],
+        ("2025-07-01", "alpha", "Missing modifier"): [1, 0],
+    }
+    assert deltas.negated().changes()[("2025-07-01", "alpha", "Missing modifier")] == [-1, 0]
+
+
+def test_trends_buckets_by_week_and_group():
+    docs = [
+        {"day": "2025-06-30", "source_system": "alpha", "canonical_reason": "A", "claims": 3, "eligible": 1},
+        {"day": "2025-07-02", "source_system": "beta", "canonical_reason": "A", "claims": 1, "eligible": 1},
+        {"day": "2025-07-07", "source_system": "alpha", "canonical_reason": "B", "claims": 2, "eligible": 0},
+        {"day": "2025-07-08", "source_system": "alpha", "canonical_reason": "B", "claims": 0, "eligible": 0},
+    ]
+    db = {ROLLUPS_COLLECTION: _Rollups(docs)}
+    assert trends(db, interval="week") == [
+        {"period": "2025-06-30", "canonical_reason": "A", "claims": 4, "eligible": 2, "eligible_rate": 0.5},
+        {"period": "2025-07-07", "canonical_reason": "B", "claims": 2, "eligible": 0, "eligible_rate": 0.0},
+    ]
+    assert trends(db, interval="month", group_by="none") == [
+        {"period": "2025-06", "claims": 3, "eligible": 1, "eligible_rate": 0.3333},
+        {"period": "2025-07", "claims": 3, "eligible": 1, "eligible_rate": 0.3333},
+    ]
+
+
+def test_deleting_an_archived_dataset_subtracts_its_stored_share(monkeypatch):
+    from fake_mongo import FakeDB
+
+    import app.rollups as rollups
+
+    def from_claims(db, dataset_id):
+        deltas = RollupDeltas()
+        for claim in db.claims.find({"dataset_id": dataset_id}):
+            deltas.claim(claim)
+        return deltas
+
+    monkeypatch.setattr(rollups, "dataset_contribution", from_claims)
+    db = FakeDB()
+    dataset_id = str(db.datasets.insert_one({"rolled_up_at": None}).inserted_id)
+    claim = {"dataset_id": dataset_id, "submitted_at": datetime(2025, 7, 1), "source_system": "alpha"}
+    db.claims.insert_many([
+        {**claim, "canonical_reason": "Incorrect NPI", "eligibility": True},
+        {**claim, "canonical_reason": "Incorrect NPI", "eligibility": False},
+    ])
+    assert rollups.roll_up_dataset(db, dataset_id)
+    # Reclassify moves one claim to another reason; the stored share follows
+    deltas = RollupDeltas()
+    deltas.add(("2025-07-01", "alpha", "Incorrect NPI"), -1, 0)
+    deltas.add(("2025-07-01", "alpha", "Missing modifier"), 1, 0)
+    deltas.apply(db, dataset_id)
+    assert {(d["canonical_reason"], d["claims"]) for d in db[ROLLUPS_COLLECTION].find()} == {
+        ("Incorrect NPI", 1), ("Missing modifier", 1)
+    }
+
+    db.claims.delete_many({"dataset_id": dataset_id})  # archived by retention
+    assert rollups.remove_dataset(db, dataset_id)
+    assert all(d["claims"] == 0 and d["eligible"] == 0 for d in db[ROLLUPS_COLLECTION].find())
+    assert db[rollups.DATASET_ROLLUPS_COLLECTION].count_documents({}) == 0
+    assert not rollups.remove_dataset(db, dataset_id)
+
+
+def test_interrupted_roll_up_is_retried_once_stale(monkeypatch):
+    from datetime import timedelta
+
+    from fake_mongo import FakeDB
+
+    import app.rollups as rollups
+    from app.config import get_settings
+
+    def from_claims(db, dataset_id):
+        deltas = RollupDeltas()
+        for claim in db.claims.find({"dataset_id": dataset_id}):
+            deltas.claim(claim)
+        return deltas
+
+    monkeypatch.setattr(rollups, "dataset_contribution", from_claims)
+    monkeypatch.setattr(get_settings(), "ingest_stale_after_s", 60)
+    db = FakeDB()
+    # A worker claimed the roll-up and died before writing anything
+    claimed_at = datetime.utcnow()
+    dataset_id = str(db.datasets.insert_one({"status": "ingested", "rolled_up_at": None, "rolling_up_at": claimed_at}).inserted_id)
+    db.claims.insert_one({
+        "dataset_id": dataset_id, "submitted_at": datetime(2025, 7, 1), "source_system": "alpha",
+        "canonical_reason": "Incorrect NPI", "eligibility": True,
+    })
+    assert rollups.backfill(db) == 0  # the claim may still be live
+    db.datasets.update_one({}, {"$set": {"rolling_up_at": claimed_at - timedelta(seconds=61)}})
+    assert rollups.backfill(db) == 1
+    dataset = db.datasets.find_one()
+    assert dataset["rolled_up_at"] is not None and "rolling_up_at" not in dataset
+    assert [d["claims"] for d in db[ROLLUPS_COLLECTION].find()] == [1]
+    assert rollups.backfill(db) == 0
+
+    # Died after writing the counts but before marking: retried without counting twice
+    db.datasets.update_one({}, {"$set": {"rolled_up_at": None, "rolling_up_at": claimed_at - timedelta(seconds=61)}})
+    assert rollups.backfill(db) == 1
+    assert [d["claims"] for d in db[ROLLUPS_COLLECTION].find()] == [1]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+
+from app.serialization import dumps, stream_json_array
+
+
+def test_dumps_handles_bson_types():
+    oid = ObjectId()
+    out = orjson.loads(dumps({"_id": oid, "at": datetime(2025, 7, 1)}))
+    assert out == {"_id": str(oid), "at": "2025-07-01T00:00:00"}
+
+
+def test_stream_json_array_is_valid_across_chunks():
+    for n in (0, 1, 3, 4, 9):
+        docs = [{"i": i} for i in range(n)]
+        body = b"".join(stream_json_array(iter(docs), chunk_size=3))
+        assert orjson.loads(body) == docs
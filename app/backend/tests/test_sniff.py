@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from app.sniff import SchemaMismatch, detect_encoding, sniff
+
+ALPHA_HEADER = "claim_id;patient_id;procedure_code;denial_reason;status;submitted_at\n"
+
+
+def test_sniff_detects_delimiter_and_encoding():
+    data = (ALPHA_HEADER + "A1;P1;99213;Café;denied;2025-07-01\n").encode("cp1252")
+    layout = sniff(data, "a.csv", "alpha")
+    assert (layout.encoding, layout.delimiter) == ("cp1252", ";")
+    assert detect_encoding("claim_id".encode("utf-8-sig")) == "utf-8-sig"
+
+
+@pytest.mark.parametrize(
+    "data,filename,src,message",
+    [
+        (b"Claim_ID,status,date\nA1,denied,2025-07-01\n", "a.csv", "alpha", "claim_id, submitted_at"),
+        (ALPHA_HEADER.encode() + b"A1;P;1;x;denied;31/31/2025\n", "a.csv", "alpha", "invalid_date: 1"),
+        (b'{"id": "B1"}', "b.json", "beta", "array of objects"),
+        (b'[{"id": "B1", "status": "denied"}]', "b.json", "beta", "date"),
+    ],
+)
+def test_sniff_refuses_mismatched_files(data, filename, src, message):
+    with pytest.raises(SchemaMismatch, match=message):
+        sniff(data, filename, src)
+
+
+def test_sniff_tolerates_a_truncated_head():
+    head = b'[{"id": "B1", "status": "denied", "date": "2025-07-01"}, {"id": "B2", "sta'
+    assert sniff(head, "b.json", "beta", partial=True).columns == ["id", "status", "date"]
+    assert sniff(b"claim_id,pat", "a.csv", "alpha", partial=True).columns == []
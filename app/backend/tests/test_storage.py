@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from app.config import get_settings
+from app.storage import COMPRESSED_FIELD, decode_claim, load_raw_payload, prepare_claim_doc
+
+
+def _doc():
+    return {
+        "dataset_id": "d1",
+        "claim_id": "A123",
+        "source_system": "alpha",
+        "status": "denied",
+        "eligibility_reason": "Incorrect NPI",
+        "exclusion_reason": None,
+    }
+
+
+def test_compressed_payload_roundtrip():
+    raw = {"claim_id": "A123", "status": "denied"}
+    doc, side = prepare_claim_doc(_doc(), raw, mode="compressed")
+    assert side is None
+    assert "raw_payload" not in doc
+    assert load_raw_payload(None, doc) == raw
+
+
+def test_compact_codes_roundtrip():
+    settings = get_settings()
+    settings.compact_codes = True
+    try:
+        doc, side = prepare_claim_doc(_doc(), {"id": "A123"}, mode="collection")
+    finally:
+        settings.compact_codes = False
+    assert COMPRESSED_FIELD not in doc
+    assert doc["source_system"] == "a" and doc["status"] == "D"
+    assert side is not None and side["source_system"] == "a"
+    assert decode_claim(doc) == _doc()
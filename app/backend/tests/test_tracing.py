@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pytest
+
+from app import tracing
+
+
+def test_helpers_are_no_ops_without_a_tracer():
+    assert not tracing.enabled()
+    with tracing.span("pipeline", rows=3) as current:
+        assert current is None
+    assert tracing.start_span("find claims") is None
+    assert tracing.add_trace_ids(None, "info", {"event": "x"}) == {"event": "x"}
+
+
+def test_spans_nest_and_tag_log_events(monkeypatch):
+    trace = pytest.importorskip("opentelemetry.trace")
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_trace", trace)
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("test"))
+
+    with tracing.span("pipeline", source_system="alpha", skipped=None) as parent:
+        event = tracing.add_trace_ids(None, "info", {"event": "x"})
+        child = tracing.start_span("insert claims", kind="CLIENT", **{"db.system": "mongodb"})
+        child.end()
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert spans["insert claims"].parent.span_id == spans["pipeline"].context.span_id
+    assert spans["pipeline"].attributes == {"source_system": "alpha"}
+    assert event["trace_id"] == format(parent.get_span_context().trace_id, "032x")
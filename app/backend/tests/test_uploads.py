@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from app.routers.uploads import _append
+
+
+def test_append_enforces_offsets(tmp_path):
+    path = str(tmp_path / "u.part")
+    open(path, "wb").close()
+    assert _append(path, 0, b"abc") == 3
+    # A retried chunk at a stale offset is refused and reports the current size
+    assert _append(path, 0, b"abc") == -3 - 1
+    assert _append(path, 3, b"de") == 5
+    with open(path, "rb") as f:
+        assert f.read() == b"abcde"
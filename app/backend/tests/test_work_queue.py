@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import get_settings
+from app.sniff import Layout
+from app.work_queue import (
+    TASKS_COLLECTION,
+    claim_task,
+    complete_task,
+    csv_bounds,
+    enqueue_dataset,
+    finish_dataset,
+    plan_units,
+    read_unit,
+    renew_lease,
+    requeue_expired,
+    run_worker,
+)
+
+HEADER = "claim_id,patient_id,procedure_code,denial_reason,status,submitted_at\n"
+
+
+def _row(i: int) -> str:
+    # Every third row has a quoted denial reason spanning two lines
+    reason = '"Incorrect NPI\non ""claim"""' if i % 3 == 0 else "Incorrect NPI"
+    return f"C{i},P{i},99213,{reason},denied,2025-07-01\n"
+
+
+@pytest.fixture
+def queue_db(monkeypatch, tmp_path):
+    from fake_mongo import FakeDB
+
+    import app.work_queue as work_queue
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ingest_batch_size", 2)
+    monkeypatch.setattr(settings, "candidates_materialized", False)
+    rollups = []
+    monkeypatch.setattr(work_queue, "roll_up_dataset", lambda db, dataset_id: rollups.append(dataset_id))
+    path = tmp_path / "claims.csv"
+    path.write_text(HEADER + "".join(_row(i) for i in range(10)))
+    return FakeDB(), str(path), rollups
+
+
+def test_csv_bounds_end_on_records(tmp_path):
+    path = tmp_path / "claims.csv"
+    path.write_text(HEADER + "".join(_row(i) for i in range(10)))
+    data = path.read_bytes()
+    bounds = csv_bounds(str(path), 30)
+    assert bounds[0] == len(HEADER) and bounds[-1] == len(data) and len(bounds) > 3
+    for cut in bounds[1:-1]:
+        # A cut never falls inside the quoted, multi-line reason
+        assert data[cut - 1 : cut] == b"\n" and data[:cut].count(b'"') % 2 == 0
+
+
+def test_units_cover_every_row_once(tmp_path):
+    path = tmp_path / "claims.csv"
+    path.write_text(HEADER + "".join(_row(i) for i in range(10)))
+    layout = Layout()
+    units, total = plan_units(str(path), str(path), "alpha", layout, 30)
+    assert total is None and all(u["kind"] == "bytes" for u in units)
+    rows = [row for u in units for _, row in read_unit(str(path), str(path), "alpha", layout, u)]
+    assert [r["claim_id"] for r in rows] == [f"C{i}" for i in range(10)]
+    assert rows[0]["denial_reason"] == 'Incorrect NPI\non "claim"'
+    keys = [key for u in units for key, _ in read_unit(str(path), str(path), "alpha", layout, u)]
+    assert len(set(keys)) == 10
+
+
+def test_parquet_units_are_row_groups(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "claims.parquet")
+    table = pa.table({"claim_id": [f"C{i}" for i in range(10)], "status": ["denied"] * 10})
+    pq.write_table(table, path, row_group_size=3)
+    units, total = plan_units(path, path, "alpha", Layout(), 1)
+    assert total == 10 and [(u["start"], u["stop"], u["row_start"]) for u in units] == [
+        (0, 1, 0), (1, 2, 3), (2, 3, 6), (3, 4, 9)
+    ]
+    assert [(k, r["claim_id"]) for k, r in read_unit(path, path, "alpha", Layout(), units[1])] == [
+        (3, "C3"), (4, "C4"), (5, "C5")
+    ]
+
+
+def test_workers_ingest_every_unit(queue_db):
+    db, path, rollups = queue_db
+    dataset_id = enqueue_dataset(db, path, unit_bytes=60)
+    units = db[TASKS_COLLECTION].count_documents({})
+    assert units > 2 and db.datasets.find_one()["status"] == "queued"
+    assert run_worker(db, "w1", poll_s=0, exit_when_idle=True) == units
+    dataset = db.datasets.find_one()
+    assert dataset["status"] == "ingested" and dataset["record_count"] == 10 and dataset["row_total"] == 10
+    assert db.claims.count_documents({}) == 10 and rollups == [dataset_id]
+
+
+def test_expired_lease_is_taken_over(queue_db):
+    db, path, _ = queue_db
+    enqueue_dataset(db, path)
+    task = claim_task(db, "w1")
+    db[TASKS_COLLECTION].update_one({"_id": task["_id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    taken = claim_task(db, "w2")
+    assert taken["_id"] == task["_id"] and taken["lease_owner"] == "w2" and taken["attempts"] == 2
+    # The first worker finds out at its next heartbeat and cannot complete the unit
+    assert not renew_lease(db, task, "w1")
+    assert not complete_task(db, task, "w1", {"accepted": 10, "rejected": 0}, 0.1)
+    assert complete_task(db, taken, "w2", {"accepted": 10, "rejected": 0}, 0.1)
+
+
+def test_unit_fails_after_max_attempts(queue_db, monkeypatch):
+    db, path, _ = queue_db
+    monkeypatch.setattr(get_settings(), "ingest_task_max_attempts", 2)
+    enqueue_dataset(db, path)
+    expired = {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    for worker in ("w1", "w2"):
+        task = claim_task(db, worker)
+        db[TASKS_COLLECTION].update_one({"_id": task["_id"]}, expired)
+    assert claim_task(db, "w3") is None
+    assert requeue_expired(db) == 0
+    assert db[TASKS_COLLECTION].find_one()["status"] == "failed"
+    assert db.datasets.find_one()["status"] == "failed"
+
+
+def test_dataset_is_finished_exactly_once(queue_db):
+    db, path, rollups = queue_db
+    dataset_id = enqueue_dataset(db, path, unit_bytes=60)
+    assert not finish_dataset(db, dataset_id)  # units still pending
+    while True:
+        task = claim_task(db, "w1")
+        if task is None:
+            break
+        complete_task(db, task, "w1", {"accepted": 1, "rejected": 0}, 0.1)
+    assert finish_dataset(db, dataset_id)
+    assert not finish_dataset(db, dataset_id)
+    assert rollups == [dataset_id] and db.datasets.find_one()["status"] == "ingested"